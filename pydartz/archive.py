@@ -0,0 +1,379 @@
+"""Module for compacting the session log into archived monthly segments.
+
+Sessions of past months are moved from the log into gzip-compressed segment
+files in an archive directory. For every segment, the aggregated statistics of
+all players are stored in a summary file, s.t. the complete history can be
+analyzed without reading archived sessions.
+"""
+
+import contextlib
+import gzip
+import json
+import os.path
+from datetime import date
+
+from .database import (
+    Sessions,
+    _analyze_session,
+    _dump_json,
+    _entries_from_json,
+    _entries_to_json,
+    _serialize,
+    analyze_log_file_cached,
+    iter_log_file,
+    iter_sessions,
+    to_timestamp,
+)
+from .index import SessionIndex, _analyze_range, _filter_legs, analyze_window
+
+SUMMARY_VERSION = 1
+SUMMARY_FILENAME = "summary.json"
+MANIFEST_FILENAME = "compaction.json"
+# suffix of the files written while compacting
+COMPACT_SUFFIX = ".compact.tmp"
+
+
+def default_archive_dir(log_filepath):
+    """Return the default archive directory, located next to the log."""
+    return os.path.join(os.path.dirname(os.path.abspath(log_filepath)), "archive")
+
+
+def compact_log(log_filepath, before=None, archive_dir=None):
+    """Move all sessions of the log at `log_filepath` that started before the
+    month of `before` (a date, datetime or timestamp; default: today) into
+    per-month segments in `archive_dir` (default: see `default_archive_dir`),
+    and update the segment summaries. The log is replaced by a file holding the
+    remaining sessions.
+
+    Compacting is crash-safe: the new log, segments and summary are written
+    to temporary files first, and a manifest listing them is written before
+    any file is replaced. A compaction that was interrupted after writing the
+    manifest is completed by the next call of this function or of
+    `analyze_history`, hence archived sessions are never counted twice.
+    Return the number of archived sessions.
+    """
+    if archive_dir is None:
+        archive_dir = default_archive_dir(log_filepath)
+    os.makedirs(archive_dir, exist_ok=True)
+    complete_compaction(archive_dir)
+    cutoff = to_timestamp(before or date.today())[:6] + "01-000000"
+
+    summary = load_summary(archive_dir)
+    segments = {}
+    nr_archived = 0
+    tmp_filepath = log_filepath + COMPACT_SUFFIX
+    with open(tmp_filepath, "wb") as log_file:
+        log_file.write(Sessions.ROOT_START)
+        for session in iter_log_file(log_filepath):
+            timestamp = session.get("timestamp")
+            if timestamp >= cutoff:
+                log_file.write(_serialize(session))
+                continue
+
+            month = _segment_month(timestamp)
+            if month not in segments:
+                segments[month] = _open_segment(archive_dir, month, summary)
+            segment_file, players = segments[month]
+            segment_file.write(_serialize(session))
+            _analyze_session(session, players)
+            summary["segments"][month]["nr_sessions"] += 1
+            nr_archived += 1
+        log_file.write(Sessions.ROOT_END)
+        log_file.flush()
+        os.fsync(log_file.fileno())
+
+    if not nr_archived:
+        os.remove(tmp_filepath)
+        return 0
+
+    for month, (segment_file, players) in segments.items():
+        segment_file.write(Sessions.ROOT_END)
+        _close_synced(segment_file)
+        summary["segments"][month]["players"] = _entries_to_json(players)
+
+    _dump_json(
+        os.path.join(archive_dir, MANIFEST_FILENAME),
+        dict(
+            log_filepath=os.path.abspath(log_filepath),
+            months=sorted(segments),
+            summary=summary,
+        ),
+    )
+    complete_compaction(archive_dir)
+    return nr_archived
+
+
+def complete_compaction(archive_dir):
+    """Complete a compaction of a log into `archive_dir` that was interrupted
+    after its manifest was written. Replacing the files is repeatable, hence
+    the manifest is removed only after all files were replaced.
+    """
+    manifest_filepath = os.path.join(archive_dir, MANIFEST_FILENAME)
+    try:
+        with open(manifest_filepath) as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return
+
+    for month in manifest["months"]:
+        segment_filepath = os.path.join(archive_dir, _segment_filename(month))
+        _replace_if_exists(segment_filepath + COMPACT_SUFFIX, segment_filepath)
+    _dump_json(os.path.join(archive_dir, SUMMARY_FILENAME), manifest["summary"])
+    log_filepath = manifest["log_filepath"]
+    _replace_if_exists(log_filepath + COMPACT_SUFFIX, log_filepath)
+    os.remove(manifest_filepath)
+
+
+def _replace_if_exists(source, target):
+    with contextlib.suppress(FileNotFoundError):
+        os.replace(source, target)
+
+
+def _segment_filename(month):
+    return f"stats-{month}.xml.gz"
+
+
+def _segment_month(timestamp):
+    """Return the month (formatted as 'YYYY-MM') of the segment that a session
+    started at `timestamp` is archived in.
+    """
+    return f"{timestamp[:4]}-{timestamp[4:6]}"
+
+
+def _iter_segment(archive_dir, segment):
+    """Yield the sessions of a `segment` of the summary in `archive_dir`."""
+    segment_filepath = os.path.join(archive_dir, segment["filename"])
+    with gzip.open(segment_filepath, "rb") as segment_file:
+        yield from iter_sessions(segment_file)
+
+
+def _open_segment(archive_dir, month, summary):
+    """Open a temporary file for writing the segment of `month`. If the
+    segment already exists, its sessions are copied, and the statistics from
+    its summary are loaded. Return the file object and the dict of
+    PlayerEntrys.
+    """
+    segment_filepath = os.path.join(archive_dir, _segment_filename(month))
+    # the underlying file is kept open for syncing, see _close_synced()
+    segment_file = gzip.GzipFile(
+        fileobj=open(segment_filepath + COMPACT_SUFFIX, "wb"), mode="wb"
+    )
+    players = {}
+
+    if month in summary["segments"]:
+        _copy_sessions(segment_filepath, segment_file)
+        players = _entries_from_json(summary["segments"][month]["players"])
+    else:
+        segment_file.write(Sessions.ROOT_START)
+        summary["segments"][month] = dict(
+            filename=_segment_filename(month), nr_sessions=0, players={}
+        )
+
+    return segment_file, players
+
+
+def _copy_sessions(segment_filepath, segment_file, block_size=1024 * 1024):
+    """Copy the existing segment at `segment_filepath` to `segment_file`
+    without its closing tag. The segment is decompressed in blocks of
+    `block_size` bytes; the last bytes read are held back until the end of
+    the segment is reached.
+    """
+    held = b""
+    with gzip.open(segment_filepath, "rb") as existing_file:
+        while True:
+            block = existing_file.read(block_size)
+            if not block:
+                break
+            data = held + block
+            end = max(0, len(data) - len(Sessions.ROOT_END))
+            segment_file.write(data[:end])
+            held = data[end:]
+    if held != Sessions.ROOT_END:
+        raise ValueError(f"Segment {segment_filepath} is incomplete")
+
+
+def _close_synced(gzip_file):
+    """Close a gzip file opened by `_open_segment` and sync it to disk."""
+    file = gzip_file.fileobj
+    gzip_file.close()
+    file.flush()
+    os.fsync(file.fileno())
+    file.close()
+
+
+def load_summary(archive_dir):
+    """Load the segment summaries from `archive_dir`. Return an empty summary
+    if none exists yet.
+    """
+    try:
+        with open(os.path.join(archive_dir, SUMMARY_FILENAME)) as file:
+            summary = json.load(file)
+    except FileNotFoundError:
+        return dict(version=SUMMARY_VERSION, segments={})
+
+    if summary.get("version") != SUMMARY_VERSION:
+        raise ValueError(f"Unsupported archive summary version in {archive_dir}")
+    return summary
+
+
+def iter_history(log_filepath, archive_dir=None):
+    """Yield the sessions of the complete history: the archived sessions in
+    `archive_dir` (default: see `default_archive_dir`) month by month,
+    followed by the sessions of the log at `log_filepath`.
+    """
+    if archive_dir is None:
+        archive_dir = default_archive_dir(log_filepath)
+    complete_compaction(archive_dir)
+
+    summary = load_summary(archive_dir)
+    for month in sorted(summary["segments"]):
+        yield from _iter_segment(archive_dir, summary["segments"][month])
+    yield from iter_log_file(log_filepath)
+
+
+def analyze_archive(archive_dir, names=None, since=None, until=None):
+    """Analyze the archived sessions in `archive_dir`.
+
+    The summaries of the segments are merged. If a time range [`since`,
+    `until`) is given, summaries are only used for segments that lie
+    completely within the range. Segments overlapping the range partially are
+    read and filtered leg by leg.
+    If an iterable of player `names` is given, only these players are
+    analyzed.
+    """
+    since, until = to_timestamp(since), to_timestamp(until)
+    if names is not None:
+        names = set(names)
+    summary = load_summary(archive_dir)
+
+    players = {}
+    for month in sorted(summary["segments"]):
+        segment = summary["segments"][month]
+        start, end = _month_range(month)
+        if (until is not None and start >= until) or (
+            since is not None and end <= since
+        ):
+            continue
+
+        if (since is None or since <= start) and (until is None or end <= until):
+            entries = _entries_from_json(segment["players"])
+            if names is not None:
+                entries = {n: e for n, e in entries.items() if n in names}
+        else:
+            entries = {}
+            for session in _iter_segment(archive_dir, segment):
+                if _filter_legs(session, since, until):
+                    _analyze_session(session, entries, names)
+
+        _merge_entries(players, entries)
+
+    return players
+
+
+def _month_range(month):
+    """Return the timestamps of the beginning of `month` (formatted as
+    'YYYY-MM') and of the following month.
+    """
+    year, month = int(month[:4]), int(month[5:])
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return (
+        f"{year:04d}{month:02d}01-000000",
+        f"{next_year:04d}{next_month:02d}01-000000",
+    )
+
+
+def _merge_entries(players, entries):
+    """Merge the dict of PlayerEntrys `entries` into `players`."""
+    for name, entry in entries.items():
+        if name in players:
+            players[name].merge(entry)
+        else:
+            players[name] = entry
+
+
+def analyze_history(
+    log_filepath,
+    names=None,
+    since=None,
+    until=None,
+    last_sessions=None,
+    last_legs=None,
+    archive_dir=None,
+):
+    """Analyze the complete history, i.e. the archived sessions in
+    `archive_dir` (default: see `default_archive_dir`) and the sessions of the
+    log at `log_filepath`. The arguments are passed to `analyze_archive` and
+    `index.analyze_window`, resp.
+    Windows of the most recent sessions or legs are taken from the log. If it
+    holds fewer sessions or legs, the remainder is read from the newest
+    archive segments.
+    """
+    if archive_dir is None:
+        archive_dir = default_archive_dir(log_filepath)
+    complete_compaction(archive_dir)
+
+    if last_sessions is None and last_legs is None:
+        players = analyze_archive(archive_dir, names, since, until)
+        if since is None and until is None:
+            entries = analyze_log_file_cached(log_filepath, names=names)
+        else:
+            entries = analyze_window(log_filepath, since, until, names=names)
+        _merge_entries(players, entries)
+        return players
+
+    since, until = to_timestamp(since), to_timestamp(until)
+    if names is not None:
+        names = set(names)
+    session_index = SessionIndex.open(log_filepath)
+    first, stop, skip_legs = session_index.select(
+        since, until, last_sessions, last_legs, log_filepath
+    )
+    players, nr_legs = _analyze_range(
+        log_filepath, session_index, first, stop, skip_legs, since, until, names
+    )
+
+    remaining_sessions = (
+        None if last_sessions is None else last_sessions - (stop - first)
+    )
+    remaining_legs = None if last_legs is None else last_legs - nr_legs
+    if all(r is None or r > 0 for r in (remaining_sessions, remaining_legs)):
+        entries = _analyze_latest_archived(
+            archive_dir, names, since, until, remaining_sessions, remaining_legs
+        )
+        _merge_entries(players, entries)
+    return players
+
+
+def _analyze_latest_archived(archive_dir, names, since, until, nr_sessions, nr_legs):
+    """Analyze the `nr_sessions` most recent archived sessions started before
+    `until`, and/or the `nr_legs` most recent archived legs, that were played
+    in the time range [`since`, `until`). Limits of None are not applied.
+    Segments are read from the newest one until the limits are reached.
+    """
+    summary = load_summary(archive_dir)
+    players = {}
+    for month in sorted(summary["segments"], reverse=True):
+        start, end = _month_range(month)
+        if until is not None and start >= until:
+            continue
+        if since is not None and end <= since:
+            break
+
+        sessions = [
+            session
+            for session in _iter_segment(archive_dir, summary["segments"][month])
+            if until is None or session.get("timestamp") < until
+        ]
+        for session in reversed(sessions):
+            _filter_legs(session, since, until)
+            if nr_legs is not None:
+                del session[: max(0, len(session) - nr_legs)]
+                nr_legs -= len(session)
+            if len(session):
+                _analyze_session(session, players, names)
+            if nr_sessions is not None:
+                nr_sessions -= 1
+            if nr_sessions == 0 or nr_legs == 0:
+                return players
+
+    return players
@@ -0,0 +1,218 @@
+"""Module simulating large batches of legs of bots with NumPy.
+
+All legs of a batch are advanced in lockstep, dart by dart. The scores left,
+scores at the beginning of the current visits, darts left and current players
+of the legs are stored in arrays, and the rules are applied by vectorized
+masks: a dart that checks out ends the leg, a dart that busts resets the
+score to the one at the beginning of the visit and ends the visit. Like in
+`player.Player`, a bust counts as all remaining darts of the visit.
+
+Bots aim according to the optimal policy of the throw model matching their
+three-dart average (see `simulation.SkillTables`). Only straight-in rules and
+start values covered by the policies are supported.
+
+Requires the optional `numpy` dependency.
+"""
+
+from collections import namedtuple
+
+from . import board
+from .finishes import MAX_DARTS, SEGMENTS
+from .policy import MAX_SCORE
+from .rules import DEFAULT_RULES
+from .simulation import skill_tables
+
+# Results of a batch of legs: index of the winner and number of darts of the
+# winner per leg, and darts and points per leg and player
+LegResults = namedtuple("LegResults", ["winners", "darts", "throws", "points"])
+# Results of a batch of matches: index of the winner per match, legs won per
+# match and player, and the total darts and points per player
+MatchResults = namedtuple("MatchResults", ["winners", "legs_won", "throws", "points"])
+
+
+def simulate_legs(
+    averages,
+    nr_legs,
+    first=0,
+    start_value=501,
+    rules=DEFAULT_RULES,
+    seed=None,
+    cache_dir=None,
+):
+    """Simulate `nr_legs` legs between bots with the given three-dart
+    `averages`, in turn order. The legs are started by the bot with index
+    `first` (or an array of indices per leg). Return LegResults.
+    """
+    import numpy as np
+
+    batch = _Batch(averages, start_value, rules, cache_dir)
+    first = np.broadcast_to(first, nr_legs)
+    return batch.run(first, np.random.default_rng(seed))
+
+
+def simulate_matches(
+    averages,
+    nr_matches,
+    nr_legs,
+    start_value=501,
+    rules=DEFAULT_RULES,
+    seed=None,
+    cache_dir=None,
+):
+    """Simulate `nr_matches` matches between bots with the given three-dart
+    `averages`, each won by the first bot to win `nr_legs` legs (like a
+    `session.Session`). Bots take turns in starting the legs. Return
+    MatchResults.
+    """
+    import numpy as np
+
+    batch = _Batch(averages, start_value, rules, cache_dir)
+    rng = np.random.default_rng(seed)
+    nr_players = len(averages)
+
+    legs_won = np.zeros((nr_matches, nr_players), dtype=np.int64)
+    throws = np.zeros(nr_players, dtype=np.int64)
+    points = np.zeros(nr_players, dtype=np.int64)
+    first = np.zeros(nr_matches, dtype=np.intp)
+    active = np.arange(nr_matches)
+    while active.size:
+        results = batch.run(first[active], rng)
+        legs_won[active, results.winners] += 1
+        throws += results.throws.sum(axis=0)
+        points += results.points.sum(axis=0)
+        first[active] = (first[active] + 1) % nr_players
+        active = active[legs_won[active].max(axis=1) < nr_legs]
+
+    return MatchResults(legs_won.argmax(axis=1), legs_won, throws, points)
+
+
+def averages(results):
+    """Return the three-dart averages per player of LegResults or
+    MatchResults.
+    """
+    throws, points = results.throws, results.points
+    if throws.ndim == 2:
+        throws, points = throws.sum(axis=0), points.sum(axis=0)
+    return 3 * points / throws
+
+
+class _Batch:
+    """Lookup arrays of a batch simulation."""
+
+    def __init__(self, averages, start_value, rules, cache_dir):
+        import numpy as np
+
+        if not rules.straight_in:
+            raise ValueError("Only straight-in rules can be simulated.")
+        if not 0 < start_value <= MAX_SCORE:
+            raise ValueError(f"Start value must be between 1 and {MAX_SCORE}.")
+        if not rules.remainder_valid(start_value):
+            # no leg could ever be finished
+            raise ValueError(f"Start value {start_value} cannot be checked out.")
+
+        tables = [skill_tables(a, rules.out, cache_dir) for a in averages]
+        self._nr_players = len(tables)
+        self._start_value = start_value
+        # targets per player, score at the beginning of the visit, points
+        # scored so far and darts left, flattened for fast lookups
+        targets = np.stack([t.policy.targets for t in tables])
+        self._strides = targets.shape[1:]
+        self._targets = targets.ravel()
+        # hits are sampled from alias tables per player and target
+        self._acceptance, self._aliases = _alias_tables(
+            np.concatenate([t.probabilities for t in tables])
+        )
+
+        self._points = np.array([s.points for s in SEGMENTS] + [0])
+        self._out = np.array([rules.out_segment(s.name) for s in SEGMENTS] + [False])
+        self._valid = np.array(
+            [rules.remainder_valid(s) for s in range(start_value + 1)]
+        )
+
+    def run(self, first, rng):
+        """Play a leg per entry of `first`, the index of the starting
+        player. The state of the legs in play is kept in arrays that are
+        compacted when legs are finished.
+        """
+        import numpy as np
+
+        nr_legs, nr_players = len(first), self._nr_players
+        nr_scores, nr_points, nr_darts = self._strides
+        nr_outcomes = board.MISS + 1
+
+        # scores at the end of the last visit and darts per leg and player
+        scores = np.full(nr_legs * nr_players, self._start_value)
+        throws = np.zeros(nr_legs * nr_players, dtype=np.int64)
+        winners = np.empty(nr_legs, dtype=np.intp)
+
+        legs = np.arange(nr_legs)
+        player = np.array(first, dtype=np.intp)
+        visit_start = np.full(nr_legs, self._start_value)
+        score = visit_start.copy()
+        darts = np.full(nr_legs, MAX_DARTS)
+
+        while legs.size:
+            target = self._targets[
+                ((player * nr_scores + visit_start) * nr_points + visit_start - score)
+                * nr_darts
+                + darts
+            ]
+            draw = rng.random(legs.size) * nr_outcomes
+            outcome = draw.astype(np.intp)
+            cell = (player * len(SEGMENTS) + target) * nr_outcomes + outcome
+            hit = np.where(
+                draw - outcome < self._acceptance[cell], outcome, self._aliases[cell]
+            )
+
+            rest = score - self._points[hit]
+            checkout = (rest == 0) & self._out[hit]
+            bust = ~checkout & ((rest <= 0) | ~self._valid[np.maximum(rest, 0)])
+
+            slot = legs * nr_players + player
+            throws[slot] += np.where(bust, darts, 1)
+            score = np.where(bust, visit_start, rest)
+            winners[legs[checkout]] = player[checkout]
+
+            # busts and the last dart end the visit
+            ended = bust | (darts == 1)
+            scores[slot[ended]] = score[ended]
+            player = np.where(ended, (player + 1) % nr_players, player)
+            following = scores[legs * nr_players + player]
+            score = np.where(ended, following, score)
+            visit_start = np.where(ended, following, visit_start)
+            darts = np.where(ended, MAX_DARTS, darts - 1)
+
+            if checkout.any():
+                scores[slot[checkout]] = 0
+                playing = ~checkout
+                legs, player = legs[playing], player[playing]
+                visit_start, score = visit_start[playing], score[playing]
+                darts = darts[playing]
+
+        throws = throws.reshape(nr_legs, nr_players)
+        points = self._start_value - scores.reshape(nr_legs, nr_players)
+        return LegResults(winners, throws[np.arange(nr_legs), winners], throws, points)
+
+
+def _alias_tables(probabilities):
+    """Return the acceptance probabilities and aliases of Walker's alias
+    method for every row of `probabilities`, flattened. An outcome drawn
+    uniformly is accepted with its acceptance probability, otherwise its alias
+    is taken.
+    """
+    import numpy as np
+
+    nr_rows, nr_outcomes = probabilities.shape
+    acceptance = np.ones((nr_rows, nr_outcomes))
+    aliases = np.tile(np.arange(nr_outcomes), (nr_rows, 1))
+    for row, weights in enumerate(probabilities.tolist()):
+        scaled = [w * nr_outcomes / sum(weights) for w in weights]
+        small = [i for i, w in enumerate(scaled) if w < 1]
+        large = [i for i, w in enumerate(scaled) if w >= 1]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            acceptance[row, low] = scaled[low]
+            aliases[row, low] = high
+            scaled[high] -= 1 - scaled[low]
+            (small if scaled[high] < 1 else large).append(high)
+    return acceptance.ravel(), aliases.ravel()
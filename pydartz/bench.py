@@ -0,0 +1,318 @@
+"""Benchmarks of the hot paths of games and statistics.
+
+Run `python -m pydartz.bench` to time the validation of scores, complete
+sessions, finish lookups, loading and saving of the session log, and the
+analysis of synthetic session logs (see `generate`) of several sizes. All
+inputs are generated from a fixed seed, hence the results of different
+versions can be compared, e.g. by diffing the JSON output.
+
+Every benchmark is run once to warm up caches and then `repeat` times; the
+best and the median time per operation (e.g. per score or per visit) are
+reported in seconds.
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from datetime import date
+
+from . import __version__
+from .communication import TestingCommunicator
+from .database import Sessions, analyze_log_file, analyze_sessions
+from .finishes import MAX_DARTS, SEGMENTS
+from .generate import generate_log
+from .player import Player
+from .rules import DEFAULT_RULES
+from .session import Session
+
+# numbers of visits of the synthetic session logs
+SIZES = (10000, 100000, 1000000)
+REPEAT = 5
+SEED = 0
+# number of inputs of the benchmarks of single operations
+NR_INPUTS = 10000
+# players and date span of the synthetic session logs
+LOG_PLAYERS = 10
+LOG_SINCE = date(2020, 1, 1)
+LOG_UNTIL = date(2025, 1, 1)
+# legs to win of the benchmarked sessions
+NR_LEGS = 10
+
+# scripted legs of two players, won by the starting player in five visits
+_LEG_VISITS = ("180d", "180d", "180d", "180d", "141d")
+_NAMES = ("Adam", "Eve")
+
+
+def run_benchmarks(sizes=SIZES, repeat=REPEAT, seed=SEED, pattern=None):
+    """Run the benchmarks, optionally only the ones whose name contains
+    `pattern`. Log benchmarks are run for synthetic logs of every number of
+    visits in `sizes`. Return the results as JSON-serializable dict.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        benchmarks = [
+            (name, None, lambda f=factory: f(tmp_dir, seed))
+            for name, factory in _BENCHMARKS
+        ]
+        for size in sizes:
+            log = _SyntheticLog(os.path.join(tmp_dir, f"stats-{size}.xml"), size, seed)
+            benchmarks.extend(
+                (name, size, lambda f=factory, log=log: f(*log.write()))
+                for name, factory in _LOG_BENCHMARKS
+            )
+
+        for name, size, factory in benchmarks:
+            if pattern is not None and pattern not in name:
+                continue
+            function, nr_operations = factory()
+            # warm-up, e.g. of lru caches, s.t. all repeats measure the same
+            function()
+            times = [
+                duration / nr_operations
+                for duration in timeit.repeat(function, repeat=repeat, number=1)
+            ]
+            results.append(
+                dict(
+                    name=name,
+                    size=size,
+                    operations=nr_operations,
+                    best=min(times),
+                    median=statistics.median(times),
+                )
+            )
+
+    return dict(
+        version=__version__,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        seed=seed,
+        repeat=repeat,
+        results=results,
+    )
+
+
+def _process_score(tmp_dir, seed):
+    rng = random.Random(seed)
+    player = Player("Adam", communicator=TestingCommunicator())
+    names = [s.name.lower() for s in SEGMENTS]
+    inputs = [
+        rng.choice(
+            [
+                str(rng.randint(0, 180)),
+                f"{rng.randint(0, 180)}d",
+                rng.choice(names),
+                "b",
+            ]
+        )
+        for _ in range(NR_INPUTS)
+    ]
+
+    def run():
+        for input_ in inputs:
+            player.begin()
+            try:
+                player._process_score(input_)
+            except ValueError:
+                pass
+
+    return run, len(inputs)
+
+
+def _score_valid(tmp_dir, seed):
+    rng = random.Random(seed)
+    player = Player("Adam", communicator=TestingCommunicator())
+    inputs = [(rng.randint(-1, 180), rng.random() < 0.5) for _ in range(NR_INPUTS)]
+
+    def run():
+        for score, is_total in inputs:
+            try:
+                player.score_valid(score, is_total)
+            except ValueError:
+                pass
+
+    return run, len(inputs)
+
+
+def _finish_lookup(tmp_dir, seed):
+    checkouts = DEFAULT_RULES.checkouts
+    inputs = [
+        (score, darts)
+        for score in range(1, checkouts.max_score + 1)
+        for darts in range(1, MAX_DARTS + 1)
+    ]
+
+    def run():
+        for score, darts in inputs:
+            checkouts.routes(score, darts)
+            DEFAULT_RULES.finishable(score, darts)
+
+    return run, len(inputs)
+
+
+def _play_session(sessions_log=None):
+    """Play a scripted session of two players."""
+    nr_legs = 2 * NR_LEGS - 1
+    communicator = TestingCommunicator(*(_LEG_VISITS * nr_legs))
+    players = [Player(name, communicator=communicator) for name in _NAMES]
+    Session(players, NR_LEGS, log_parent=sessions_log, communicator=communicator).run()
+
+
+def _session_run(tmp_dir, seed):
+    return _play_session, (2 * NR_LEGS - 1) * len(_LEG_VISITS)
+
+
+def _session_save(tmp_dir, seed):
+    runs = itertools.count()
+
+    def run():
+        # every run saves to a new log. Every leg is saved, every visit is
+        # journaled
+        log_filepath = os.path.join(tmp_dir, f"session-save-{next(runs)}.xml")
+        sessions_log = Sessions(log_filepath=log_filepath)
+        _play_session(sessions_log)
+        sessions_log.close()
+
+    return run, 2 * NR_LEGS - 1
+
+
+class _SyntheticLog:
+    """Synthetic session log of `size` visits, written on first use."""
+
+    def __init__(self, log_filepath, size, seed):
+        self._log_filepath = log_filepath
+        self._size = size
+        self._seed = seed
+        self._nr_visits = None
+
+    def write(self):
+        """Write the log unless it was written. Return its filepath and
+        number of visits.
+        """
+        if self._nr_visits is None:
+            _, self._nr_visits = generate_log(
+                self._log_filepath,
+                self._size,
+                nr_players=LOG_PLAYERS,
+                since=LOG_SINCE,
+                until=LOG_UNTIL,
+                seed=self._seed,
+            )
+        return self._log_filepath, self._nr_visits
+
+
+def _sessions_load(log_filepath, nr_visits):
+
+    def run():
+        Sessions(log_filepath=log_filepath).close()
+
+    return run, nr_visits
+
+
+def _sessions_save(log_filepath, nr_visits):
+    save_filepath = log_filepath + ".save.xml"
+    with open(log_filepath, "rb") as source, open(save_filepath, "wb") as target:
+        target.write(source.read())
+    sessions_log = Sessions(log_filepath=save_filepath)
+    session = sessions_log._log_entry[0]
+
+    def run():
+        # a finished session is appended to the large log
+        sessions_log.append(copy.deepcopy(session))
+        sessions_log.save()
+
+    return run, 1
+
+
+def _analyze_sessions(log_filepath, nr_visits):
+    sessions_log = Sessions(log_filepath=log_filepath)
+
+    def run():
+        analyze_sessions(sessions_log._log_entry)
+
+    return run, nr_visits
+
+
+def _analyze_log_file(log_filepath, nr_visits):
+
+    def run():
+        analyze_log_file(log_filepath)
+
+    return run, nr_visits
+
+
+# benchmarks and factories returning the benchmarked function and its number
+# of operations
+_BENCHMARKS = [
+    ("process_score", _process_score),
+    ("score_valid", _score_valid),
+    ("finish_lookup", _finish_lookup),
+    ("session_run", _session_run),
+    ("session_save", _session_save),
+]
+_LOG_BENCHMARKS = [
+    ("sessions_load", _sessions_load),
+    ("sessions_save", _sessions_save),
+    ("analyze_sessions", _analyze_sessions),
+    ("analyze_log_file", _analyze_log_file),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pydartz.bench",
+        description="time the hot paths of games and statistics, and print the "
+        "results as JSON",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        metavar="N",
+        help="numbers of visits of the synthetic session logs (default: "
+        f"{' '.join(map(str, SIZES))})",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=REPEAT,
+        help=f"number of runs per benchmark (default: {REPEAT})",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=SEED, help=f"seed of the inputs (default: {SEED})"
+    )
+    parser.add_argument(
+        "-k", "--pattern", help="only run benchmarks whose name contains PATTERN"
+    )
+    parser.add_argument(
+        "-o", "--output", metavar="FILE", help="write the results to FILE"
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    report = run_benchmarks(args.sizes, args.repeat, args.seed, args.pattern)
+    print(
+        f"Ran {len(report['results'])} benchmarks in "
+        f"{time.perf_counter() - start:.1f} s.",
+        file=sys.stderr,
+    )
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
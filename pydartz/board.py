@@ -0,0 +1,83 @@
+"""Module describing the geometry of a standard dartboard.
+
+Positions are given in millimetres relative to the centre of the board, with
+the x axis pointing to the right and the y axis pointing up (towards the 20).
+Board positions are mapped to indices into `finishes.SEGMENTS`; positions off
+the scoring area map to `MISS`.
+
+Mapping positions requires the optional `numpy` dependency.
+"""
+
+import math
+
+from .finishes import SEGMENTS
+
+DOUBLE_BULL_RADIUS = 6.35
+SINGLE_BULL_RADIUS = 15.9
+TREBLE_INNER_RADIUS = 99.0
+TREBLE_OUTER_RADIUS = 107.0
+DOUBLE_INNER_RADIUS = 162.0
+DOUBLE_OUTER_RADIUS = 170.0
+
+# numbers in clockwise order, starting at the top
+NUMBERS = (20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5)
+SECTOR_ANGLE = 360 / len(NUMBERS)
+
+SEGMENT_INDEX = {s.name: i for i, s in enumerate(SEGMENTS)}
+# index of a dart that misses the scoring area
+MISS = len(SEGMENTS)
+
+
+def aim_point(segment_name):
+    """Return the centre of the area of the segment as (x, y) tuple. Singles
+    are aimed at the larger inner single area.
+    """
+    segment = SEGMENTS[SEGMENT_INDEX[segment_name]]
+    if segment.number == 25:
+        if segment.multiplier == 2:
+            return 0.0, 0.0
+        return 0.0, (DOUBLE_BULL_RADIUS + SINGLE_BULL_RADIUS) / 2
+
+    radius = {
+        1: (SINGLE_BULL_RADIUS + TREBLE_INNER_RADIUS) / 2,
+        2: (DOUBLE_INNER_RADIUS + DOUBLE_OUTER_RADIUS) / 2,
+        3: (TREBLE_INNER_RADIUS + TREBLE_OUTER_RADIUS) / 2,
+    }[segment.multiplier]
+    angle = math.radians(90 - SECTOR_ANGLE * NUMBERS.index(segment.number))
+    return radius * math.cos(angle), radius * math.sin(angle)
+
+
+def segment_indices(x, y):
+    """Map the positions given by the arrays `x` and `y` to an integer array
+    of indices into `finishes.SEGMENTS` (or `MISS`). Requires numpy.
+    """
+    import numpy as np
+
+    radius = np.hypot(x, y)
+    # clockwise angle from the top, shifted by half a sector s.t. sector 0 is
+    # centred on the 20
+    angle = (90 - np.degrees(np.arctan2(y, x)) + SECTOR_ANGLE / 2) % 360
+    sector = (angle // SECTOR_ANGLE).astype(np.intp) % len(NUMBERS)
+    # singles, doubles and trebles of 1 to 20 are stored at the offsets 0, 21
+    # and 42 of SEGMENTS
+    singles = np.array(NUMBERS)[sector] - 1
+
+    return np.select(
+        [
+            radius <= DOUBLE_BULL_RADIUS,
+            radius <= SINGLE_BULL_RADIUS,
+            radius <= TREBLE_INNER_RADIUS,
+            radius <= TREBLE_OUTER_RADIUS,
+            radius <= DOUBLE_INNER_RADIUS,
+            radius <= DOUBLE_OUTER_RADIUS,
+        ],
+        [
+            SEGMENT_INDEX["DB"],
+            SEGMENT_INDEX["SB"],
+            singles,
+            singles + SEGMENT_INDEX["T1"],
+            singles,
+            singles + SEGMENT_INDEX["D1"],
+        ],
+        default=MISS,
+    )
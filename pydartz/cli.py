@@ -3,43 +3,142 @@ import os
 import shutil
 import sys
 import time
+from datetime import datetime
 
 from . import __version__
-from .communication import INFO_FINISH, INFO_LEG, INFO_VISIT, CommunicatorBase
-from .database import Sessions, analyze_sessions
-from .finishes import FINISHES
+from .archive import analyze_history, compact_log
+from .columnar import export_log
+from .communication import (
+    INFO_FINISH,
+    INFO_LEG,
+    INFO_VISIT,
+    INFO_WIN,
+    CommunicatorBase,
+)
+from .database import LogEntryBase, Sessions
+from .finishes import lookup_index
 from .game import Game
+from .merge import merge_logs
+from .montecarlo import rank_routes
+from .policy import Policy
+from .rules import OUT_RULES, Rules
+from .storage import SqliteSessions, analyze_database, migrate_log
+from .tournament import FORMATS, ROUND_ROBIN, Tournament
+from .winprob import WinEstimator
 
 log_dir = os.path.expanduser("~/.local/share/pydartz")
 os.makedirs(log_dir, exist_ok=True)
 log_filepath = os.path.join(log_dir, "stats.xml")
 with open(log_filepath, "a"):
     pass
-sessions_log = Sessions(log_filepath=log_filepath)
+database_filepath = os.path.join(log_dir, "stats.sqlite")
 
 
 def main():
     args = vars(_parse_command())
     player_names = args.pop("stats", None)
+    window = {
+        key: args.pop(key) for key in ("since", "until", "last_sessions", "last_legs")
+    }
+    rules = Rules(
+        out=args.pop("out"), in_="double" if args.pop("double_in") else "straight"
+    )
+    use_database = os.path.exists(database_filepath)
+
+    if args.pop("migrate"):
+        if use_database:
+            sys.exit(f"Database {database_filepath} already exists.")
+        migrate_log(log_filepath, database_filepath)
+        sys.exit(0)
+
+    export_filepath = args.pop("export")
+    if export_filepath is not None:
+        if use_database:
+            sys.exit("Export is not supported for the SQLite database.")
+        try:
+            export_log(log_filepath, export_filepath)
+        except (ImportError, ValueError) as error:
+            sys.exit(f"Export failed: {error}")
+        sys.exit(0)
+
+    merge_filepaths = args.pop("merge")
+    if merge_filepaths is not None:
+        if use_database:
+            sys.exit("Merging is not supported for the SQLite database.")
+        try:
+            nr_written, nr_duplicates = merge_logs(
+                [log_filepath] + merge_filepaths, log_filepath
+            )
+        except (OSError, ValueError) as error:
+            sys.exit(f"Merge failed: {error}")
+        print(f"Merged {nr_written} sessions, skipped {nr_duplicates} duplicates.")
+        sys.exit(0)
+
+    if args.pop("compact"):
+        if use_database:
+            sys.exit("Compaction is not supported for the SQLite database.")
+        nr_archived = compact_log(log_filepath, before=window["until"])
+        print(f"Archived {nr_archived} sessions.")
+        sys.exit(0)
 
     if player_names is not None:
-        player_entries = analyze_sessions(sessions_log._log_entry)
-        for name, entry in player_entries.items():
-            if len(player_names) and name not in player_names:
-                continue
+        names = player_names or None
+        if use_database:
+            player_entries = analyze_database(database_filepath, names, **window)
+        else:
+            player_entries = analyze_history(log_filepath, names, **window)
+        for entry in player_entries.values():
             print(entry.information())
         sys.exit(0)
 
+    roster = args.pop("tournament")
+    tournament_options = {
+        key: args.pop(key) for key in ("format", "legs", "seed", "workers")
+    }
+    if roster is not None:
+        _run_tournament(dict(roster), rules, **tournament_options)
+        sys.exit(0)
+
+    sigma = args.pop("sigma")
+    win_probability = args.pop("win_probability")
+    if sigma is not None or win_probability:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            sys.exit("Run 'pip install -U pydartz[numpy]' for probabilities!")
+
+    win_estimator = None
+    if win_probability:
+        # players' skills are fitted from their history
+        if use_database:
+            player_entries = analyze_database(database_filepath)
+        else:
+            player_entries = analyze_history(log_filepath)
+        win_estimator = WinEstimator.from_entries(
+            player_entries, rules=rules, cache_dir=log_dir
+        )
+
     time.sleep(1)
     os.system("cls || clear")
     _display_banner()
 
-    g = Game(CliCommunicator(), sessions_log)
+    if use_database:
+        sessions_log = SqliteSessions(database_filepath)
+    else:
+        # a left-over journal of an interrupted game is replayed
+        sessions_log = Sessions(log_filepath=log_filepath)
+    communicator = CliCommunicator(
+        sigma=sigma, cache_dir=log_dir, win_estimator=win_estimator
+    )
+    g = Game(communicator, sessions_log, rules=rules)
     try:
         g.run()
         _play_ending_song()
     except KeyboardInterrupt:
         print("\n\nUser quit by pressing Ctrl-C. Good bye!")
+    finally:
+        # visits of an unfinished leg are kept in the journal
+        sessions_log.close()
 
 
 class CliCommunicator(CommunicatorBase):
@@ -47,8 +146,17 @@ class CliCommunicator(CommunicatorBase):
     Python's builtin 'input' method and that prints to stdout.
     """
 
-    def __init__(self):
+    def __init__(self, sigma=None, cache_dir=None, win_estimator=None):
         super().__init__(input, print)
+        # finish options per out-rule, score and remaining darts, rendered in
+        # advance
+        self._finish_options = {}
+        # accuracy for estimating the success probabilities of finish options,
+        # and for aiming policies per out-rule (stored in cache_dir)
+        self._sigma = sigma
+        self._cache_dir = cache_dir
+        self._policies = {}
+        self._win_estimator = win_estimator
 
     def print_info(self, message_type, **data):
         output = None
@@ -59,11 +167,21 @@ class CliCommunicator(CommunicatorBase):
             output = f"{player.name} has {player.score_left} and {info} left."
         elif message_type == INFO_FINISH:
             player = data["player"]
-            score_left = str(player.score_left)
-            if score_left in FINISHES:
-                output = "Finish options:"
-                for finish in FINISHES[score_left]:
-                    output += "\n\t" + " ".join(finish)
+            if player.opened:
+                output = self._render_finish_options(player)
+        elif message_type == INFO_WIN:
+            players = data["players"]
+            if self._win_estimator is not None and len(players) > 1:
+                probabilities = self._win_estimator.estimate(
+                    [(p.name, p.score_left) for p in players],
+                    data["next_player_index"],
+                    players[0].rules,
+                )
+                if probabilities is not None:
+                    output = "Chances: " + ", ".join(
+                        f"{p.name} {probability:.0%}"
+                        for p, probability in zip(players, probabilities)
+                    )
         elif message_type == INFO_LEG:
             players = data["players"]
             output = "\n".join(f"    {p.name}: {p.nr_won_legs:2d}" for p in players)
@@ -73,11 +191,83 @@ class CliCommunicator(CommunicatorBase):
         if output is not None:
             self._output_info_method(output)
 
+    def _render_finish_options(self, player):
+        rules = player.rules
+        if self._sigma is not None:
+            ranked_routes = rank_routes(
+                player.score_left, self._sigma, player.darts, rules
+            )
+            if ranked_routes:
+                return _render_ranked_finish_options(ranked_routes)
+            # no finish possible, advise a setup shot instead
+            if rules.out not in self._policies:
+                self._policies[rules.out] = Policy.open(
+                    self._sigma, rules, cache_dir=self._cache_dir
+                )
+            target = self._policies[rules.out].target(
+                player.score_left,
+                player.darts,
+                visit_start=player.score_left + player.visit_sum(),
+            )
+            return None if target is None else f"Aim at {target}."
+
+        if player.score_left > rules.checkouts.max_score:
+            return None
+        if rules.out not in self._finish_options:
+            self._finish_options[rules.out] = rules.checkouts.lookup_table(
+                _render_finish_options
+            )
+        return self._finish_options[rules.out][
+            lookup_index(player.score_left, player.darts)
+        ]
+
     def print_error(self, **data):
         output = str(data["error"])
         self._output_error_method(output)
 
 
+def _run_tournament(roster, rules, format, legs, seed, workers):
+    """Run a tournament of bots, printing the results of the matches as they
+    are completed, followed by the standings and the players' stats.
+    """
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        sys.exit("Run 'pip install -U pydartz[numpy]' for tournaments!")
+    try:
+        tournament = Tournament(
+            roster, legs, format, rules=rules, seed=seed, cache_dir=log_dir
+        )
+    except ValueError as error:
+        sys.exit(f"Tournament failed: {error}")
+
+    for result in tournament.run(max_workers=workers):
+        (first, second), (first_legs, second_legs) = result.players, result.legs_won
+        print(f"Match {result.number + 1}: {first} {first_legs}-{second_legs} {second}")
+
+    print(80 * "=")
+    print("    Player       Played  Won  Legs")
+    for rank, standing in enumerate(tournament.standings(), 1):
+        print(
+            f"{rank:2d}. {standing.name:12s} {standing.played:6d} {standing.won:4d}  "
+            f"{standing.legs_won}-{standing.legs_lost}"
+        )
+    print(80 * "=")
+    for entry in tournament.entries().values():
+        print(entry.information())
+
+
+def _render_finish_options(routes):
+    return "Finish options:" + "".join("\n\t" + " ".join(r) for r in routes)
+
+
+def _render_ranked_finish_options(ranked_routes):
+    return "Finish options:" + "".join(
+        f"\n\t{' '.join(route)} ({probability:.0%})"
+        for route, probability in ranked_routes
+    )
+
+
 def _parse_command():
     parser = argparse.ArgumentParser()
     parser.suggest_on_error = True
@@ -85,6 +275,112 @@ def _parse_command():
     parser.add_argument(
         "-s", "--stats", metavar="NAME", nargs="*", help="display player stats"
     )
+    parser.add_argument(
+        "--out",
+        choices=sorted(OUT_RULES),
+        default="double",
+        help="segments that end a leg: doubles (default), doubles and trebles "
+        "(master) or any segment (single)",
+    )
+    parser.add_argument(
+        "--double-in",
+        action="store_true",
+        help="players have to hit a double before their darts count",
+    )
+    parser.add_argument(
+        "--sigma",
+        type=float,
+        metavar="MM",
+        help="show success probabilities of finish options and setup shots for "
+        "throws scattering with a standard deviation of MM millimetres (requires "
+        "numpy)",
+    )
+    parser.add_argument(
+        "--win-probability",
+        action="store_true",
+        help="show the players' chances to win the leg after every visit, based "
+        "on their averages (requires numpy)",
+    )
+    parser.add_argument(
+        "--tournament",
+        type=_roster_entry,
+        metavar="NAME=AVERAGE",
+        nargs="+",
+        help="run a tournament of bots with the given three-dart averages "
+        "(requires numpy)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default=ROUND_ROBIN,
+        help="format of the tournament (default: round-robin)",
+    )
+    parser.add_argument(
+        "--legs",
+        type=_count,
+        default=1,
+        metavar="N",
+        help="number of legs to win a match of the tournament (default: 1)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="seed for reproducible tournaments, regardless of the number of "
+        "workers",
+    )
+    parser.add_argument(
+        "--workers",
+        type=_count,
+        metavar="N",
+        help="number of processes playing the matches of the tournament "
+        "(default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--since",
+        type=_timestamp,
+        metavar="DATE",
+        help="only include legs played since DATE (YYYY-MM-DD[THH:MM:SS])",
+    )
+    parser.add_argument(
+        "--until",
+        type=_timestamp,
+        metavar="DATE",
+        help="only include legs played before DATE (YYYY-MM-DD[THH:MM:SS])",
+    )
+    parser.add_argument(
+        "--last-sessions",
+        type=_count,
+        metavar="N",
+        help="only include the N most recent sessions",
+    )
+    parser.add_argument(
+        "--last-legs",
+        type=_count,
+        metavar="N",
+        help="only include the N most recent legs",
+    )
+    parser.add_argument(
+        "--export",
+        metavar="FILE",
+        help="export all visits of the log as columns into a .npz or .csv file",
+    )
+    parser.add_argument(
+        "--merge",
+        metavar="LOG",
+        nargs="+",
+        help="merge the sessions of other logs (e.g. of other boards) into the log",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="move sessions of past months (before the month of --until, if "
+        "given) into compressed archive segments",
+    )
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="copy the XML log into a SQLite database that is used from then on",
+    )
     parser.add_argument(
         "-V",
         "--version",
@@ -96,6 +392,27 @@ def _parse_command():
     return parser.parse_args()
 
 
+def _timestamp(value):
+    """Convert a date given on the command line to a log timestamp."""
+    return datetime.fromisoformat(value).strftime(LogEntryBase.DT_FORMAT)
+
+
+def _count(value):
+    """Convert a positive number (e.g. of legs) given on the command line."""
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"Expected a positive number, got {value}")
+    return count
+
+
+def _roster_entry(value):
+    """Convert a bot given on the command line to a (name, average) pair."""
+    name, _, average = value.rpartition("=")
+    if not name:
+        raise argparse.ArgumentTypeError(f"Expected NAME=AVERAGE, got {value!r}")
+    return name, float(average)
+
+
 def _display_banner():
     terminal_width = shutil.get_terminal_size((80, 20)).columns
     if terminal_width < 94:
@@ -0,0 +1,214 @@
+"""Module for exporting the session log into columnar arrays of visits and for
+analyzing them with vectorized operations.
+
+Every visit is a row with the columns listed in `COLUMNS`. Players are stored
+as IDs into the list of player names, sessions and legs are numbered
+consecutively throughout the history (archived sessions first, see
+`archive.compact_log`), and timestamps are stored as integers of the form
+YYYYMMDDHHMMSS. The finishing visit of the winner of a leg is flagged.
+The NumPy-backed analysis requires the optional `numpy` dependency.
+"""
+
+import csv
+from array import array
+from collections import Counter
+
+from .archive import iter_history
+from .database import PlayerEntry
+
+COLUMNS = (
+    "player",
+    "session",
+    "leg",
+    "visit",
+    "points",
+    "throws",
+    "timestamp",
+    "finish",
+)
+_TYPECODES = dict(
+    player="L",
+    session="L",
+    leg="L",
+    visit="H",
+    points="H",
+    throws="B",
+    timestamp="q",
+    finish="B",
+)
+
+
+def export_columns(log_filepath, archive_dir=None):
+    """Convert the sessions of the log at `log_filepath` and the sessions
+    archived in `archive_dir` (default: see `archive.default_archive_dir`)
+    into columns. Log and archive segments are parsed incrementally.
+    Return a dict mapping column names to arrays, and the item 'players' to
+    the list of player names (indexed by player ID).
+    """
+    columns = {name: array(_TYPECODES[name]) for name in COLUMNS}
+    player_ids = {}
+    nr_legs = 0
+
+    sessions = iter_history(log_filepath, archive_dir)
+    for session_number, session in enumerate(sessions):
+        for name in session.get("players").split(","):
+            player_ids.setdefault(name, len(player_ids))
+
+        for leg in session:
+            final_number = -1 if leg.get("aborted") else len(leg) - 1
+            for visit_number, visit in enumerate(leg):
+                columns["player"].append(player_ids[visit.get("player")])
+                columns["session"].append(session_number)
+                columns["leg"].append(nr_legs)
+                columns["visit"].append(visit_number)
+                columns["points"].append(int(visit.get("points")))
+                columns["throws"].append(int(visit.get("throws")))
+                columns["timestamp"].append(
+                    int(visit.get("timestamp").replace("-", ""))
+                )
+                columns["finish"].append(visit_number == final_number)
+            nr_legs += 1
+
+    columns["players"] = list(player_ids)
+    return columns
+
+
+def write_csv(columns, filepath):
+    """Write the visit columns to a CSV file with header. Player IDs are
+    replaced by player names.
+    """
+    names = columns["players"]
+    with open(filepath, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for row in zip(*(columns[c] for c in COLUMNS)):
+            writer.writerow((names[row[0]],) + row[1:])
+
+
+def write_npz(columns, filepath):
+    """Write the visit columns to a compressed NumPy archive. Requires numpy."""
+    import numpy as np
+
+    np.savez_compressed(
+        filepath,
+        players=np.array(columns["players"], dtype=str),
+        **{c: np.frombuffer(columns[c], dtype=columns[c].typecode) for c in COLUMNS},
+    )
+
+
+def load_npz(filepath):
+    """Load visit columns written by `write_npz`. Requires numpy."""
+    import numpy as np
+
+    with np.load(filepath) as data:
+        columns = {c: data[c] for c in COLUMNS}
+        columns["players"] = data["players"].tolist()
+    return columns
+
+
+def export_log(log_filepath, filepath, archive_dir=None):
+    """Export the log at `log_filepath`, including its archive (see
+    `export_columns`), to `filepath`. The format is chosen by the file
+    extension ('.npz' or '.csv').
+    """
+    if filepath.endswith(".npz"):
+        write = write_npz
+    elif filepath.endswith(".csv"):
+        write = write_csv
+    else:
+        raise ValueError(f"Unsupported export format: {filepath}")
+    write(export_columns(log_filepath, archive_dir), filepath)
+
+
+def analyze_columns(columns, names=None):
+    """Analyze visit columns (as returned by `export_columns` or `load_npz`).
+    Return a dict of PlayerEntrys, analogous to `database.analyze_sessions`.
+    If an iterable of player `names` is given, only these players are
+    analyzed.
+
+    Statistics are computed by vectorized group-bys if numpy is installed;
+    otherwise the visits are processed one by one.
+    """
+    if names is not None:
+        names = set(names)
+    selected = [n for n in columns["players"] if names is None or n in names]
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return _analyze_visits(columns, selected)
+    return _analyze_columns_numpy(columns, selected)
+
+
+def _analyze_visits(columns, selected):
+    """Compute player statistics by processing the visits one by one."""
+    players = {name: PlayerEntry(name) for name in selected}
+    legs = columns["leg"]
+    leg_throws = Counter()
+    rows = zip(
+        columns["player"], legs, columns["points"], columns["throws"], columns["finish"]
+    )
+    for number, (player_id, leg, points, throws, finish) in enumerate(rows):
+        name = columns["players"][player_id]
+        leg_throws[name] += throws
+        if name in players:
+            darter = leg_throws[name] if finish else None
+            players[name].update(points=points, throws=throws, darter=darter)
+        if number + 1 == len(legs) or legs[number + 1] != leg:
+            leg_throws.clear()
+
+    return players
+
+
+def _analyze_columns_numpy(columns, selected):
+    """Compute player statistics with vectorized group-bys."""
+    import numpy as np
+
+    player_names = columns["players"]
+    nr_players = len(player_names)
+    nr_points = PlayerEntry.MAX_VISIT_POINTS + 1
+    player = np.asarray(columns["player"], dtype=np.int64)
+    leg = np.asarray(columns["leg"], dtype=np.int64)
+    points = np.asarray(columns["points"], dtype=np.int64)
+    throws = np.asarray(columns["throws"], dtype=np.int64)
+    final = np.asarray(columns["finish"], dtype=bool)
+    if (points > PlayerEntry.MAX_VISIT_POINTS).any():
+        raise ValueError(f"Invalid visit points: {points.max()}")
+
+    total_throws = np.bincount(player, weights=throws, minlength=nr_players)
+    histogram = np.bincount(
+        player * nr_points + points, minlength=nr_players * nr_points
+    ).reshape(nr_players, nr_points)
+    finishes = np.bincount(
+        player[final] * nr_points + points[final], minlength=nr_players * nr_points
+    ).reshape(nr_players, nr_points)
+
+    # X-darter: sum of throws of the winner within the finished leg
+    groups, group_index = np.unique(leg * nr_players + player, return_inverse=True)
+    group_throws = np.bincount(group_index, weights=throws, minlength=len(groups))
+    darters = np.stack(
+        [player[final], group_throws[group_index[final]].astype(np.int64)]
+    )
+    darter_pairs, darter_counts = np.unique(darters, axis=1, return_counts=True)
+
+    player_ids = {name: i for i, name in enumerate(player_names)}
+    stats = {}
+    for name in selected:
+        player_id = player_ids[name]
+        stats[name] = dict(
+            throws=int(total_throws[player_id]),
+            points=_counts(histogram[player_id]),
+            finishes=_counts(finishes[player_id]),
+            darters=Counter(),
+        )
+    for (player_id, darter), count in zip(darter_pairs.T, darter_counts):
+        name = player_names[player_id]
+        if name in stats:
+            stats[name]["darters"][int(darter)] = int(count)
+
+    return {name: PlayerEntry(name, stats[name]) for name in selected}
+
+
+def _counts(histogram):
+    """Convert a histogram array into a Counter of its non-zero bins."""
+    return Counter({int(i): int(histogram[i]) for i in histogram.nonzero()[0]})
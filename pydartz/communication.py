@@ -3,7 +3,7 @@
 from abc import ABCMeta, abstractmethod
 from collections import deque
 
-INFO_VISIT, INFO_FINISH, INFO_LEG = range(3)
+INFO_VISIT, INFO_FINISH, INFO_LEG, INFO_WIN = range(4)
 (
     INPUT_NR_PLAYERS,
     INPUT_START_VALUE,
@@ -113,6 +113,25 @@ class TestingCommunicator(CommunicatorBase):
         raise data["error"]
 
 
+class SilentCommunicator(CommunicatorBase):
+    """Communicator for headless games, e.g. of bots (see `simulation.Bot`).
+    It does not provide any input and does not display anything.
+    """
+
+    def __init__(self):
+        def no_input(prompt):
+            raise SanitizationError("Silent communicator does not provide input.")
+
+        super().__init__(no_input, lambda _: None)
+
+    def print_info(self, message_type, **data):
+        """Does not do anything."""
+
+    def print_error(self, **data):
+        """Does not display any text. Re-raises any exception being passed."""
+        raise data["error"]
+
+
 def sanitized_input(ui, type_=str, min_=None, max_=None, choices=None):
     """Helper method to retrieve sanitized user input.
     Attempts conversion to requested type and validates the input.
@@ -1,10 +1,23 @@
 import contextlib
+import copy
+import json
+import mmap
 import os.path
 import time
+import zlib
 from abc import ABCMeta
+from array import array
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 from xml.etree import ElementTree as etree
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # journals are not locked on platforms without fcntl
+    fcntl = None
+
 
 class LogEntryBase:
     """Abstract base class for all classes that are supposed to support
@@ -39,65 +52,495 @@ class LogEntryBase:
         self._log_entry.append(child_log_entry)
 
     def save(self):
-        with contextlib.suppress(AttributeError):
-            # parent is e.g. None or a list
-            self._parent.save()
+        # parent is e.g. None or a list which cannot be saved
+        save = getattr(self._parent, "save", None)
+        if save is not None:
+            save()
+
+    def journal(self, *child_log_entries):
+        """Pass the log entry together with the log entries of its children
+        on to the parent, s.t. the top-most log entry can journal them.
+        """
+        journal = getattr(self._parent, "journal", None)
+        if journal is not None:
+            journal(self._log_entry, *child_log_entries)
+
+
+def to_timestamp(value):
+    """Convert a datetime or date object to a timestamp formatted acc. to
+    `LogEntryBase.DT_FORMAT`. Strings are returned unchanged.
+    """
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if isinstance(value, datetime):
+        return value.strftime(LogEntryBase.DT_FORMAT)
+    return value
 
 
 class Sessions(LogEntryBase):
     """Wrapper around the top-most XML-log element 'sessions'. Does not have a
     parent.
+
+    Saving is incremental: sessions that already are on disk are not written
+    again. Only legs appended to the last saved session and new sessions are
+    written, starting at the position of the closing tag(s) at the end of the
+    file. Hence the cost of saving does not grow with the size of the log.
+    If the complete log has to be written, a temporary file is written and
+    renamed.
+
+    Every visit is recorded in a journal file next to the log, s.t. visits of
+    legs that were not saved (e.g. due to a crash or power cut) are not lost.
+    Journal records are flushed immediately but synced to disk at most every
+    `JOURNAL_SYNC_INTERVAL` seconds. On initialization, a left-over journal is
+    replayed into the log. Legs that were not finished are marked as aborted.
+    The journal is locked while it is open for writing, hence the journal of
+    a game in progress is never replayed by another process. Only the
+    instance holding the journal clears it after saving.
     """
 
+    ROOT_START = b"<?xml version='1.0' encoding='utf-8'?>\n<sessions>"
+    ROOT_END = b"</sessions>"
+    SESSION_END = b"</session>"
+    JOURNAL_SYNC_INTERVAL = 1.0
+
     def __init__(self, log_filepath=None, **kwargs):
-        """Parse existing tree from filepath or create new sessions element."""
+        """Parse existing tree from filepath or create new sessions element.
+        Replay the journal if it is not empty and not locked by a game in
+        progress.
+        """
+        self._log_filepath = log_filepath
+        self._journal_file = None
+        self._last_sync = 0.0
+        records = self._read_journal()
+
         if (
             log_filepath is not None
             and os.path.exists(log_filepath)
             and os.path.getsize(log_filepath) > 0
         ):
-            self._log_entry = etree.parse(log_filepath).getroot()
+            self._log_entry = self._parse_log(records)
+            self._locate_tail()
+            self._open_session_index()
         else:
             self._log_entry = etree.Element("sessions")
-        self._log_filepath = log_filepath
+            self._tail_offset = None
+            self._session_index = None
+
+        if records:
+            self._replay_journal(records)
+            self.save()
+        else:
+            self.close()
+
+    @property
+    def _journal_filepath(self):
+        return self._log_filepath + ".journal"
+
+    def _parse_log(self, records):
+        """Parse the log file. If parsing fails because saving was interrupted,
+        the state before saving is restored using the last save record of the
+        journal.
+        """
+        try:
+            return etree.parse(self._log_filepath).getroot()
+        except etree.ParseError:
+            saves = [r for r in records if r.get("offset") is not None]
+            if not saves:
+                raise
+
+        with open(self._log_filepath, "r+b") as file:
+            file.seek(saves[-1]["offset"])
+            file.write(saves[-1]["tail"].encode())
+            file.truncate()
+        return etree.parse(self._log_filepath).getroot()
+
+    def _locate_tail(self):
+        """Determine the offset of the closing tag(s) at the end of the log
+        file. If the file ends with a session element that holds legs, the
+        offset of the session's closing tag is stored s.t. the session can be
+        extended in place. Otherwise the offset is set to None which results
+        in the complete log being written on the next save.
+        """
+        with open(self._log_filepath, "rb") as file:
+            size = file.seek(0, os.SEEK_END)
+            file.seek(max(0, size - 64))
+            tail = file.read()
+
+        stripped_tail = tail.rstrip()
+        self._file_size = size
+        self._nr_saved = len(self._log_entry)
+        self._nr_saved_legs = len(self._log_entry[-1]) if self._nr_saved else 0
+        self._extendable = False
+        self._tail_offset = None
+
+        if not stripped_tail.endswith(self.ROOT_END):
+            return
+        self._tail_offset = size - len(tail) + len(stripped_tail) - len(self.ROOT_END)
+        if self._nr_saved_legs and stripped_tail.endswith(
+            self.SESSION_END + self.ROOT_END
+        ):
+            self._tail_offset -= len(self.SESSION_END)
+            self._extendable = True
 
     def save(self):
-        """Write the `log_entry` XML object to disk."""
-        if self._log_filepath is not None:
+        """Write the `log_entry` XML object to disk and clear the journal."""
+        if self._log_filepath is None:
+            return
+
+        if self._can_append():
+            self._append()
+        else:
+            self._write_journal_record(dict(offset=None), sync=True)
+            tmp_filepath = self._log_filepath + ".tmp"
             tree = etree.ElementTree(self._log_entry)
-            tree.write(self._log_filepath, xml_declaration=True, encoding="utf-8")
+            with open(tmp_filepath, "wb") as file:
+                tree.write(file, xml_declaration=True, encoding="utf-8")
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_filepath, self._log_filepath)
+            self._locate_tail()
+            self._open_session_index(rebuild=True)
+
+        self._clear_journal()
+
+    def _append(self):
+        """Write the legs and sessions that were not saved yet at the end of
+        the log file.
+        """
+        new_legs = []
+        if self._extendable:
+            new_legs = list(self._log_entry[self._nr_saved - 1])
+            del new_legs[: self._nr_saved_legs]
+        new_sessions = list(self._log_entry)
+        del new_sessions[: self._nr_saved]
+        if not (new_legs or new_sessions):
+            return
+
+        chunks = [_serialize(leg) for leg in new_legs]
+        if self._extendable:
+            chunks.append(self.SESSION_END)
+        chunks.extend(_serialize(s) for s in new_sessions)
+        chunks.append(self.ROOT_END)
+
+        log_stat = os.stat(self._log_filepath)
+        # the replaced tail allows to restore the log if writing is interrupted
+        tail = (self.SESSION_END if self._extendable else b"") + self.ROOT_END
+        self._write_journal_record(
+            dict(offset=self._tail_offset, tail=tail.decode()), sync=True
+        )
+        data = b"".join(chunks)
+        with open(self._log_filepath, "r+b") as file:
+            file.seek(self._tail_offset)
+            file.write(data)
+            file.truncate()
+            self._file_size = file.tell()
+            file.flush()
+            os.fsync(file.fileno())
+        self._update_session_index(data, len(new_legs), new_sessions)
+        _stamp_cache(self._log_filepath, log_stat)
+
+        last = self._log_entry[-1]
+        self._nr_saved = len(self._log_entry)
+        self._nr_saved_legs = len(last)
+        self._tail_offset = self._file_size - len(self.ROOT_END)
+        self._extendable = chunks[-2].endswith(self.SESSION_END) and not last.tail
+        if self._extendable:
+            self._tail_offset -= len(self.SESSION_END)
+
+    def _open_session_index(self, rebuild=False):
+        """Load the sidecar index of the log file, or build and write it."""
+        # imported here since the index module depends on this module
+        from .index import SessionIndex
+
+        if rebuild:
+            self._session_index = SessionIndex.build(self._log_filepath)
+            self._session_index.dump(self._log_filepath)
+        else:
+            self._session_index = SessionIndex.open(self._log_filepath)
+
+    def _update_session_index(self, data, nr_new_legs, new_sessions):
+        """Update the sidecar index after `data` was written at the tail offset
+        of the log file, extending the last saved session by `nr_new_legs` legs
+        (if it is extendable) and adding the `new_sessions`.
+        """
+        index = self._session_index
+        if len(index) != self._nr_saved:
+            self._open_session_index(rebuild=True)
+            return
+
+        first = len(index)
+        if self._extendable:
+            first -= 1
+            end = self._tail_offset + data.find(self.SESSION_END)
+            index.update(
+                first, end + len(self.SESSION_END), index.nr_legs(first) + nr_new_legs
+            )
+        for (start, end), session in zip(_iter_session_spans(data), new_sessions):
+            index.add(
+                session.get("timestamp"),
+                self._tail_offset + start,
+                self._tail_offset + end,
+                len(session),
+            )
+        index.dump(self._log_filepath, first)
+
+    def _can_append(self):
+        """Check whether the log can be saved incrementally, i.e. whether the
+        log file was not modified by others and whether all modifications of
+        the log entry happened after the last saved session.
+        """
+        if self._tail_offset is None or self._nr_saved > len(self._log_entry):
+            return False
+        if (
+            not os.path.exists(self._log_filepath)
+            or os.path.getsize(self._log_filepath) != self._file_size
+        ):
+            return False
+        if self._nr_saved and not self._extendable:
+            return len(self._log_entry[self._nr_saved - 1]) == self._nr_saved_legs
+        return True
+
+    def journal(self, session, leg, visit):
+        """Record a visit together with the identifying attributes of its
+        session and leg in the journal.
+        """
+        if self._log_filepath is None:
+            return
+
+        if self._journal_file is None:
+            self._open_journal()
+        self._write_journal_record(
+            dict(
+                session=session.get("timestamp"),
+                players=session.get("players"),
+                leg=leg.get("timestamp"),
+                visit=dict(visit.attrib),
+            )
+        )
+
+    def _write_journal_record(self, record, sync=False):
+        """Append a record to the journal, if it was opened. The journal is
+        synced if requested or if the last sync is older than
+        `JOURNAL_SYNC_INTERVAL`.
+        """
+        if self._journal_file is None:
+            return
+
+        self._journal_file.write(json.dumps(record) + "\n")
+        self._journal_file.flush()
+        now = time.monotonic()
+        if sync or now - self._last_sync >= self.JOURNAL_SYNC_INTERVAL:
+            os.fsync(self._journal_file.fileno())
+            self._last_sync = now
+
+    def _open_journal(self):
+        """Open and lock the journal for writing. If another instance is
+        replaying the journal, wait until it was cleared.
+        """
+        while True:
+            file = open(self._journal_filepath, "a")
+            _lock(file)
+            if _is_linked(file, self._journal_filepath):
+                self._journal_file = file
+                return
+            file.close()
+
+    def _read_journal(self):
+        """Read the records of the journal. An incompletely written last
+        record is ignored. A journal locked by a game in progress is not
+        read. Otherwise the journal stays locked until it is cleared after
+        replaying or closed.
+        """
+        records = []
+        if self._log_filepath is None:
+            return records
+
+        try:
+            file = open(self._journal_filepath, "r+")
+        except FileNotFoundError:
+            return records
+        if not (
+            _lock(file, blocking=False) and _is_linked(file, self._journal_filepath)
+        ):
+            file.close()
+            return records
+
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+        # save records are appended after the last complete record
+        file.seek(0, os.SEEK_END)
+        self._journal_file = file
+        return records
+
+    def _replay_journal(self, records):
+        """Add the visits of the journal records to the log entry. Legs that
+        are already contained in the log are skipped. Legs that were not
+        followed by a save record are marked as aborted.
+        """
+        sessions = {}
+        replayed_legs = {}
+        unsaved_legs = []
+        for record in records:
+            if "visit" not in record:
+                unsaved_legs.clear()
+                continue
+
+            key = record["session"], record["players"]
+            if key not in sessions:
+                sessions[key] = next(
+                    (
+                        s
+                        for s in reversed(self._log_entry)
+                        if (s.get("timestamp"), s.get("players")) == key
+                    ),
+                    None,
+                )
+                if sessions[key] is None:
+                    sessions[key] = etree.SubElement(
+                        self._log_entry,
+                        "session",
+                        timestamp=record["session"],
+                        players=record["players"],
+                    )
+            session = sessions[key]
+
+            leg_key = key + (record["leg"],)
+            if leg_key not in replayed_legs:
+                if any(leg.get("timestamp") == record["leg"] for leg in session):
+                    replayed_legs[leg_key] = None
+                else:
+                    leg = etree.SubElement(session, "leg", timestamp=record["leg"])
+                    replayed_legs[leg_key] = leg
+                    unsaved_legs.append(leg)
+            if replayed_legs[leg_key] is not None:
+                etree.SubElement(replayed_legs[leg_key], "visit", record["visit"])
+
+        for leg in unsaved_legs:
+            leg.set("aborted", "1")
+
+    def _clear_journal(self):
+        """Remove the journal if it is held by this instance. The file is
+        removed before it is unlocked.
+        """
+        if self._journal_file is None:
+            return
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._journal_filepath)
+        self._journal_file.close()
+        self._journal_file = None
+
+    def close(self):
+        """Sync, unlock and close the journal."""
+        if self._journal_file is not None:
+            os.fsync(self._journal_file.fileno())
+            self._journal_file.close()
+            self._journal_file = None
+
+
+def replay_journal(log_filepath):
+    """Replay a left-over journal of the log at `log_filepath`, e.g. after the
+    program was interrupted during a leg. The journal of a game in progress is
+    not replayed.
+    """
+    journal_filepath = log_filepath + ".journal"
+    if os.path.exists(journal_filepath) and os.path.getsize(journal_filepath) > 0:
+        Sessions(log_filepath=log_filepath).close()
+
+
+def _lock(file, blocking=True):
+    """Lock `file` exclusively until it is closed. Return whether it was
+    locked.
+    """
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _is_linked(file, filepath):
+    """Check whether the open `file` still is the file at `filepath`, i.e. it
+    was not removed or replaced meanwhile.
+    """
+    try:
+        return os.path.samestat(os.fstat(file.fileno()), os.stat(filepath))
+    except FileNotFoundError:
+        return False
 
 
 class PlayerEntry:
     """A container to facilitate evaluation of player statistics.
 
-    It stores the player's total throws, points (visit per visit for e.g.
-    histogram evaluation), finishes and darters.
-    Some basic update and query methods are implemented.
+    It stores the player's total throws, finishes and darters. Visit points
+    are stored as histogram (number of visits per score from 0 to 180),
+    together with the running total and highscore. Hence all queries take
+    constant time, and memory consumption does not grow with the number of
+    visits.
+    Some basic update, query and merge methods are implemented.
     """
 
+    MAX_VISIT_POINTS = 180
+
     def __init__(self, name=None, player_stats=None):
         self._name = name
         self._throws = 0
-        self._points = []
+        self._points = array("Q", [0]) * (self.MAX_VISIT_POINTS + 1)
+        self._nr_visits = 0
+        self._total_points = 0
+        self._highscore = 0
         self._finishes = Counter()
         self._darters = Counter()
 
         if player_stats:
             self._throws = player_stats["throws"]
-            self._points = player_stats["points"]
+            points = player_stats["points"]
+            # histogram or, as formerly used, list of points visit per visit
+            if not isinstance(points, dict):
+                points = Counter(points)
+            for visit_points, count in points.items():
+                self._add_visits(int(visit_points), count)
             self._finishes = player_stats["finishes"]
             self._darters = player_stats["darters"]
 
     def update(self, throws=0, points=0, darter=None):
         self._throws += throws
-        self._points.append(points)
+        self._add_visits(points)
 
         # only called if current player won. Points of last leg are passed
         if darter is not None:
             self._finishes[points] += 1
             self._darters[darter] += 1
 
+    def _add_visits(self, points, count=1):
+        if not 0 <= points <= self.MAX_VISIT_POINTS:
+            raise ValueError(f"Invalid visit points: {points}")
+        if not count:
+            return
+        self._points[points] += count
+        self._nr_visits += count
+        self._total_points += count * points
+        self._highscore = max(self._highscore, points)
+
+    def merge(self, other):
+        """Add the statistics of the PlayerEntry `other` to this one. Merging is
+        associative and commutative. Returns the updated entry.
+        """
+        self._throws += other._throws
+        for points, count in enumerate(other._points):
+            if count:
+                self._points[points] += count
+        self._nr_visits += other._nr_visits
+        self._total_points += other._total_points
+        self._highscore = max(self._highscore, other._highscore)
+        self._finishes.update(other._finishes)
+        self._darters.update(other._darters)
+        return self
+
     def update_from_log(self, log_element):
         """Convenience method to update from a `xml.etree._Element` visit."""
         self.update(
@@ -109,7 +552,7 @@ class PlayerEntry:
         return {
             self._name: dict(
                 throws=self._throws,
-                points=self._points,
+                points=self.distribution(),
                 finishes=self._finishes,
                 darters=self._darters,
             )
@@ -121,7 +564,17 @@ class PlayerEntry:
         return -1
 
     def total_points(self):
-        return sum(self._points)
+        return self._total_points
+
+    def highscore(self):
+        return self._highscore
+
+    def nr_visits(self):
+        return self._nr_visits
+
+    def distribution(self):
+        """Returns a Counter mapping visit points to number of visits."""
+        return Counter({p: c for p, c in enumerate(self._points) if c})
 
     @property
     def throws(self):
@@ -132,7 +585,7 @@ class PlayerEntry:
             self._name + ":",
             f"Legs won: {sum(self._finishes.values())}",
             f"Average: {3 * self.average():.2f}",
-            f"Highscore: {max(self._points):3d}",
+            f"Highscore: {self._highscore:3d}",
             "Finishes:",
         ]
         for finish in sorted(self._finishes)[::-1]:
@@ -144,37 +597,459 @@ class PlayerEntry:
         return "\n".join(info)
 
 
-def analyze_sessions(sessions):
+def analyze_sessions(sessions, names=None):
     """Analyze a `xml.etree._Element` sessions object.
 
-    First all player names occurring are collected and a dict of PlayerEntrys
-    is built.
-    It is iterated over every session played so far. For every visit, the
-    corresponding PlayerEntry is updated. The data of the last visit of a leg
-    is used to update the winner's finishes and darters.
+    It is iterated over every session played so far. A PlayerEntry is created
+    the first time a player name occurs. For every visit, the corresponding
+    PlayerEntry is updated. The data of the last visit of a leg is used to
+    update the winner's finishes and darters.
+    If an iterable of player `names` is given, only these players are
+    analyzed, and sessions without any of them are skipped.
     """
-    player_names = set()
+    if names is not None:
+        names = set(names)
+
+    players = {}
     for session in sessions:
-        for name in session.get("players").split(","):
-            player_names.add(name)
+        _analyze_session(session, players, names)
+
+    return players
 
-    players = {name: PlayerEntry(name) for name in player_names}
 
+def analyze_log_file(log_filepath, names=None):
+    """Analyze the sessions log at `log_filepath` in a single pass without
+    building the complete tree in memory.
+
+    If an iterable of player `names` is given, only these players are
+    analyzed. Sessions without any of them are skipped without being parsed.
+    """
+    if names is None:
+        sessions = iter_log_file(log_filepath)
+    else:
+        names = set(names)
+        sessions = _iter_mapped_sessions(log_filepath, names=names)
+
+    players = {}
     for session in sessions:
-        for leg in session:
-            winner_name = leg[-1].get("player")
-            winner = players[winner_name]
-            winner_old_throws = winner.throws
-
-            for visit in leg[:-1]:
-                name = visit.get("player")
-                player_entry = players[name]
-                player_entry.update_from_log(visit)
-
-            final_throws = int(leg[-1].get("throws"))
-            final_points = int(leg[-1].get("points"))
-            # X-darter per player
-            visit_throws = final_throws + winner.throws - winner_old_throws
-            winner.update(points=final_points, throws=final_throws, darter=visit_throws)
+        _analyze_session(session, players, names)
+
+    return players
+
+
+def analyze_log_files(log_filepaths, names=None, max_workers=None, shard_size=None):
+    """Analyze the sessions logs at `log_filepaths` in parallel.
+
+    Every log file is split into shards of approx. `shard_size` bytes (default:
+    4 MiB) at session boundaries. The shards are analyzed by a pool of
+    `max_workers` processes (default: number of CPUs), and the partial results
+    are merged in order. Hence the results are identical to the ones of a
+    sequential analysis.
+    If an iterable of player `names` is given, only these players are
+    analyzed.
+    """
+    if names is not None:
+        names = set(names)
+    if shard_size is None:
+        shard_size = 4 * 1024 * 1024
+
+    shards = []
+    for log_filepath in log_filepaths:
+        offsets = _shard_offsets(log_filepath, shard_size)
+        shards.extend((log_filepath, s, e) for s, e in zip(offsets, offsets[1:]))
+
+    players = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_analyze_shard, log_filepath, start, end, names)
+            for log_filepath, start, end in shards
+        ]
+        for future in futures:
+            for name, entry in future.result().items():
+                if name in players:
+                    players[name].merge(entry)
+                else:
+                    players[name] = entry
 
     return players
+
+
+def _shard_offsets(log_filepath, shard_size):
+    """Return a list of byte offsets splitting the log at `log_filepath` into
+    shards of approx. `shard_size` bytes. Every offset but the last one (the
+    file size) is the beginning of a session element.
+    """
+    size = os.path.getsize(log_filepath)
+    if size == 0:
+        return []
+
+    offsets = [0]
+    with (
+        open(log_filepath, "rb") as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+    ):
+        position = buffer.find(b"<session ", shard_size)
+        while position != -1:
+            offsets.append(position)
+            position = buffer.find(b"<session ", position + shard_size)
+    offsets.append(size)
+    return offsets
+
+
+def _analyze_shard(log_filepath, start, end, names):
+    """Analyze the sessions of the log at `log_filepath` beginning in the byte
+    range [`start`, `end`). Executed in worker processes.
+    """
+    players = {}
+    for session in _iter_mapped_sessions(log_filepath, start, end, names):
+        _analyze_session(session, players, names)
+    return players
+
+
+CACHE_VERSION = 3
+
+
+def analyze_log_file_cached(log_filepath, cache_filepath=None, names=None):
+    """Analyze the sessions log at `log_filepath` using a sidecar cache of
+    player statistics at `cache_filepath` (default: the log filepath with
+    '.cache' appended).
+
+    The cache holds the aggregated statistics of all sessions but the last one,
+    stamped with a watermark: the number of processed sessions, the timestamp
+    of the last processed one, the byte offset of the following session, and
+    size and mtime of the log file. Only the sessions after the watermark are
+    analyzed and folded into the cached statistics. If the data preceding the
+    watermark was edited, the cache is rebuilt.
+    If an iterable of player `names` is given, only the statistics of these
+    players are returned. The cache always holds the statistics of all
+    players.
+    """
+    if os.path.getsize(log_filepath) == 0:
+        return {}
+    if cache_filepath is None:
+        cache_filepath = log_filepath + ".cache"
+
+    players, nr_sessions, timestamp, offset, checksum = {}, 0, None, 0, 0
+    cache = _load_cache(cache_filepath)
+    if cache is not None and _watermark_valid(log_filepath, cache):
+        players = _entries_from_json(cache["players"])
+        nr_sessions, timestamp, offset, checksum = (
+            cache["nr_sessions"],
+            cache["timestamp"],
+            cache["offset"],
+            cache["checksum"],
+        )
+
+    last_session = None
+    for session in iter_log_file(log_filepath, offset=offset):
+        if last_session is not None:
+            _analyze_session(last_session, players)
+            nr_sessions += 1
+            timestamp = last_session.get("timestamp")
+        last_session = session
+
+    if last_session is None:
+        return {n: e for n, e in players.items() if names is None or n in names}
+
+    with open(log_filepath, "rb") as file:
+        last_offset = _last_session_offset(file)
+    # the checksum of the cached data is extended by the newly cached sessions
+    checksum = _checksum(log_filepath, last_offset, offset, checksum)
+    offset = last_offset
+    _dump_json(
+        cache_filepath,
+        dict(
+            version=CACHE_VERSION,
+            nr_sessions=nr_sessions,
+            timestamp=timestamp,
+            offset=offset,
+            checksum=checksum,
+            size=os.path.getsize(log_filepath),
+            mtime=os.stat(log_filepath).st_mtime_ns,
+            players=_entries_to_json(players),
+        ),
+    )
+
+    if names is not None:
+        names = set(names)
+        players = {n: e for n, e in players.items() if n in names}
+    players = copy.deepcopy(players)
+    _analyze_session(last_session, players, names)
+    return players
+
+
+def _load_cache(cache_filepath):
+    """Load the cache at `cache_filepath`. Return None if it does not exist,
+    can not be read or was created by an incompatible version.
+    """
+    try:
+        with open(cache_filepath) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return None
+    return cache
+
+
+def _dump_json(filepath, data):
+    """Atomically write `data` as JSON to `filepath`."""
+    tmp_filepath = filepath + ".tmp"
+    with open(tmp_filepath, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_filepath, filepath)
+
+
+def _entries_to_json(players):
+    """Convert a dict of PlayerEntrys to a JSON-serializable dict."""
+    return {name: entry.to_dict()[name] for name, entry in players.items()}
+
+
+def _entries_from_json(data):
+    """Convert the output of `_entries_to_json`, loaded from JSON, back to a
+    dict of PlayerEntrys. JSON object keys are converted back to integers.
+    """
+    players = {}
+    for name, player_stats in data.items():
+        for key in ("points", "finishes", "darters"):
+            player_stats[key] = Counter(
+                {int(k): v for k, v in player_stats[key].items()}
+            )
+        players[name] = PlayerEntry(name, player_stats)
+    return players
+
+
+def _watermark_valid(log_filepath, cache):
+    """Check whether the log data up to the cache watermark is unchanged, i.e.
+    whether the log was only appended to since the cache was written. Size
+    and mtime of the log are kept up to date by `Sessions.save` (see
+    `_stamp_cache`); only if they differ, e.g. after the log was edited, all
+    data preceding the watermark is checksummed.
+    """
+    stat = os.stat(log_filepath)
+    if stat.st_size == cache["size"] and stat.st_mtime_ns == cache["mtime"]:
+        return True
+    if stat.st_size < cache["offset"] + len(b"<session "):
+        return False
+
+    with open(log_filepath, "rb") as file:
+        file.seek(cache["offset"])
+        if file.read(len(b"<session ")) != b"<session ":
+            return False
+    return _checksum(log_filepath, cache["offset"]) == cache["checksum"]
+
+
+def _checksum(log_filepath, offset, start=0, checksum=0, block_size=1024 * 1024):
+    """Compute the CRC32 checksum of the bytes preceding `offset`. If the
+    `checksum` of the bytes preceding `start` is given, only the bytes from
+    `start` on are read and the checksum is extended. The file is read in
+    blocks of `block_size` bytes.
+    """
+    with open(log_filepath, "rb") as file:
+        file.seek(start)
+        remaining = offset - start
+        while remaining > 0:
+            block = file.read(min(remaining, block_size))
+            if not block:
+                break
+            checksum = zlib.crc32(block, checksum)
+            remaining -= len(block)
+    return checksum
+
+
+def _tail_checksum(log_filepath, offset, length=4096):
+    """Compute the CRC32 checksum of `length` bytes preceding `offset`."""
+    with open(log_filepath, "rb") as file:
+        file.seek(max(0, offset - length))
+        return zlib.crc32(file.read(min(offset, length)))
+
+
+def _stamp_cache(log_filepath, log_stat):
+    """Update size and mtime in the stats cache of the log after appending
+    to it, if they matched the log before (`log_stat`). Appending does not
+    change the data preceding the watermark, hence it does not have to be
+    checksummed again.
+    """
+    cache_filepath = log_filepath + ".cache"
+    cache = _load_cache(cache_filepath)
+    if cache is None or (cache["size"], cache["mtime"]) != (
+        log_stat.st_size,
+        log_stat.st_mtime_ns,
+    ):
+        return
+    stat = os.stat(log_filepath)
+    cache.update(size=stat.st_size, mtime=stat.st_mtime_ns)
+    _dump_json(cache_filepath, cache)
+
+
+def _last_session_offset(file, block_size=65536):
+    """Return the byte offset of the last session element in the log `file`
+    (opened in binary mode) by searching backwards from the end. Return None
+    if there is no session element.
+    """
+    tag = b"<session "
+    end = file.seek(0, os.SEEK_END)
+    while end > 0:
+        start = max(0, end - block_size)
+        file.seek(start)
+        # read a few more bytes to find tags spanning the block boundary
+        index = file.read(end - start + len(tag)).rfind(tag)
+        if index != -1:
+            return start + index
+        end = start
+    return None
+
+
+def iter_log_file(log_filepath, offset=0):
+    """Generate the session elements of the log at `log_filepath` one by one.
+
+    The file is parsed incrementally. Every session element is discarded after
+    it was processed by the caller, hence memory consumption does not depend on
+    the size of the log.
+    If `offset` is given, parsing starts at this byte position which has to be
+    the beginning of a session element or of the closing root tag.
+    """
+    if os.path.getsize(log_filepath) == 0:
+        return
+
+    with open(log_filepath, "rb") as file:
+        source = file if not offset else _OffsetReader(file, offset)
+        yield from iter_sessions(source)
+
+
+def iter_sessions(source):
+    """Generate the session elements parsed incrementally from the file object
+    `source`, analogous to `iter_log_file`.
+    """
+    root = None
+    for event, element in etree.iterparse(source, events=("start", "end")):
+        if root is None:
+            root = element
+        elif event == "end" and element.tag == "session":
+            yield element
+            root.clear()
+
+
+class _OffsetReader:
+    """File-like object reading a log file from `offset` on. An opening root
+    tag is prepended s.t. the data can be parsed as sessions document.
+    """
+
+    def __init__(self, file, offset):
+        file.seek(offset)
+        self._file = file
+        self._prefix = b"<sessions>"
+
+    def read(self, size=-1):
+        if self._prefix:
+            data, self._prefix = self._prefix, b""
+            return data
+        return self._file.read(size)
+
+
+def _iter_mapped_sessions(log_filepath, start=0, end=None, names=None):
+    """Generate the session elements of the log at `log_filepath` that begin
+    in the byte range [`start`, `end`).
+
+    The log file is memory-mapped and scanned for session tags. If a set of
+    player `names` is given, only the start tag of each session is parsed to
+    check the players attribute, and sessions without any of these players are
+    skipped without being parsed.
+    """
+    if os.path.getsize(log_filepath) == 0:
+        return
+
+    with (
+        open(log_filepath, "rb") as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+    ):
+        for session_start, session_end in _iter_session_spans(buffer, start):
+            if end is not None and session_start >= end:
+                return
+            if names is not None:
+                tag_end = buffer.find(b">", session_start) + 1
+                start_tag = buffer[session_start:tag_end]
+                if not start_tag.endswith(b"/>"):
+                    start_tag = start_tag[:-1] + b"/>"
+                players = etree.fromstring(start_tag).get("players").split(",")
+                if names.isdisjoint(players):
+                    continue
+            yield etree.fromstring(buffer[session_start:session_end])
+
+
+def _iter_session_spans(buffer, position=0):
+    """Generate start and end offsets of the session elements in `buffer`
+    (the bytes of a log file, e.g. memory-mapped), starting the search at
+    `position`.
+
+    ElementTree escapes angle brackets in attribute values, hence tags can be
+    found by plain byte search.
+    """
+    position = buffer.find(b"<session ", position)
+    while position != -1:
+        tag_end = buffer.find(b">", position) + 1
+        if buffer[tag_end - 2] == ord("/"):
+            end = tag_end
+        else:
+            end = buffer.find(b"</session>", tag_end) + len(b"</session>")
+        yield position, end
+        position = buffer.find(b"<session ", end)
+
+
+def _analyze_session(session, players, names=None):
+    """Update the dict of PlayerEntrys with the data of a single session.
+    If a set of player `names` is given, only these players are analyzed.
+    """
+    session_names = session.get("players").split(",")
+    if names is not None:
+        session_names = [n for n in session_names if n in names]
+        if not session_names:
+            return
+
+    for name in session_names:
+        if name not in players:
+            players[name] = PlayerEntry(name)
+
+    for leg in session:
+        _analyze_leg(leg, players, names)
+
+
+def _analyze_leg(leg, players, names=None):
+    """Update the dict of PlayerEntrys with the data of a single leg.
+    If a set of player `names` is given, only these players are analyzed.
+    """
+    if leg.get("aborted"):
+        # no player finished the leg
+        for visit in leg:
+            if names is None or visit.get("player") in names:
+                players[visit.get("player")].update_from_log(visit)
+        return
+
+    winner_name = leg[-1].get("player")
+    winner = None
+    if names is None or winner_name in names:
+        winner = players[winner_name]
+        winner_old_throws = winner.throws
+
+    for visit in leg[:-1]:
+        name = visit.get("player")
+        if names is not None and name not in names:
+            continue
+        player_entry = players[name]
+        player_entry.update_from_log(visit)
+
+    if winner is None:
+        return
+
+    final_throws = int(leg[-1].get("throws"))
+    final_points = int(leg[-1].get("points"))
+    # X-darter per player
+    visit_throws = final_throws + winner.throws - winner_old_throws
+    winner.update(points=final_points, throws=final_throws, darter=visit_throws)
+
+
+def _serialize(log_element):
+    """Serialize a `xml.etree._Element` to UTF-8 encoded bytes, as it would be
+    written as part of a tree.
+    """
+    return etree.tostring(log_element, encoding="unicode").encode("utf-8")
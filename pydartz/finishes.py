@@ -1,127 +1,279 @@
-"""Module listing possible 2/3-dart finishes."""
-
-FINISHES = {
-    "41": [["1", "D20"], ["9", "D16"]],
-    "42": [["2", "D20"], ["10", "D16"]],
-    "43": [["3", "D20"], ["11", "D16"]],
-    "44": [["4", "D20"], ["12", "D16"]],
-    "45": [["5", "D20"], ["13", "D16"]],
-    "46": [["6", "D20"], ["14", "D16"]],
-    "47": [["7", "D20"], ["15", "D16"]],
-    "48": [["8", "D20"], ["16", "D16"]],
-    "49": [["9", "D20"], ["17", "D16"]],
-    "50": [["10", "D20"], ["18", "D16"]],
-    "51": [["11", "D20"], ["19", "D16"]],
-    "52": [["12", "D20"], ["20", "D16"]],
-    "53": [["13", "D20"], ["17", "D18"]],
-    "54": [["14", "D20"], ["18", "D18"]],
-    "55": [["15", "D20"], ["19", "D18"]],
-    "56": [["16", "D20"], ["20", "D18"]],
-    "57": [["17", "D20"]],
-    "58": [["18", "D20"]],
-    "59": [["19", "D20"]],
-    "60": [["20", "D20"]],
-    "61": [["T15", "D8"], ["T11", "D14"]],
-    "62": [["T10", "D16"], ["T12", "D13"]],
-    "63": [["T13", "D12"], ["T17", "D6"]],
-    "64": [["T16", "D8"], ["T14", "D11"]],
-    "65": [["T11", "D16"], ["T19", "D4"], ["T15", "D10"]],
-    "66": [["T10", "D18"], ["T18", "D6"], ["T16", "D9"]],
-    "67": [["T9", "D20"], ["T17", "D8"]],
-    "68": [["T16", "D10"], ["T18", "D7"]],
-    "69": [["T19", "D6"]],
-    "70": [["T18", "D8"], ["T20", "D5"]],
-    "71": [["T13", "D16"], ["T19", "D7"]],
-    "72": [["T16", "D12"], ["T20", "D6"]],
-    "73": [["T19", "D8"]],
-    "74": [["T14", "D16"], ["T16", "D13"]],
-    "75": [["T17", "D12"]],
-    "76": [["T20", "D8"], ["T16", "D14"]],
-    "77": [["T19", "D10"]],
-    "78": [["T18", "D12"]],
-    "79": [["T19", "D11"], ["T13", "D20"]],
-    "80": [["T20", "D10"]],
-    "81": [["T19", "D12"], ["T15", "D18"]],
-    "82": [["DB", "D16"], ["B", "17", "D20"], ["T14", "D20"]],
-    "83": [["T17", "D16"]],
-    "84": [["T20", "D12"]],
-    "85": [["T15", "D20"], ["T19", "D14"]],
-    "86": [["T18", "D16"]],
-    "87": [["T17", "D18"]],
-    "88": [["T20", "D14"]],
-    "89": [["T19", "D16"]],
-    "90": [["T20", "D15"], ["T18", "D18"]],
-    "91": [["T17", "D20"], ["SB", "T16", "D9"]],
-    "92": [["T20", "D16"], ["SB", "T17", "D8"]],
-    "93": [["T19", "D18"], ["SB", "T18", "D7"]],
-    "94": [["T18", "D20"], ["SB", "T19", "D6"]],
-    "95": [["T19", "D19"], ["SB", "T20", "D5"]],
-    "96": [["T20", "D18"]],
-    "97": [["T19", "D20"]],
-    "98": [["T20", "D19"]],
-    "99": [["T19", "10/6", "D16/D18"]],
-    "100": [["T20", "D20"]],
-    "101": [["T20", "9", "D16"], ["T17", "DB"]],
-    "102": [["T20", "10/6", "D16/D18"]],
-    "103": [["T19", "6/10", "D20/D18"]],
-    "104": [["T19", "15", "D16"], ["T18", "DB"]],
-    "105": [["T20", "13", "D16"]],
-    "106": [["T20", "T10", "D8"]],
-    "107": [["T19", "T10", "D10"], ["T19", "DB"]],
-    "108": [["T20", "16/8", "D16/D20"]],
-    "109": [["T20", "9", "D20"]],
-    "110": [["T20", "T10", "D10"], ["T20", "DB"]],
-    "111": [["T19", "14", "D20"], ["T20", "11", "D20"]],
-    "112": [["T20", "T12", "D8"]],
-    "113": [["T19", "16", "D20"]],
-    "114": [["T19", "17", "D20"], ["T20", "14", "D20"]],
-    "115": [["T20", "15", "D20"], ["T19", "18", "D20"]],
-    "116": [["T19", "19", "D20"], ["T20", "16", "D20"]],
-    "117": [["T19", "20", "D20"], ["T20", "17", "D20"]],
-    "118": [["T20", "18", "D20"]],
-    "119": [["T19", "T12", "D13"]],
-    "120": [["T20", "20", "D20"]],
-    "121": [["T20", "T11", "D14"], ["T17", "T20", "D5"]],
-    "122": [["T18", "T18", "D7"]],
-    "123": [["T19", "T16", "D9"]],
-    "124": [["T20", "T14", "D11"]],
-    "125": [["T18", "T19", "D7"], ["T20", "T15", "D10"]],
-    "126": [["T19", "T19", "D6"]],
-    "127": [["T20", "T17", "D8"]],
-    "128": [["T18", "T14", "D16"], ["T20", "T18", "D7"]],
-    "129": [["T19", "T16", "D12"], ["T20", "T19", "D6"]],
-    "130": [["T20", "T20", "D5"]],
-    "131": [["T19", "T14", "D16"], ["T20", "T13", "D16"]],
-    "132": [["T20", "T16", "D12"], ["SB", "T19", "DB"]],
-    "133": [["T20", "T19", "D8"]],
-    "134": [["T20", "T16", "D13"]],
-    "135": [["T20", "T17", "D12"], ["SB", "T20", "DB"]],
-    "136": [["T20", "T20", "D8"]],
-    "137": [["T20", "T19", "D10"]],
-    "138": [["T20", "T18", "D12"], ["T19", "T19", "D12"]],
-    "139": [["T20", "T13", "D20"], ["T20", "T19", "D11"]],
-    "140": [["T20", "T20", "D10"]],
-    "141": [["T20", "T19", "D12"]],
-    "142": [["T20", "T14", "D20"], ["T19", "T19", "D14"]],
-    "143": [["T20", "T17", "D16"], ["T19", "T18", "D16"]],
-    "144": [["T20", "T20", "D12"]],
-    "145": [["T20", "T19", "D14"]],
-    "146": [["T20", "T18", "D16"], ["T19", "T19", "D16"]],
-    "147": [["T20", "T17", "D18"], ["T19", "T18", "D18"]],
-    "148": [["T20", "T20", "D14"], ["T19", "T17", "D20"]],
-    "149": [["T20", "T19", "D16"]],
-    "150": [["T20", "T18", "D18"], ["T19", "T19", "D18"]],
-    "151": [["T20", "T17", "D20"], ["T19", "T18", "D20"]],
-    "152": [["T20", "T20", "D16"]],
-    "153": [["T20", "T19", "D18"]],
-    "154": [["T20", "T18", "D20"]],
-    "155": [["T20", "T19", "D19"]],
-    "156": [["T20", "T20", "D18"]],
-    "157": [["T20", "T19", "D20"]],
-    "158": [["T20", "T20", "D19"]],
-    "160": [["T20", "T20", "D20"]],
-    "161": [["T20", "T17", "DB"]],
-    "164": [["T20", "T18", "DB"], ["T19", "T19", "DB"]],
-    "167": [["T20", "T19", "DB"]],
-    "170": [["T20", "T20", "DB"]],
-}
+"""Module generating checkout routes (finishes) for double-out games.
+
+All routes of up to three darts over the 62 segments of the board (singles,
+doubles and trebles of 1 to 20, single and double bull) that end on an out
+segment are enumerated and ranked. The ranked routes are stored in a lookup
+table indexed by number of remaining darts and score which is built lazily on
+first use.
+
+Segments are denoted as in the input notation of the game: '20' for single 20,
+'D16' for double 16, 'T19' for treble 19, 'SB' and 'DB' for single and double
+bull.
+"""
+
+from collections import namedtuple
+
+Segment = namedtuple("Segment", ["name", "points", "number", "multiplier"])
+
+SINGLES = tuple(Segment(str(n), n, n, 1) for n in range(1, 21)) + (
+    Segment("SB", 25, 25, 1),
+)
+DOUBLES = tuple(Segment(f"D{n}", 2 * n, n, 2) for n in range(1, 21)) + (
+    Segment("DB", 50, 25, 2),
+)
+TREBLES = tuple(Segment(f"T{n}", 3 * n, n, 3) for n in range(1, 21))
+SEGMENTS = SINGLES + DOUBLES + TREBLES
+
+MAX_DARTS = 3
+# doubles ordered by preference. Doubles that can be halved repeatedly come
+# first since a miss into the single still leaves a double
+PREFERRED_DOUBLES = (
+    "D20",
+    "D16",
+    "D8",
+    "D18",
+    "D12",
+    "D10",
+    "D4",
+    "D14",
+    "D6",
+    "D2",
+    "DB",
+)
+# criteria to rank routes, in order of priority:
+# - darts: number of darts
+# - misses: number of darts whose miss into the single of the same number
+#   leaves a score that cannot be checked out with the remaining darts
+# - targets: difficulty of the setup darts (singles are the largest targets,
+#   double bull the smallest)
+# - doubles: position of the out segment in the preferred doubles
+RANKING = ("darts", "misses", "targets", "doubles")
+
+
+class CheckoutTable:
+    """Lookup table of ranked checkout routes per score.
+
+    Routes end on one of the `out_segments` and are ranked by the criteria
+    given in `ranking` (see `RANKING`). Remaining ties are broken by
+    preferring high-scoring first darts and by segment names, s.t. the result
+    is deterministic. For every score, at most `max_routes` routes are kept.
+    Routes that only differ in the order of the setup darts are considered
+    equal.
+    """
+
+    def __init__(
+        self,
+        out_segments=DOUBLES,
+        preferred_doubles=PREFERRED_DOUBLES,
+        ranking=RANKING,
+        max_routes=3,
+    ):
+        unknown = set(ranking) - set(RANKING)
+        if unknown:
+            raise ValueError(f"Unknown ranking criteria: {', '.join(sorted(unknown))}")
+
+        self._out_segments = tuple(out_segments)
+        self._preferred_doubles = tuple(preferred_doubles)
+        self._ranking = tuple(ranking)
+        self._max_routes = max_routes
+        self.max_score = (MAX_DARTS - 1) * max(s.points for s in SEGMENTS) + max(
+            s.points for s in self._out_segments
+        )
+        self._table = None
+        self._min_darts = None
+
+    def routes(self, score, darts=MAX_DARTS):
+        """Return the ranked routes for `score` that take at most `darts`
+        darts, as list of tuples of segment names. The list is empty if the
+        score cannot be checked out with the given darts.
+        """
+        if self._table is None:
+            self._build()
+        if not (0 < score <= self.max_score and 0 < darts <= MAX_DARTS):
+            return []
+        return self._table[darts][score]
+
+    def lookup_table(self, render):
+        """Return a flat list holding `render(routes)` for every score up to
+        `max_score` and every number of remaining darts, or None if there are
+        no routes. The entry of a score and number of darts is located at
+        `lookup_index(score, darts)`.
+        """
+        table = []
+        for score in range(self.max_score + 1):
+            for darts in range(MAX_DARTS + 1):
+                routes = self.routes(score, darts)
+                table.append(render(routes) if routes else None)
+        return table
+
+    def min_darts(self, score):
+        """Return the minimum number of darts required to check out `score`,
+        or None if it cannot be checked out with `MAX_DARTS` darts.
+        """
+        if self._min_darts is None:
+            self._build()
+        if not 0 < score <= self.max_score:
+            return None
+        return self._min_darts[score]
+
+    def _build(self):
+        # out segments and setup routes grouped by score, per number of darts
+        outs = [[] for _ in range(self.max_score + 1)]
+        for segment in self._out_segments:
+            outs[segment.points].append(segment)
+
+        self._min_darts = [None] * (self.max_score + 1)
+        routes_by_darts = [[(s,) for s in outs[score]] for score in range(len(outs))]
+        all_routes = [list(routes) for routes in routes_by_darts]
+        for score, routes in enumerate(routes_by_darts):
+            if routes:
+                self._min_darts[score] = 1
+
+        for nr_darts in range(2, MAX_DARTS + 1):
+            longer_routes = [[] for _ in range(self.max_score + 1)]
+            for score in range(1, self.max_score + 1):
+                for segment in SEGMENTS:
+                    rest = score - segment.points
+                    if rest < 1:
+                        continue
+                    for route in routes_by_darts[rest]:
+                        longer_routes[score].append((segment,) + route)
+            for score, routes in enumerate(longer_routes):
+                if routes and self._min_darts[score] is None:
+                    self._min_darts[score] = nr_darts
+                all_routes[score].extend(routes)
+            routes_by_darts = longer_routes
+
+        # ranked routes per number of darts and score
+        self._table = [
+            [[] for _ in range(self.max_score + 1)] for _ in range(MAX_DARTS + 1)
+        ]
+        for score, routes in enumerate(all_routes):
+            min_darts = self._min_darts[score]
+            if min_darts is None:
+                continue
+            if self._ranking[:1] == ("darts",):
+                # routes with more than the minimum number of darts never rank
+                ranked = self._best_routes(
+                    score, [r for r in routes if len(r) == min_darts]
+                )
+                for darts in range(min_darts, MAX_DARTS + 1):
+                    self._table[darts][score] = ranked
+            else:
+                for darts in range(min_darts, MAX_DARTS + 1):
+                    self._table[darts][score] = self._best_routes(
+                        score, [r for r in routes if len(r) <= darts]
+                    )
+
+    def _best_routes(self, score, routes):
+        """Rank the routes for `score` and return the best `max_routes` ones
+        as tuples of segment names.
+        """
+        best = {}
+        for route in sorted(routes, key=lambda r: self._rank(score, r)):
+            best.setdefault(_setup_key(route), route)
+            if len(best) == self._max_routes:
+                break
+        return [tuple(s.name for s in r) for r in best.values()]
+
+    def _rank(self, score, route):
+        """Return the sort key of a route for `score`."""
+        criteria = dict(
+            darts=len(route),
+            misses=self._misses(score, route),
+            targets=sum(_difficulty(s) for s in route[:-1]),
+            doubles=self._double_rank(route[-1]),
+        )
+        return (
+            tuple(criteria[c] for c in self._ranking),
+            tuple(-s.points for s in route),
+            tuple(s.name for s in route),
+        )
+
+    def _misses(self, score, route):
+        """Count the darts of the route whose miss into the single of the same
+        number leaves a score that cannot be checked out with the remaining
+        darts. A miss of the out segment has to leave a score that can be
+        checked out with a single dart.
+        """
+        misses = 0
+        for number, segment in enumerate(route):
+            if segment.multiplier == 1:
+                score -= segment.points
+                continue
+            rest = score - segment.number
+            darts_left = len(route) - number - 1 or 1
+            min_darts = self._min_darts[rest] if 0 < rest <= self.max_score else None
+            if min_darts is None or min_darts > darts_left:
+                misses += 1
+            score -= segment.points
+        return misses
+
+    def _double_rank(self, segment):
+        if segment.name in self._preferred_doubles:
+            return self._preferred_doubles.index(segment.name)
+        return len(self._preferred_doubles)
+
+
+def _difficulty(segment):
+    if segment.name == "DB":
+        return 2
+    return 0 if segment.multiplier == 1 else 1
+
+
+def _setup_key(route):
+    """Routes with equal out segment and equal set of setup darts share the
+    key.
+    """
+    return tuple(sorted(s.name for s in route[:-1])), route[-1].name
+
+
+CHECKOUTS = CheckoutTable()
+
+
+def checkouts(score, darts=MAX_DARTS):
+    """Return the ranked double-out routes for `score` that take at most
+    `darts` darts (see `CheckoutTable.routes`).
+    """
+    return CHECKOUTS.routes(score, darts)
+
+
+def _reachable_totals():
+    """Return a bitset per number of darts up to `MAX_DARTS`. Bit n of the
+    bitset of k darts is set if a total of n can be scored with k darts, any of
+    which may miss the board.
+    """
+    points = {0} | {s.points for s in SEGMENTS}
+    totals = [1]
+    for _ in range(MAX_DARTS):
+        bitset = 0
+        for p in points:
+            bitset |= totals[-1] << p
+        totals.append(bitset)
+    return tuple(totals)
+
+
+REACHABLE = _reachable_totals()
+
+
+def reachable(total, darts=MAX_DARTS):
+    """Check whether `total` can be scored with `darts` darts."""
+    return total >= 0 and bool(REACHABLE[darts] >> total & 1)
+
+
+def lookup_index(score, darts):
+    """Return the index of the entry of `score` and number of remaining
+    `darts` in a table returned by `CheckoutTable.lookup_table`.
+    """
+    return score * (MAX_DARTS + 1) + darts
+
+
+def __getattr__(name):
+    # the former static table, mapping scores (as strings) to lists of routes
+    if name == "FINISHES":
+        return {
+            str(score): [list(route) for route in CHECKOUTS.routes(score)]
+            for score in range(1, CHECKOUTS.max_score + 1)
+            if CHECKOUTS.routes(score)
+        }
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
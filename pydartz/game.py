@@ -14,9 +14,10 @@ from .session import Session
 
 
 class Game:
-    def __init__(self, communicator, sessions_log=None):
+    def __init__(self, communicator, sessions_log=None, rules=None):
         self._communicator = communicator
         self._sessions_log = sessions_log
+        self._rules = rules
         self._current_session = None
 
     def run(self):
@@ -45,7 +46,14 @@ class Game:
         players = []
         for i in range(nr_players):
             name = self._communicator.get_input(INPUT_PLAYER_NAME, i + 1)
-            players.append(Player(name, start_value, communicator=self._communicator))
+            players.append(
+                Player(
+                    name,
+                    start_value,
+                    communicator=self._communicator,
+                    rules=self._rules,
+                )
+            )
 
         nr_legs = self._communicator.get_input(INPUT_NR_LEGS)
 
@@ -54,6 +62,7 @@ class Game:
             nr_legs,
             log_parent=self._sessions_log,
             communicator=self._communicator,
+            rules=self._rules,
         )
 
     def _query_another_session(self):
@@ -78,6 +87,7 @@ class Game:
                 self._current_session._nr_legs,
                 log_parent=self._sessions_log,
                 communicator=self._communicator,
+                rules=self._rules,
             )
         else:
             continuing = False
@@ -0,0 +1,289 @@
+"""Generator of synthetic session logs for load and scale testing.
+
+Run `python -m pydartz.generate FILE --visits N` to write a log of (at least)
+N visits. The log has the structure written by `session.Session`, `Leg` and
+`Visit`, and can be read and analyzed like any other log.
+
+The players' skills, i.e. three-dart averages, are drawn from a normal
+distribution. Every dart is aimed at the treble 20 and hits it with the
+probability that yields the player's average, otherwise it hits a single of
+the 20 sector or one of its neighbours. Once a score can be checked out, the
+leg is finished with a chance that grows with the skill. The sessions are
+spread evenly over the given date span.
+
+The log is written sequentially, leg by leg, hence memory consumption does not
+depend on its size.
+"""
+
+import argparse
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from .finishes import MAX_DARTS
+from .rules import DEFAULT_RULES
+
+MIN_AVERAGE = 15.0
+MAX_AVERAGE = 120.0
+# points of darts missing the treble 20
+MISSED_POINTS = (20, 20, 20, 1, 5)
+# chances to finish a leg in a visit for the least and most skilled players
+MIN_FINISH_CHANCE = 0.1
+MAX_FINISH_CHANCE = 0.6
+# seconds per visit and between the legs of a session
+VISIT_DURATION = 25
+LEG_BREAK = 60
+BUFFER_SIZE = 1024 * 1024
+
+
+def generate_log(
+    log_filepath,
+    nr_visits,
+    nr_players=2,
+    players_per_session=2,
+    average=50.0,
+    spread=15.0,
+    nr_legs=3,
+    since=None,
+    until=None,
+    rules=DEFAULT_RULES,
+    seed=0,
+):
+    """Write a synthetic session log of at least `nr_visits` visits to
+    `log_filepath`.
+
+    The sessions are played by `players_per_session` players drawn from
+    `nr_players` players whose averages follow a normal distribution with
+    mean `average` and standard deviation `spread`. Every session is won by
+    the first player to win `nr_legs` legs. The sessions are spread over the
+    dates `since` and `until` (`datetime.date` or `datetime.datetime`
+    objects, by default the year before today).
+    Only straight-in rules are supported. Return the numbers of sessions and
+    visits written.
+    """
+    if not rules.straight_in:
+        raise ValueError("Only straight-in rules can be generated.")
+    if nr_visits < 0:
+        raise ValueError("The number of visits must not be negative.")
+    if nr_players < 1:
+        raise ValueError("At least one player is required.")
+    if not 0 < players_per_session <= nr_players:
+        raise ValueError("Invalid number of players per session.")
+    if nr_legs < 1:
+        raise ValueError("The number of legs to win must be at least 1.")
+
+    until = _to_datetime(until or date.today())
+    since = _to_datetime(since or until - timedelta(days=365))
+    if until <= since:
+        raise ValueError("The date span is empty.")
+
+    rng = random.Random(seed)
+    names = [f"Player {i + 1}" for i in range(nr_players)]
+    skills = {
+        name: _Skill(
+            min(max(rng.gauss(average, spread), MIN_AVERAGE), MAX_AVERAGE), rules
+        )
+        for name in names
+    }
+    session_attributes = "" if rules == DEFAULT_RULES else f' rules="{rules}"'
+    clock = _Clock(since)
+    span = (until - since).total_seconds()
+
+    nr_sessions = visits = 0
+    with open(log_filepath, "w", encoding="utf-8", buffering=BUFFER_SIZE) as file:
+        file.write("<?xml version='1.0' encoding='utf-8'?>\n<sessions>")
+        while visits < nr_visits:
+            # time passes in proportion to the visits written
+            clock.advance_to(since + timedelta(seconds=span * visits / nr_visits))
+            players = rng.sample(names, players_per_session)
+            file.write(
+                f'<session timestamp="{clock.timestamp()}" '
+                f'players="{",".join(players)}"{session_attributes}>'
+            )
+            won = [0] * len(players)
+            while max(won) < nr_legs:
+                clock.tick(LEG_BREAK)
+                winner, leg_visits = _write_leg(
+                    file,
+                    [(name, skills[name]) for name in players],
+                    sum(won) % len(players),
+                    clock,
+                    rng,
+                )
+                won[winner] += 1
+                visits += leg_visits
+            file.write("</session>")
+            nr_sessions += 1
+        file.write("</sessions>")
+
+    return nr_sessions, visits
+
+
+def _write_leg(file, players, first, clock, rng, start_value=501):
+    """Write a leg of the players, given as (name, _Skill) pairs, started by
+    the player at index `first`. Return the index of the winner and the
+    number of visits.
+    """
+    chunks = [f'<leg timestamp="{clock.timestamp()}">']
+    scores = [start_value] * len(players)
+    player = first
+    while True:
+        clock.tick(VISIT_DURATION)
+        name, skill = players[player]
+        points, throws = skill.visit(scores[player], rng)
+        chunks.append(
+            f'<visit timestamp="{clock.timestamp()}" player="{name}" '
+            f'points="{points}" throws="{throws}" />'
+        )
+        scores[player] -= points
+        if scores[player] == 0:
+            break
+        player = (player + 1) % len(players)
+    chunks.append("</leg>")
+    file.write("".join(chunks))
+    return player, len(chunks) - 2
+
+
+class _Skill:
+    """Visit model of a player with the given three-dart `average`."""
+
+    def __init__(self, average, rules):
+        missed = sum(MISSED_POINTS) / len(MISSED_POINTS)
+        hit = min(max((average / MAX_DARTS - missed) / (60 - missed), 0.0), 1.0)
+        self._hit_chance = hit
+        self._finish_chance = MIN_FINISH_CHANCE + hit * (
+            MAX_FINISH_CHANCE - MIN_FINISH_CHANCE
+        )
+        self._rules = rules
+
+    def visit(self, score, rng):
+        """Return the points and number of darts of a visit beginning with
+        `score`.
+        """
+        min_darts = self._rules.checkouts.min_darts(score)
+        if min_darts is not None and rng.random() < self._finish_chance:
+            return score, rng.randint(min_darts, MAX_DARTS)
+
+        points = 0
+        for _ in range(MAX_DARTS):
+            if rng.random() < self._hit_chance:
+                points += 60
+            else:
+                points += rng.choice(MISSED_POINTS)
+        if points >= score or not self._rules.remainder_valid(score - points):
+            # bust
+            points = 0
+        return points, MAX_DARTS
+
+
+class _Clock:
+    """Clock producing log timestamps. Formatting is cached per day."""
+
+    def __init__(self, start):
+        self._time = start.replace(microsecond=0)
+        self._day = None
+        self._prefix = None
+
+    def tick(self, seconds):
+        self._time += timedelta(seconds=seconds)
+
+    def advance_to(self, time):
+        """Set the clock to `time` unless it is already later."""
+        self._time = max(self._time, time.replace(microsecond=0))
+
+    def timestamp(self):
+        time = self._time
+        if time.date() != self._day:
+            self._day = time.date()
+            self._prefix = time.strftime("%Y%m%d-")
+        return f"{self._prefix}{time.hour:02d}{time.minute:02d}{time.second:02d}"
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime(value.year, value.month, value.day)
+
+
+def _count(value):
+    """Convert a positive number given on the command line."""
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"Expected a positive number, got {value}")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pydartz.generate",
+        description="write a synthetic session log for load and scale testing",
+    )
+    parser.add_argument("log_filepath", metavar="FILE", help="log file to write")
+    parser.add_argument(
+        "--visits", type=_count, required=True, metavar="N", help="number of visits"
+    )
+    parser.add_argument(
+        "--players", type=_count, default=2, metavar="N", help="number of players"
+    )
+    parser.add_argument(
+        "--players-per-session",
+        type=_count,
+        default=2,
+        metavar="N",
+        help="number of players of every session (default: 2)",
+    )
+    parser.add_argument(
+        "--average",
+        type=float,
+        default=50.0,
+        help="mean three-dart average of the players (default: 50)",
+    )
+    parser.add_argument(
+        "--spread",
+        type=float,
+        default=15.0,
+        help="standard deviation of the players' averages (default: 15)",
+    )
+    parser.add_argument(
+        "--legs",
+        type=_count,
+        default=3,
+        metavar="N",
+        help="number of legs to win a session (default: 3)",
+    )
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        metavar="DATE",
+        help="date of the first session (YYYY-MM-DD, default: a year before "
+        "--until)",
+    )
+    parser.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        metavar="DATE",
+        help="end of the date span (YYYY-MM-DD, default: today)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    try:
+        nr_sessions, nr_visits = generate_log(
+            args.log_filepath,
+            args.visits,
+            nr_players=args.players,
+            players_per_session=args.players_per_session,
+            average=args.average,
+            spread=args.spread,
+            nr_legs=args.legs,
+            since=args.since,
+            until=args.until,
+            seed=args.seed,
+        )
+    except ValueError as error:
+        sys.exit(f"Generating failed: {error}")
+    print(f"Wrote {nr_sessions} sessions with {nr_visits} visits.")
+
+
+if __name__ == "__main__":
+    main()
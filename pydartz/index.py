@@ -0,0 +1,337 @@
+"""Module for indexing the sessions of a log file by timestamp and for
+analyzing time windows of the log.
+
+The index is stored in a sidecar file next to the log (the log filepath with
+'.index' appended). It consists of a header holding the size of the log and a
+checksum of its last bytes, followed by one fixed-size record per session.
+Hence the index can be updated in place when sessions are appended, and an
+outdated index is detected and rebuilt.
+"""
+
+import bisect
+import mmap
+import os.path
+import re
+import struct
+from array import array
+from xml.etree import ElementTree as etree
+
+from .database import (
+    _analyze_session,
+    _iter_mapped_sessions,
+    _tail_checksum,
+    to_timestamp,
+)
+
+_TIMESTAMP_PATTERN = re.compile(rb'timestamp="([^"]*)"')
+_MAGIC = b"PYDZIDX1"
+# magic, size of the log, checksum of the last bytes of the log
+_HEADER = struct.Struct("<8sQI")
+# timestamp, start and end offset, number of legs
+_RECORD = struct.Struct("<15sQQL")
+
+
+class SessionIndex:
+    """Index of the sessions in a log file. For every session, the timestamp,
+    the byte offsets of beginning and end, and the number of legs are stored.
+
+    Sessions are appended to the log in chronological order, hence the session
+    at which a time window starts can be found by binary search.
+    """
+
+    def __init__(self):
+        self._timestamps = []
+        self._starts = array("Q")
+        self._ends = array("Q")
+        self._nr_legs = array("L")
+
+    @classmethod
+    def build(cls, log_filepath):
+        """Build the index of the log at `log_filepath`. The file is scanned
+        for session and leg tags, only the timestamps of the sessions are
+        parsed.
+        """
+        index = cls()
+        if os.path.getsize(log_filepath) == 0:
+            return index
+
+        with (
+            open(log_filepath, "rb") as file,
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+        ):
+            position = buffer.find(b"<session ")
+            while position != -1:
+                tag_end = buffer.find(b">", position) + 1
+                if buffer[tag_end - 2] == ord("/"):
+                    end = tag_end
+                else:
+                    end = buffer.find(b"</session>", tag_end) + len(b"</session>")
+                index.add(
+                    _TIMESTAMP_PATTERN.search(buffer, position, tag_end)[1].decode(),
+                    position,
+                    end,
+                    _count(buffer, b"<leg ", tag_end, end),
+                )
+                position = buffer.find(b"<session ", end)
+
+        return index
+
+    @classmethod
+    def open(cls, log_filepath):
+        """Return the index of the log at `log_filepath`, loaded from the
+        sidecar file. If the sidecar file is missing or does not match the log,
+        the index is built and written.
+        """
+        try:
+            return cls.load(log_filepath)
+        except (OSError, ValueError):
+            index = cls.build(log_filepath)
+            index.dump(log_filepath)
+            return index
+
+    @classmethod
+    def load(cls, log_filepath):
+        """Load the index of the log at `log_filepath` from the sidecar file.
+        Raise a ValueError if it does not match the log.
+        """
+        with open(index_filepath(log_filepath), "rb") as file:
+            data = file.read()
+
+        if len(data) < _HEADER.size or (len(data) - _HEADER.size) % _RECORD.size:
+            raise ValueError(f"Invalid session index of {log_filepath}")
+        magic, size, checksum = _HEADER.unpack_from(data)
+        if (
+            magic != _MAGIC
+            or size != os.path.getsize(log_filepath)
+            or checksum != _tail_checksum(log_filepath, size)
+        ):
+            raise ValueError(f"Session index does not match {log_filepath}")
+
+        index = cls()
+        header_size = _HEADER.size
+        records = memoryview(data)[header_size:]
+        for timestamp, start, end, nr_legs in _RECORD.iter_unpack(records):
+            index.add(timestamp.rstrip(b"\0").decode(), start, end, nr_legs)
+        return index
+
+    def dump(self, log_filepath, first=0):
+        """Write the index of the log at `log_filepath` to the sidecar file.
+        If `first` is given, only the records of the sessions from this index
+        on are written, and the preceding records are kept.
+        """
+        filepath = index_filepath(log_filepath)
+        mode = "r+b" if first and os.path.exists(filepath) else "wb"
+        if mode == "wb":
+            first = 0
+
+        with open(filepath, mode) as file:
+            file.seek(_HEADER.size + first * _RECORD.size)
+            file.write(
+                b"".join(
+                    _RECORD.pack(
+                        self._timestamps[n].encode(),
+                        self._starts[n],
+                        self._ends[n],
+                        self._nr_legs[n],
+                    )
+                    for n in range(first, len(self))
+                )
+            )
+            file.truncate()
+            # the header is written last, s.t. an interrupted update results
+            # in a mismatching index
+            size = os.path.getsize(log_filepath)
+            file.seek(0)
+            file.write(_HEADER.pack(_MAGIC, size, _tail_checksum(log_filepath, size)))
+
+    def add(self, timestamp, start, end, nr_legs):
+        """Append an entry for a session."""
+        self._timestamps.append(timestamp)
+        self._starts.append(start)
+        self._ends.append(end)
+        self._nr_legs.append(nr_legs)
+
+    def update(self, number, end, nr_legs):
+        """Update end offset and number of legs of the session at index
+        `number`, e.g. after legs were appended to it.
+        """
+        self._ends[number] = end
+        self._nr_legs[number] = nr_legs
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def span(self, number):
+        """Return start and end byte offsets of the session at index `number`."""
+        return self._starts[number], self._ends[number]
+
+    def nr_legs(self, number):
+        """Return the number of legs of the session at index `number`."""
+        return self._nr_legs[number]
+
+    def timestamp(self, number):
+        """Return the timestamp of the session at index `number`."""
+        return self._timestamps[number]
+
+    def find(self, timestamp):
+        """Return the index of the session started at `timestamp` (a datetime
+        object or a timestamp string). Raise a KeyError if there is none.
+        """
+        timestamp = to_timestamp(timestamp)
+        number = bisect.bisect_left(self._timestamps, timestamp)
+        if number == len(self) or self._timestamps[number] != timestamp:
+            raise KeyError(timestamp)
+        return number
+
+    def select(
+        self,
+        since=None,
+        until=None,
+        last_sessions=None,
+        last_legs=None,
+        log_filepath=None,
+    ):
+        """Select the range of sessions relevant for a window.
+
+        The window is given by timestamps `since` and `until` (formatted acc.
+        to `LogEntryBase.DT_FORMAT`), and/or by the number of most recent
+        sessions or legs of the sessions started before `until`. Return the
+        indices of the first session and the one after the last session, and
+        the number of legs within [`since`, `until`) to skip in the first
+        session.
+
+        The legs of the sessions at the bounds of the time range are only
+        counted if they were played within it when the log is given as
+        `log_filepath`; otherwise all legs of these sessions count.
+        """
+        first, stop, skip_legs = 0, len(self), 0
+
+        if since is not None:
+            # the previous session might contain legs played after `since`
+            first = max(0, bisect.bisect_left(self._timestamps, since) - 1)
+        # sessions that might contain legs outside of the time range
+        bounds = {first} if since is not None else set()
+        if until is not None:
+            stop = bisect.bisect_left(self._timestamps, until)
+            bounds.add(stop - 1)
+        if last_sessions is not None:
+            first = max(first, stop - last_sessions)
+        if last_legs is not None:
+            nr_legs, number = 0, stop
+            while number > first and nr_legs < last_legs:
+                number -= 1
+                if log_filepath is not None and number in bounds:
+                    session = read_session(log_filepath, number, self)
+                    _filter_legs(session, since, until)
+                    nr_legs += len(session)
+                else:
+                    nr_legs += self._nr_legs[number]
+            if nr_legs >= last_legs:
+                first, skip_legs = number, nr_legs - last_legs
+
+        return first, max(first, stop), skip_legs
+
+
+def index_filepath(log_filepath):
+    """Return the filepath of the sidecar index of the log at `log_filepath`."""
+    return log_filepath + ".index"
+
+
+def read_session(log_filepath, number, session_index=None):
+    """Parse only the session at index `number` (negative values count from
+    the end) of the log at `log_filepath` and return the session element. The
+    sidecar index is used unless a SessionIndex is given as `session_index`.
+    """
+    if session_index is None:
+        session_index = SessionIndex.open(log_filepath)
+    start, end = session_index.span(number)
+
+    with (
+        open(log_filepath, "rb") as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+    ):
+        return etree.fromstring(buffer[start:end])
+
+
+def _count(buffer, sub, start, end):
+    """Count the occurrences of `sub` in the byte range of `buffer`."""
+    count = 0
+    position = buffer.find(sub, start, end)
+    while position != -1:
+        count += 1
+        position = buffer.find(sub, position + len(sub), end)
+    return count
+
+
+def analyze_window(
+    log_filepath,
+    since=None,
+    until=None,
+    last_sessions=None,
+    last_legs=None,
+    names=None,
+    session_index=None,
+):
+    """Analyze the legs of the log at `log_filepath` that were played in the
+    time range [`since`, `until`) and/or belong to the `last_sessions` most
+    recent sessions or are among the `last_legs` most recent legs (before
+    `until`, if given). `since` and `until` are datetime or date objects, or
+    timestamps formatted acc. to `LogEntryBase.DT_FORMAT`.
+
+    The sidecar index of the log is used unless a SessionIndex is given as
+    `session_index`. Only the sessions within the window are parsed.
+    If an iterable of player `names` is given, only these players are
+    analyzed.
+    """
+    since, until = to_timestamp(since), to_timestamp(until)
+    if names is not None:
+        names = set(names)
+    if session_index is None:
+        session_index = SessionIndex.open(log_filepath)
+
+    first, stop, skip_legs = session_index.select(
+        since, until, last_sessions, last_legs, log_filepath
+    )
+    players, _ = _analyze_range(
+        log_filepath, session_index, first, stop, skip_legs, since, until, names
+    )
+    return players
+
+
+def _analyze_range(
+    log_filepath, session_index, first, stop, skip_legs, since, until, names
+):
+    """Analyze the legs played in the time range [`since`, `until`) of the
+    sessions with indices in [`first`, `stop`) of the log at `log_filepath`,
+    skipping the first `skip_legs` of these legs in the first session (see
+    `SessionIndex.select`). Return the dict of PlayerEntrys and the number of
+    analyzed legs.
+    """
+    players, nr_legs = {}, 0
+    if first == stop:
+        return players, nr_legs
+
+    start, end = session_index.span(first)[0], session_index.span(stop - 1)[1]
+    sessions = _iter_mapped_sessions(log_filepath, start, end)
+    for number, session in enumerate(sessions):
+        _filter_legs(session, since, until)
+        if number == 0:
+            del session[:skip_legs]
+        if len(session):
+            nr_legs += len(session)
+            _analyze_session(session, players, names)
+
+    return players, nr_legs
+
+
+def _filter_legs(session, since=None, until=None):
+    """Remove the legs from the session element that were not played in the
+    time range [`since`, `until`). Return False if no leg is left.
+    """
+    session[:] = [
+        leg
+        for leg in session
+        if (since is None or leg.get("timestamp") >= since)
+        and (until is None or leg.get("timestamp") < until)
+    ]
+    return len(session) > 0
@@ -0,0 +1,107 @@
+"""Module for merging the session logs of multiple boards into a single log.
+
+Every log is sorted by session timestamp since sessions are appended as they
+are played. Hence the logs can be merged by a streaming k-way merge, holding
+only one session per log in memory. Sessions that occur in more than one log
+(e.g. because a log was merged before) are written only once, and sessions that
+were moved into the archive of the output log are not written again.
+"""
+
+import hashlib
+import heapq
+import os
+
+from .archive import (
+    _iter_segment,
+    _segment_month,
+    complete_compaction,
+    default_archive_dir,
+    load_summary,
+)
+from .database import Sessions, _serialize, iter_log_file
+
+
+def merge_logs(log_filepaths, output_filepath, archive_dir=None):
+    """Merge the logs at `log_filepaths` into a log at `output_filepath`,
+    sorted by session timestamp. The output file may be one of the inputs; it
+    is replaced once merging has finished.
+
+    Sessions are identified by a hash of their content, including timestamp
+    and players. Duplicates are skipped, including sessions archived in
+    `archive_dir` (default: see `archive.default_archive_dir` of the output
+    log). Only the archive segments of the months of merged sessions are read.
+    Return the number of written sessions and the number of skipped
+    duplicates.
+    """
+    if archive_dir is None:
+        archive_dir = default_archive_dir(output_filepath)
+    complete_compaction(archive_dir)
+    summary = load_summary(archive_dir)
+
+    nr_written = nr_duplicates = 0
+    current_timestamp, current_hashes = None, set()
+    archived_month, archived_hashes = None, set()
+
+    tmp_filepath = output_filepath + ".tmp"
+    try:
+        with open(tmp_filepath, "wb") as output_file:
+            output_file.write(Sessions.ROOT_START)
+            for timestamp, data in heapq.merge(
+                *(_iter_serialized_sessions(p) for p in log_filepaths)
+            ):
+                # duplicates have equal timestamps, hence only the hashes of the
+                # sessions with the current timestamp have to be kept
+                if timestamp != current_timestamp:
+                    current_timestamp, current_hashes = timestamp, set()
+                # sessions are archived by month, and merged in order of time
+                if _segment_month(timestamp) != archived_month:
+                    archived_month = _segment_month(timestamp)
+                    archived_hashes = _archived_hashes(
+                        archive_dir, summary, archived_month
+                    )
+                digest = hashlib.sha256(data).digest()
+                if digest in current_hashes or digest in archived_hashes:
+                    nr_duplicates += 1
+                    continue
+
+                current_hashes.add(digest)
+                output_file.write(data)
+                nr_written += 1
+            output_file.write(Sessions.ROOT_END)
+    except BaseException:
+        os.remove(tmp_filepath)
+        raise
+
+    os.replace(tmp_filepath, output_filepath)
+    return nr_written, nr_duplicates
+
+
+def _archived_hashes(archive_dir, summary, month):
+    """Return the hashes of the sessions archived in the segment of `month`
+    (see `archive.load_summary`).
+    """
+    if month not in summary["segments"]:
+        return set()
+    return {
+        hashlib.sha256(_serialize_session(session)).digest()
+        for session in _iter_segment(archive_dir, summary["segments"][month])
+    }
+
+
+def _serialize_session(session):
+    # formatting whitespace is not part of the content
+    session.tail = None
+    return _serialize(session)
+
+
+def _iter_serialized_sessions(log_filepath):
+    """Generate timestamp and serialized bytes of the sessions of the log at
+    `log_filepath`. Raise a ValueError if the log is not sorted.
+    """
+    previous_timestamp = ""
+    for session in iter_log_file(log_filepath):
+        timestamp = session.get("timestamp")
+        if timestamp < previous_timestamp:
+            raise ValueError(f"Sessions of {log_filepath} are not sorted")
+        previous_timestamp = timestamp
+        yield timestamp, _serialize_session(session)
@@ -0,0 +1,125 @@
+"""Module estimating the success probabilities of checkout routes by Monte
+Carlo simulation.
+
+Throws are modelled as two-dimensional Gaussian distributions around the aim
+point with a standard deviation `sigma` (in millimetres, see `board`). For
+every route, a batch of visits is simulated in parallel: darts are aimed at
+the segments of the route as long as the visit follows it. After a dart
+strayed from the route, the remaining darts are aimed at the first segment of
+the best route for the new score. A visit is successful if it checks out
+according to the rules.
+
+Requires the optional `numpy` dependency.
+"""
+
+import functools
+
+from . import board
+from .finishes import MAX_DARTS, SEGMENTS
+from .rules import DEFAULT_RULES
+
+DEFAULT_SAMPLES = 10000
+# maximum number of rankings kept by `rank_routes`
+CACHE_SIZE = 4096
+
+
+def success_probability(
+    route,
+    score,
+    sigma,
+    darts=MAX_DARTS,
+    rules=DEFAULT_RULES,
+    samples=DEFAULT_SAMPLES,
+    seed=0,
+):
+    """Estimate the probability to check out `score` with `darts` darts when
+    aiming at the segments of `route` (a sequence of segment names).
+    """
+    import numpy as np
+
+    tables = _tables(rules)
+    route = [board.SEGMENT_INDEX[name] for name in route]
+    rng = np.random.default_rng(seed)
+
+    score_left = np.full(samples, score)
+    active = np.ones(samples, dtype=bool)
+    on_route = np.ones(samples, dtype=bool)
+    finished = np.zeros(samples, dtype=bool)
+
+    for dart in range(darts):
+        aims = tables.aims[score_left, darts - dart]
+        if dart < len(route):
+            aims = np.where(on_route, route[dart], aims)
+        # visits without any checkout left fail
+        active &= aims != board.MISS
+
+        hits = np.full(samples, board.MISS)
+        for aim in np.unique(aims[active]):
+            thrown = active & (aims == aim)
+            x, y = tables.aim_points[aim, :, None] + sigma * rng.standard_normal(
+                (2, np.count_nonzero(thrown))
+            )
+            hits[thrown] = board.segment_indices(x, y)
+
+        rest = score_left - tables.points[hits]
+        checked_out = active & (rest == 0) & tables.out[hits]
+        busted = (
+            active
+            & ~checked_out
+            & ((rest <= 0) | ~tables.valid_remainders[np.maximum(rest, 0)])
+        )
+        finished |= checked_out
+        active &= ~(checked_out | busted)
+        score_left = np.where(active, rest, score_left)
+        if dart < len(route):
+            on_route &= hits == route[dart]
+
+    return float(np.count_nonzero(finished) / samples)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def rank_routes(
+    score, sigma, darts=MAX_DARTS, rules=DEFAULT_RULES, samples=DEFAULT_SAMPLES
+):
+    """Return the checkout routes of the rules' checkout table for `score`
+    and number of `darts` together with their success probabilities, as
+    tuple of (route, probability) pairs ordered by decreasing probability.
+    Results are cached per arguments, evicting the least recently used.
+    """
+    ranked = [
+        (route, success_probability(route, score, sigma, darts, rules, samples))
+        for route in rules.checkouts.routes(score, darts)
+    ]
+    # the checkout table order breaks ties
+    return tuple(sorted(ranked, key=lambda r: -r[1]))
+
+
+class _Tables:
+    """Lookup arrays of the simulation for a set of rules."""
+
+    def __init__(self, rules):
+        import numpy as np
+
+        checkouts = rules.checkouts
+        # segment index of the first dart of the best route per score and
+        # number of darts, or MISS if there is none
+        self.aims = np.full((checkouts.max_score + 1, MAX_DARTS + 1), board.MISS)
+        for score in range(1, checkouts.max_score + 1):
+            for darts in range(1, MAX_DARTS + 1):
+                routes = checkouts.routes(score, darts)
+                if routes:
+                    self.aims[score, darts] = board.SEGMENT_INDEX[routes[0][0]]
+
+        self.aim_points = np.array(
+            [board.aim_point(s.name) for s in SEGMENTS] + [(0.0, 0.0)]
+        )
+        self.points = np.array([s.points for s in SEGMENTS] + [0])
+        self.out = np.array([rules.out_segment(s.name) for s in SEGMENTS] + [False])
+        self.valid_remainders = np.array(
+            [rules.remainder_valid(s) for s in range(checkouts.max_score + 1)]
+        )
+
+
+@functools.cache
+def _tables(rules):
+    return _Tables(rules)
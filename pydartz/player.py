@@ -1,4 +1,10 @@
 from .communication import INFO_FINISH, INFO_VISIT, INPUT_THROW
+from .finishes import MAX_DARTS, SEGMENTS, reachable
+from .rules import DEFAULT_RULES
+
+# segments that can be entered by name, e.g. 't20' or 'db'. Singles are
+# entered as plain numbers
+NAMED_SEGMENTS = {s.name.lower(): s for s in SEGMENTS if not s.name.isdigit()}
 
 
 class Player:
@@ -7,19 +13,23 @@ class Player:
     perform a classic 501.
     Each player has a unique name that are passed at initialization.
     It is also required to pass a start value to initialize the player's
-    remaining score."""
+    remaining score.
+    The in- and out-rules are given by a `rules.Rules` instance (double-out by
+    default)."""
 
     INDEX = 0
 
-    def __init__(self, name, start_value=501, communicator=None):
+    def __init__(self, name, start_value=501, communicator=None, rules=None):
         self._name = name
         self._index = Player.INDEX
         Player.INDEX += 1
         self._start_value = start_value
         self._nr_won_legs = 0
         self._communicator = communicator
+        self.rules = rules or DEFAULT_RULES
 
         self._score_left = start_value
+        self._opened = self.rules.straight_in
         self._throws = 0
 
         self._darts = 3
@@ -35,6 +45,7 @@ class Player:
         """Reset actions at the beginning of a leg."""
         self._throws = 0
         self._score_left = self._start_value
+        self._opened = self.rules.straight_in
 
     def victorious(self):
         return self._score_left == 0
@@ -46,6 +57,8 @@ class Player:
         Note that score has to be valid since this method does not do any
         checks on its own."""
         self._score_left -= score
+        if score > 0:
+            self._opened = True
         # TODO this logic should be moved to _process_score
         if is_total or score + sum(self._visit) == 180:
             self._throws += self._darts
@@ -55,23 +68,49 @@ class Player:
             self._darts -= 1
         self._visit.append(score)
 
-    def score_valid(self, score):
+    def score_valid(self, score, is_total=True, segment=None):
         """Check whether `score` is valid, i.e. the current visit must not
         exceed 180, the player must not be busted and the score has to be
-        legitimatly thrown (e.g. one cannot score 130 with two remaining darts.)
+        legitimatly thrown (e.g. one cannot score 130 with two remaining darts,
+        nor 179 with three darts.)
+        A finish has to comply with the out-rule: a single dart (given by
+        `segment` if known) must hit an out segment, a total of the remaining
+        darts must be finishable with them. Before the player opened the leg, a
+        single dart must comply with the in-rule.
 
         Raises a ValueError if the score is invalid.
         """
         difference = self._score_left - score
-
-        if (
-            score + sum(self._visit) > 180
-            or score > 60 * self._darts
-            or difference < 0
-            or difference == 1
-        ):
+        # a bust (negative score) undoes the visit so far
+        # a single dart has to be reachable with one dart. As in substract(),
+        # a score completing a visit of 180 counts as the rest of the visit
+        single = not is_total and score + sum(self._visit) != 180
+        thrown = score < 0 or (
+            reachable(score, 1 if single else self._darts)
+            and reachable(score + sum(self._visit), MAX_DARTS)
+        )
+
+        if not thrown or difference < 0 or not self.rules.remainder_valid(difference):
             raise ValueError
 
+        if difference == 0 and score > 0:
+            if segment is not None:
+                finish_valid = self.rules.out_segment(segment.name)
+            elif is_total:
+                finish_valid = self.rules.finishable(score, self._darts)
+            else:
+                finish_valid = self.rules.out_points(score)
+            if not finish_valid:
+                raise ValueError
+
+        if not (self._opened or is_total or score == 0):
+            if segment is not None:
+                opening = self.rules.in_segment(segment.name)
+            else:
+                opening = self.rules.in_points(score)
+            if not opening:
+                raise ValueError
+
         return True
 
     def print_info(self):
@@ -84,6 +123,11 @@ class Player:
     def score_left(self):
         return self._score_left
 
+    @property
+    def opened(self):
+        """Whether the player's darts count according to the in-rule."""
+        return self._opened
+
     @property
     def darts(self):
         return self._darts
@@ -130,6 +174,9 @@ class Player:
     def _process_score(self, score):
         """Parse the passed score. Valid options are:
         - x (an integer between 0 and 180)
+        - a segment name such as t20, d16, sb or db (the score of a single
+          dart). Before the player opened the leg, a segment that does not
+          comply with the in-rule scores zero
         - xd (an integer between 0 and 180, with the character 'd' appended,
           indicating that the player's turn is over ('done'))
         - d (equivalent to '0d')
@@ -138,9 +185,16 @@ class Player:
         A ValueError is thrown if an invalid score is passed. This can be
         caused by a score that exceeds the remaining score allowed in the
         current visit or by a typo."""
+        segment = None
         try:
             score = score.lower()
-            if score.endswith("d"):
+            if score in NAMED_SEGMENTS:
+                segment = NAMED_SEGMENTS[score]
+                score = segment.points
+                if not (self._opened or self.rules.in_segment(segment.name)):
+                    score = 0
+                is_total = False
+            elif score.endswith("d"):
                 if len(score) == 1:
                     score = 0
                 else:
@@ -156,7 +210,7 @@ class Player:
                 score = int(score)
                 is_total = False
 
-            if self.score_valid(score):
+            if self.score_valid(score, is_total, segment):
                 return score, is_total
         except ValueError:
             # custom message
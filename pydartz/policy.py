@@ -0,0 +1,289 @@
+"""Module computing aiming policies that minimize the expected number of darts
+to finish a leg.
+
+Throws are modelled as two-dimensional Gaussian distributions around the aim
+point (see `montecarlo`). The probabilities of hitting every segment when
+aiming at any segment are obtained by numerical integration over the board
+geometry. Given these, the expected number of darts is computed for every
+state of a visit, i.e. score at the beginning of the visit, score left and
+darts left, by value iteration over increasing scores. A bust resets the
+score to the one at the beginning of the visit and forfeits the remaining
+darts of the visit, hence the expected number of darts of a score depends on
+itself; it is obtained as fixed point by the secant method.
+
+Solved policies can be stored in cache files keyed by the model parameters.
+Requires the optional `numpy` dependency.
+"""
+
+import os
+
+from . import board
+from .finishes import MAX_DARTS, SEGMENTS
+from .rules import DEFAULT_RULES, Rules
+
+MAX_SCORE = 501
+# maximum number of points scored in a visit. States of a visit are addressed
+# by the points scored so far
+MAX_VISIT_POINTS = MAX_DARTS * 60
+# number of grid points per axis for integrating the throw model, covering
+# four standard deviations around the aim point
+RESOLUTION = 161
+TOLERANCE = 1e-9
+MAX_ITERATIONS = 100
+# range and precision of standard deviations (in millimetres) considered by
+# sigma_for_average
+MIN_SIGMA = 0.1
+MAX_SIGMA = 500.0
+SIGMA_TOLERANCE = 1e-3
+# stored policies of other versions are solved again
+VERSION = 1
+
+
+def hit_probabilities(sigma, resolution=RESOLUTION, targets=None):
+    """Return an array holding the probability of hitting every segment (the
+    last column holds the probability of missing the board) when aiming at
+    every segment of `finishes.SEGMENTS`, or at the segments named in
+    `targets`.
+    """
+    import numpy as np
+
+    if targets is None:
+        targets = [s.name for s in SEGMENTS]
+
+    offsets = np.linspace(-4 * sigma, 4 * sigma, resolution)
+    dx, dy = np.meshgrid(offsets, offsets)
+    weights = np.exp(-(dx**2 + dy**2) / (2 * sigma**2)).ravel()
+    weights /= weights.sum()
+
+    probabilities = np.empty((len(targets), board.MISS + 1))
+    for i, target in enumerate(targets):
+        x, y = board.aim_point(target)
+        hits = board.segment_indices(x + dx.ravel(), y + dy.ravel())
+        probabilities[i] = np.bincount(hits, weights=weights, minlength=board.MISS + 1)
+    return probabilities
+
+
+def sigma_for_average(average, target="T20"):
+    """Return the standard deviation of the throw model for which aiming all
+    three darts of a visit at `target` scores `average` points on average.
+    The result is found by bisection.
+    """
+    import numpy as np
+
+    points = np.array([s.points for s in SEGMENTS] + [0])
+    low, high = MIN_SIGMA, MAX_SIGMA
+    for _ in range(MAX_ITERATIONS):
+        sigma = (low + high) / 2
+        if 3 * hit_probabilities(sigma, targets=(target,))[0] @ points > average:
+            low = sigma
+        else:
+            high = sigma
+        if high - low < SIGMA_TOLERANCE:
+            break
+    return (low + high) / 2
+
+
+class Policy:
+    """Aiming policy for a throw model with standard deviation `sigma` (in
+    millimetres) and a set of out-rules, covering all scores up to
+    `max_score`. In-rules are not taken into account.
+
+    `values` holds the expected number of darts to finish per score at the
+    beginning of a visit. `targets` holds the index of the optimal target
+    segment per score at the beginning of the visit, points scored so far in
+    the visit and darts left, or -1 for states that cannot occur.
+    """
+
+    def __init__(self, sigma, rules, values, targets):
+        self.sigma = sigma
+        self.rules = rules
+        self.values = values
+        self.targets = targets
+
+    @property
+    def max_score(self):
+        return len(self.values) - 1
+
+    @classmethod
+    def solve(cls, sigma, rules=DEFAULT_RULES, max_score=MAX_SCORE):
+        """Solve the policy for the throw model and the out-rule."""
+        return cls(sigma, rules, *_Solver(sigma, rules, max_score).solve())
+
+    @classmethod
+    def load(cls, filepath):
+        """Load a policy from a file written by `dump`. Raise a ValueError if
+        the file has a different version.
+        """
+        import numpy as np
+
+        with np.load(filepath) as data:
+            if int(data["version"]) != VERSION:
+                raise ValueError(f"Policy {filepath} has a different version")
+            return cls(
+                float(data["sigma"]),
+                Rules(out=str(data["out"])),
+                data["values"],
+                data["targets"],
+            )
+
+    def dump(self, filepath):
+        """Write the policy to a NumPy archive at `filepath`. The file is
+        replaced atomically, also if several processes write it at once.
+        """
+        import numpy as np
+
+        tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp_filepath, "wb") as file:
+            np.savez_compressed(
+                file,
+                version=VERSION,
+                sigma=self.sigma,
+                out=self.rules.out,
+                values=self.values,
+                targets=self.targets,
+            )
+        os.replace(tmp_filepath, filepath)
+
+    @classmethod
+    def open(cls, sigma, rules=DEFAULT_RULES, cache_dir=None, max_score=MAX_SCORE):
+        """Load the policy for the model parameters from its cache file in
+        `cache_dir`. If the file is missing or invalid, the policy is solved
+        and written to the cache file. Without `cache_dir`, the policy is
+        solved.
+        """
+        if cache_dir is None:
+            return cls.solve(sigma, rules, max_score)
+
+        filepath = policy_filepath(cache_dir, sigma, rules, max_score)
+        try:
+            return cls.load(filepath)
+        except (OSError, ValueError, KeyError):
+            policy = cls.solve(sigma, rules, max_score)
+            os.makedirs(cache_dir, exist_ok=True)
+            policy.dump(filepath)
+            return policy
+
+    def target(self, score, darts=MAX_DARTS, visit_start=None):
+        """Return the name of the optimal target segment for `score` with
+        `darts` darts left, or None if the state is not covered. The score at
+        the beginning of the visit (`visit_start`) defaults to `score`.
+        """
+        if visit_start is None:
+            visit_start = score
+        points = visit_start - score
+        if not (
+            0 < score <= visit_start <= self.max_score
+            and 0 <= points <= MAX_VISIT_POINTS
+            and 0 < darts <= MAX_DARTS
+        ):
+            return None
+        target = self.targets[visit_start, points, darts]
+        return None if target < 0 else SEGMENTS[target].name
+
+    def expected_darts(self, score):
+        """Return the expected number of darts to finish `score` from the
+        beginning of a visit.
+        """
+        return float(self.values[score])
+
+
+def policy_filepath(cache_dir, sigma, rules=DEFAULT_RULES, max_score=MAX_SCORE):
+    """Return the path of the cache file of the policy for the model
+    parameters.
+    """
+    return os.path.join(
+        cache_dir, f"policy-{rules.out}-out-{max_score}-sigma{sigma:g}.npz"
+    )
+
+
+class _Solver:
+    """Value iteration over the states of a visit. States are addressed by
+    the score at the beginning of the visit and the points scored so far.
+    """
+
+    def __init__(self, sigma, rules, max_score):
+        import numpy as np
+
+        self._np = np
+        self._probabilities = hit_probabilities(sigma).T
+        self._max_score = max_score
+        points = np.array([s.points for s in SEGMENTS] + [0])
+        out = np.array([rules.out_segment(s.name) for s in SEGMENTS] + [False])
+        valid = np.array([rules.remainder_valid(s) for s in range(max_score + 1)])
+
+        # points scored so far in the visit, before and after the next dart
+        self._visit_points = np.arange(MAX_VISIT_POINTS + 1)
+        offsets = self._visit_points[:, None] + points
+        self._offsets = offsets
+        self._next_offsets = np.minimum(offsets, MAX_VISIT_POINTS)
+        self._out = out
+        self._valid = valid
+
+    def solve(self):
+        np = self._np
+        values = np.zeros(self._max_score + 1)
+        targets = np.full(
+            (self._max_score + 1, MAX_VISIT_POINTS + 1, MAX_DARTS + 1), -1, np.int8
+        )
+        for start in range(1, self._max_score + 1):
+            if not self._valid[start]:
+                continue
+            outcomes = self._outcomes(start)
+            value = self._fixed_point(start, values, outcomes)
+            values[start] = value
+            _, targets[start] = self._visit(start, value, values, outcomes)
+        return values, targets
+
+    def _outcomes(self, start):
+        """Classify the outcomes of the next dart for every state of a visit
+        beginning at `start` into check-outs and busts. Also return a mask of
+        the states that can occur.
+        """
+        np = self._np
+        rest = start - self._offsets
+        checkout = (rest == 0) & self._out
+        bust = ~checkout & ((rest <= 0) | ~self._valid[np.clip(rest, 0, None)])
+        scores = start - self._visit_points
+        possible = (scores > 0) & self._valid[np.clip(scores, 0, None)]
+        return checkout, bust, possible
+
+    def _visit(self, start, value, values, outcomes):
+        """Return the expected number of darts of a visit beginning at
+        `start`, assuming that `value` is the expected number of darts of
+        `start` itself, together with the optimal targets per state.
+        """
+        np = self._np
+        checkout, bust, possible = outcomes
+        targets = np.full((MAX_VISIT_POINTS + 1, MAX_DARTS + 1), -1, np.int8)
+
+        # without darts left, the next visit begins
+        scores = start - self._visit_points
+        expected = np.where(scores == start, value, values[np.clip(scores, 0, None)])
+        for darts in range(1, MAX_DARTS + 1):
+            following = np.where(
+                checkout,
+                0.0,
+                np.where(bust, darts - 1 + value, expected[self._next_offsets]),
+            )
+            # one dart per target, plus the expectation over its outcomes
+            per_target = 1 + following @ self._probabilities
+            expected = per_target.min(axis=1)
+            targets[possible, darts] = per_target.argmin(axis=1)[possible]
+        return expected[0], targets
+
+    def _fixed_point(self, start, values, outcomes):
+        """Solve value = f(value) for the expected number of darts of `start`
+        by the secant method.
+        """
+        previous = values[start - 1] + 1 if start > 1 else 1.0
+        previous_error = self._visit(start, previous, values, outcomes)[0] - previous
+        current = previous + previous_error
+        for _ in range(MAX_ITERATIONS):
+            error = self._visit(start, current, values, outcomes)[0] - current
+            if abs(error) < TOLERANCE or error == previous_error:
+                break
+            previous, current = current, current - error * (current - previous) / (
+                error - previous_error
+            )
+            previous_error = error
+        return current
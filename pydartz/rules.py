@@ -0,0 +1,137 @@
+"""Module defining the in- and out-rules of a game.
+
+Out-rules determine the segments the last dart of a leg has to hit:
+- double: a double (including double bull)
+- master: a double or a treble
+- single: any segment
+In-rules determine the segments that have to be hit before a player's darts
+start to count:
+- straight: any segment
+- double: a double (including double bull)
+
+Lookup tables for validating finishes and the checkout tables are built once
+per out-rule when a session starts (see `Rules.build_tables`) and shared by all
+Rules instances, hence validating a throw takes constant time under any rule.
+"""
+
+import functools
+
+from .finishes import DOUBLES, MAX_DARTS, SEGMENTS, TREBLES, CheckoutTable, lookup_index
+
+OUT_RULES = {
+    "double": DOUBLES,
+    "master": DOUBLES + TREBLES,
+    "single": SEGMENTS,
+}
+IN_RULES = {
+    "straight": SEGMENTS,
+    "double": DOUBLES,
+}
+
+
+class Rules:
+    """The in- and out-rule of a session, given by the keys of `IN_RULES` and
+    `OUT_RULES`, resp.
+    """
+
+    def __init__(self, out="double", in_="straight"):
+        if out not in OUT_RULES:
+            raise ValueError(f"Unknown out-rule: {out}")
+        if in_ not in IN_RULES:
+            raise ValueError(f"Unknown in-rule: {in_}")
+        self.out = out
+        self.in_ = in_
+        self._out_names = frozenset(s.name for s in OUT_RULES[out])
+        self._in_names = frozenset(s.name for s in IN_RULES[in_])
+        self._min_out_points = min(s.points for s in OUT_RULES[out])
+
+    def __eq__(self, other):
+        return isinstance(other, Rules) and (self.out, self.in_) == (
+            other.out,
+            other.in_,
+        )
+
+    def __hash__(self):
+        return hash((self.out, self.in_))
+
+    def __str__(self):
+        return f"{self.in_}-in {self.out}-out"
+
+    def __repr__(self):
+        return f"Rules(out={self.out!r}, in_={self.in_!r})"
+
+    @classmethod
+    def from_string(cls, text):
+        """Create Rules from their string representation, e.g.
+        'straight-in master-out'.
+        """
+        in_rule, out_rule = text.split()
+        return cls(out=out_rule.removesuffix("-out"), in_=in_rule.removesuffix("-in"))
+
+    @property
+    def checkouts(self):
+        """The CheckoutTable of the out-rule."""
+        return _checkout_table(self.out)
+
+    def build_tables(self):
+        """Build the lookup tables of the out-rule unless they exist, s.t. no
+        throw of a game has to wait for them.
+        """
+        _finishable_table(self.out)
+
+    @property
+    def straight_in(self):
+        return self.in_ == "straight"
+
+    def finishable(self, score, darts=MAX_DARTS):
+        """Check whether `score` can be checked out with at most `darts`
+        darts.
+        """
+        if not 0 < score <= self.checkouts.max_score or not 0 <= darts <= MAX_DARTS:
+            return False
+        return bool(_finishable_table(self.out)[lookup_index(score, darts)])
+
+    def remainder_valid(self, score):
+        """Check whether a player may be left with `score`, i.e. whether the
+        score is zero or can still be checked out.
+        """
+        return score == 0 or score >= self._min_out_points
+
+    def out_segment(self, segment_name):
+        """Check whether the segment is allowed as last dart of a leg."""
+        return segment_name in self._out_names
+
+    def in_segment(self, segment_name):
+        """Check whether the segment opens a player's leg."""
+        return segment_name in self._in_names
+
+    def out_points(self, points):
+        """Check whether a single dart scoring `points` can end a leg."""
+        return self.finishable(points, 1)
+
+    def in_points(self, points):
+        """Check whether a single dart scoring `points` can open a leg."""
+        return points in _in_points(self.in_)
+
+
+DEFAULT_RULES = Rules()
+
+
+@functools.cache
+def _checkout_table(out):
+    return CheckoutTable(out_segments=OUT_RULES[out])
+
+
+@functools.cache
+def _finishable_table(out):
+    """Flat table of flags indicating whether a score can be checked out with
+    a number of darts, indexed by `finishes.lookup_index`.
+    """
+    return bytearray(
+        flag is not None for flag in _checkout_table(out).lookup_table(lambda _: True)
+    )
+
+
+@functools.cache
+def _in_points(in_):
+    return frozenset(s.points for s in IN_RULES[in_])
@@ -1,17 +1,27 @@
-from .communication import INFO_LEG
+from .communication import INFO_LEG, INFO_WIN
 from .database import LogEntryBase
+from .rules import DEFAULT_RULES
 
 
 class Session(LogEntryBase):
     """Representation of a darts session.
     Initialized with a list of players and the number of legs to win.
+    The `rules` (a `rules.Rules` instance, double-out by default) apply to all
+    players; they are logged unless they are the default.
     """
 
-    def __init__(self, players, nr_legs=1, log_parent=None, communicator=None):
-        super().__init__(log_parent, players=",".join([p.name for p in players]))
+    def __init__(
+        self, players, nr_legs=1, log_parent=None, communicator=None, rules=None
+    ):
+        rules = rules or DEFAULT_RULES
+        attributes = {} if rules == DEFAULT_RULES else {"rules": str(rules)}
+        super().__init__(
+            log_parent, players=",".join([p.name for p in players]), **attributes
+        )
 
         self._players = players
         self._nr_legs = nr_legs
+        self._rules = rules
         self._communicator = communicator
 
     def _player_won_enough_legs(self):
@@ -21,12 +31,14 @@ class Session(LogEntryBase):
     def run(self):
         """Play until a player has won the predefined number of legs."""
         Leg.start_player_index = 0
+        self._rules.build_tables()
 
         for p in self._players:
             p._nr_won_legs = 0
+            p.rules = self._rules
 
         while not self._player_won_enough_legs():
-            leg = Leg(self._players, log_parent=self)
+            leg = Leg(self._players, log_parent=self, communicator=self._communicator)
             leg.run()
 
             self.save()
@@ -42,17 +54,21 @@ class Leg(LogEntryBase):
 
     start_player_index = 0
 
-    def __init__(self, players, log_parent=None):
+    def __init__(self, players, log_parent=None, communicator=None):
         super().__init__(log_parent)
 
         self._players = players
         self._nr_players = len(self._players)
+        self._communicator = communicator
 
         self._current_player_index = Leg.start_player_index % self._nr_players
         Leg.start_player_index += 1
 
     def run(self):
-        """Players are taking turns and playing until a player wins."""
+        """Players are taking turns and playing until a player wins. After
+        every visit that does not finish the leg, the state of the leg is
+        reported to the communicator (if given).
+        """
         for p in self._players:
             p.reset()
 
@@ -69,6 +85,13 @@ class Leg(LogEntryBase):
             self._current_player_index += 1
             self._current_player_index %= self._nr_players
 
+            if self._communicator is not None:
+                self._communicator.print_info(
+                    INFO_WIN,
+                    players=self._players,
+                    next_player_index=self._current_player_index,
+                )
+
 
 class Visit(LogEntryBase):
     """Representation of a player's visit. Only used to log visit information to
@@ -80,10 +103,11 @@ class Visit(LogEntryBase):
         self._player = player
 
     def run(self):
-        """The player plays one visit. The log entry is updated."""
+        """The player plays one visit. The log entry is updated and journaled."""
         self._player.play()
         self._log_entry.attrib.update(
             dict(
                 points=str(self._player.visit_sum()), throws=str(3 - self._player.darts)
             )
         )
+        self.journal()
@@ -0,0 +1,289 @@
+"""Module for simulating games of bots.
+
+Bots are players of a given skill, i.e. three-dart average. Their throws
+follow the throw model matching the average (see `policy.sigma_for_average`),
+and they aim according to its optimal policy.
+
+`Bot` is a `player.Player` that plays its visits dart by dart without any
+input. Bots can take part in regular games and sessions, which are logged as
+usual.
+`Simulator` plays sessions of bots headless, without communicators and
+logging. Since the outcome of a visit only depends on the score at its
+beginning, every visit is sampled from the precomputed distribution of visit
+outcomes of the bot's skill with a single random draw.
+
+Requires the optional `numpy` dependency for computing the tables of a skill.
+"""
+
+import bisect
+import functools
+import itertools
+import random
+from collections import Counter
+
+from . import board
+from .communication import INFO_VISIT, SilentCommunicator
+from .database import PlayerEntry
+from .finishes import SEGMENTS
+from .player import Player
+from .policy import MAX_SCORE, Policy, hit_probabilities, sigma_for_average
+from .rules import DEFAULT_RULES, Rules
+from .winprob import DEFAULT_AVERAGE, visit_outcomes
+
+# target of bots before opening a double-in leg
+OPENING_TARGET = board.SEGMENT_INDEX["D20"]
+# target of bots beyond the scores covered by their policy
+SCORING_TARGET = board.SEGMENT_INDEX["T20"]
+
+
+class Bot(Player):
+    """Player of the skill given by a three-dart `average`, aiming according
+    to the optimal policy of its throw model. Pass a `seed` for reproducible
+    throws. Policies are cached in `cache_dir` (see `policy.Policy.open`).
+    Without `communicator`, the bot plays silently.
+    """
+
+    def __init__(
+        self,
+        name,
+        average=DEFAULT_AVERAGE,
+        start_value=501,
+        communicator=None,
+        rules=None,
+        seed=None,
+        cache_dir=None,
+    ):
+        super().__init__(
+            name,
+            start_value,
+            communicator=communicator or SilentCommunicator(),
+            rules=rules,
+        )
+        self.average = average
+        self._random = random.Random(seed)
+        self._cache_dir = cache_dir
+
+    def play(self):
+        """Throw the darts of a visit. A dart that busts ends the visit."""
+        self.begin()
+        tables = skill_tables(self.average, self.rules.out, self._cache_dir)
+        visit_start = self._score_left
+
+        while self._darts and not self.victorious():
+            if not self._opened:
+                target = OPENING_TARGET
+            elif visit_start > tables.max_score:
+                target = SCORING_TARGET
+            else:
+                target = tables.targets[visit_start][visit_start - self._score_left][
+                    self._darts
+                ]
+                # states reached by bots are covered by the policy
+                if target < 0:
+                    raise RuntimeError(
+                        f"No target for {self._score_left} with {self._darts} "
+                        f"darts in a visit started at {visit_start}"
+                    )
+            hit = tables.throw(target, self._random)
+
+            segment = SEGMENTS[hit] if hit < len(SEGMENTS) else None
+            points = 0
+            if segment is not None and (
+                self._opened or self.rules.in_segment(segment.name)
+            ):
+                points = segment.points
+            try:
+                self.score_valid(points, is_total=False, segment=segment)
+            except ValueError:
+                self.substract(-self.visit_sum(), True)
+            else:
+                self.substract(points, False)
+
+        self._communicator.print_info(INFO_VISIT, player=self)
+        self._communicator.print_newline()
+
+
+class SkillTables:
+    """Tables of a skill and out-rule used by bots: the policy and hit
+    probabilities of its throw model, the policy's targets and cumulative hit
+    probabilities per target as lists, and cumulative probabilities of the
+    visit outcomes per score at the beginning of a visit.
+    """
+
+    def __init__(self, average, out="double", cache_dir=None):
+        sigma = sigma_for_average(average)
+        self.policy = Policy.open(sigma, Rules(out=out), cache_dir=cache_dir)
+        self.probabilities = hit_probabilities(sigma)
+        self.max_score = self.policy.max_score
+        self.targets = self.policy.targets.tolist()
+        self.hits = [_cumulative(row) for row in self.probabilities.tolist()]
+
+    def throw(self, target, rng):
+        """Return the index of the segment hit when aiming at the segment with
+        index `target`, or `board.MISS`.
+        """
+        return bisect.bisect(self.hits[target], rng.random())
+
+    @functools.cached_property
+    def visits(self):
+        """Outcomes of a visit per score at its beginning, as tuple of
+        cumulative probabilities, scores at the end of the visit and numbers of
+        darts.
+        """
+        outcomes = visit_outcomes(self.policy, self.probabilities)
+        visits = []
+        for outcome in outcomes:
+            ends, darts = outcome.nonzero()
+            if not len(ends):
+                # scores that cannot occur
+                visits.append(None)
+                continue
+            visits.append(
+                (
+                    _cumulative(outcome[ends, darts].tolist()),
+                    ends.tolist(),
+                    darts.tolist(),
+                )
+            )
+        return visits
+
+
+@functools.lru_cache(maxsize=None)
+def skill_tables(average, out="double", cache_dir=None):
+    """Return the (cached) SkillTables of a skill and out-rule."""
+    return SkillTables(average, out, cache_dir)
+
+
+class Simulator:
+    """Headless engine playing sessions of bots, given as mapping of names to
+    three-dart averages. Like in `session.Session`, the bots take turns in
+    starting the legs of a session, and the first bot to win `nr_legs` legs
+    wins the session. Only straight-in rules are supported. Pass a `seed` for
+    reproducible results. Visit outcomes that were computed beforehand, e.g.
+    in another process, can be passed as `visits`, mapping averages to the
+    `SkillTables.visits` for the out-rule of `rules`; missing ones are
+    computed.
+
+    Statistics of all played legs are accumulated and can be obtained as
+    `database.PlayerEntry` objects.
+
+    Every visit costs a random draw, a bisection and a few list operations in
+    the interpreter, hence throughput is bounded by about a million visits
+    per second and core, i.e. roughly 60,000 to 70,000 legs of 501 per
+    second. Use `batch` for larger numbers of legs, or play sessions in
+    several processes (see `tournament`).
+    """
+
+    def __init__(
+        self,
+        averages,
+        nr_legs=1,
+        start_value=501,
+        rules=DEFAULT_RULES,
+        seed=None,
+        cache_dir=None,
+        visits=None,
+    ):
+        if not rules.straight_in:
+            raise ValueError("Only straight-in rules can be simulated.")
+        if nr_legs < 1:
+            raise ValueError("The number of legs to win must be at least 1.")
+        if not 0 < start_value <= MAX_SCORE:
+            raise ValueError(f"Start value must be between 1 and {MAX_SCORE}.")
+        if not rules.remainder_valid(start_value):
+            raise ValueError(f"Start value {start_value} cannot be checked out.")
+
+        self.names = list(averages)
+        visits = visits or {}
+        self._visits = [
+            visits.get(averages[n])
+            or skill_tables(averages[n], rules.out, cache_dir).visits
+            for n in self.names
+        ]
+        self._nr_legs = nr_legs
+        self._start_value = start_value
+        self._random = random.Random(seed)
+
+        nr_players = len(self.names)
+        self.legs_won = [0] * nr_players
+        self.sessions_won = [0] * nr_players
+        self._throws = [0] * nr_players
+        self._points = [[0] * (PlayerEntry.MAX_VISIT_POINTS + 1) for _ in self.names]
+        self._finishes = [Counter() for _ in self.names]
+        self._darters = [Counter() for _ in self.names]
+
+    def run(self, nr_sessions=1):
+        """Play `nr_sessions` sessions. Return the indices of their winners."""
+        return [self.run_session() for _ in range(nr_sessions)]
+
+    def run_session(self):
+        """Play a session. Return the index of its winner."""
+        won = [0] * len(self.names)
+        first = 0
+        while True:
+            winner = self.run_leg(first)
+            won[winner] += 1
+            if won[winner] == self._nr_legs:
+                self.sessions_won[winner] += 1
+                return winner
+            first = (first + 1) % len(self.names)
+
+    def run_leg(self, first=0):
+        """Play a leg started by the bot with index `first`. Return the index
+        of its winner.
+        """
+        nr_players = len(self.names)
+        visits = self._visits
+        points = self._points
+        scores = [self._start_value] * nr_players
+        throws = [0] * nr_players
+        rand = self._random.random
+        search = bisect.bisect
+
+        player = first
+        while True:
+            score = scores[player]
+            probabilities, ends, darts = visits[player][score]
+            outcome = search(probabilities, rand())
+            end = ends[outcome]
+            points[player][score - end] += 1
+            throws[player] += darts[outcome]
+            if end == 0:
+                break
+            scores[player] = end
+            player += 1
+            if player == nr_players:
+                player = 0
+
+        for i, nr_throws in enumerate(throws):
+            self._throws[i] += nr_throws
+        self.legs_won[player] += 1
+        self._finishes[player][score] += 1
+        self._darters[player][throws[player]] += 1
+        return player
+
+    def entries(self):
+        """Return the statistics of the bots as `database.PlayerEntry` objects,
+        mapped by name.
+        """
+        return {
+            name: PlayerEntry(
+                name,
+                dict(
+                    throws=self._throws[i],
+                    points=Counter({p: c for p, c in enumerate(self._points[i]) if c}),
+                    finishes=Counter(self._finishes[i]),
+                    darters=Counter(self._darters[i]),
+                ),
+            )
+            for i, name in enumerate(self.names)
+        }
+
+
+def _cumulative(probabilities):
+    """Return the cumulative sums of `probabilities`, ending with exactly one
+    s.t. bisecting a random number in [0, 1) never runs past the end.
+    """
+    cumulative = list(itertools.accumulate(probabilities))
+    cumulative[-1] = 1.0
+    return cumulative
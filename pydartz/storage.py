@@ -0,0 +1,252 @@
+"""Module providing a SQLite storage backend for the session log.
+
+Sessions, legs and visits are stored in normalized tables. The
+`SqliteSessions` class can be used as sessions log in place of
+`database.Sessions`, and `analyze_database` computes player statistics using
+SQL aggregates.
+"""
+
+import sqlite3
+from collections import Counter
+
+from .database import LogEntryBase, PlayerEntry, iter_log_file, to_timestamp
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    players TEXT NOT NULL,
+    rules TEXT
+);
+CREATE TABLE IF NOT EXISTS legs (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions (id),
+    timestamp TEXT NOT NULL,
+    aborted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    leg_id INTEGER NOT NULL REFERENCES legs (id),
+    timestamp TEXT NOT NULL,
+    player TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    throws INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_timestamp ON sessions (timestamp);
+CREATE INDEX IF NOT EXISTS legs_session ON legs (session_id);
+CREATE INDEX IF NOT EXISTS legs_timestamp ON legs (timestamp);
+CREATE INDEX IF NOT EXISTS visits_leg ON visits (leg_id);
+CREATE INDEX IF NOT EXISTS visits_player ON visits (player, leg_id);
+"""
+
+
+def connect(database_filepath):
+    """Open a connection to the database at `database_filepath` and create
+    tables and indexes if required. The database is put into WAL mode, s.t.
+    readers do not block a running game and vice versa.
+    """
+    connection = sqlite3.connect(database_filepath)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(SCHEMA)
+    # databases created before aborted legs and session rules were introduced
+    for table, column, definition in (
+        ("legs", "aborted", "INTEGER NOT NULL DEFAULT 0"),
+        ("sessions", "rules", "TEXT"),
+    ):
+        columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            with connection:
+                connection.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                )
+    return connection
+
+
+class SqliteSessions(LogEntryBase):
+    """Top-most log entry storing sessions in a SQLite database. Can be passed
+    as sessions log to `game.Game` instead of `database.Sessions`.
+
+    Session log entries are still built as `xml.etree._Element` objects by the
+    `session` classes. Upon saving, the rows of legs that were not yet saved
+    are inserted into the database. Only the session that was appended last is
+    kept in memory since it might still receive new legs.
+    """
+
+    def __init__(self, database_filepath=":memory:"):
+        self._connection = connect(database_filepath)
+        self._pending = []
+
+    def append(self, child_log_entry):
+        self._pending.append([child_log_entry, None, 0])
+
+    def save(self):
+        """Insert legs and sessions that were not yet saved into the database."""
+        with self._connection:
+            for pending in self._pending:
+                session, session_id, nr_saved_legs = pending
+                pending[1] = _insert_session(
+                    self._connection, session, session_id, nr_saved_legs
+                )
+                pending[2] = len(session)
+        del self._pending[:-1]
+
+    def journal(self, session, leg, visit):
+        """Visits are not journaled since legs are inserted in transactions."""
+
+    def close(self):
+        self._connection.close()
+
+
+def _insert_session(connection, session, session_id=None, nr_saved_legs=0):
+    """Insert the session log entry `session` (unless `session_id` is given,
+    indicating that the session is already stored) and its legs starting from
+    index `nr_saved_legs`. Return the ID of the session row.
+    """
+    if session_id is None:
+        session_id = connection.execute(
+            "INSERT INTO sessions (timestamp, players, rules) VALUES (?, ?, ?)",
+            (session.get("timestamp"), session.get("players"), session.get("rules")),
+        ).lastrowid
+
+    for leg in session[nr_saved_legs:]:
+        leg_id = connection.execute(
+            "INSERT INTO legs (session_id, timestamp, aborted) VALUES (?, ?, ?)",
+            (session_id, leg.get("timestamp"), int(bool(leg.get("aborted")))),
+        ).lastrowid
+        connection.executemany(
+            "INSERT INTO visits (leg_id, timestamp, player, points, throws) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    leg_id,
+                    v.get("timestamp"),
+                    v.get("player"),
+                    int(v.get("points")),
+                    int(v.get("throws")),
+                )
+                for v in leg
+            ),
+        )
+
+    return session_id
+
+
+def migrate_log(log_filepath, database_filepath):
+    """Copy all sessions of the XML log at `log_filepath` into the database
+    at `database_filepath`. The XML log is parsed incrementally and the rows
+    are inserted in a single transaction.
+    """
+    connection = connect(database_filepath)
+    with connection:
+        for session in iter_log_file(log_filepath):
+            _insert_session(connection, session)
+    connection.close()
+
+
+def analyze_database(
+    database, names=None, since=None, until=None, last_sessions=None, last_legs=None
+):
+    """Analyze the sessions stored in `database` (a filepath or an open
+    `sqlite3.Connection`) using SQL aggregates. Return a dict of PlayerEntrys,
+    analogous to `database.analyze_sessions`.
+
+    The analysis can be restricted to the players in `names` and to legs
+    played in the time range [`since`, `until`). The latter are datetime or
+    date objects, or timestamp strings formatted acc. to `LogEntryBase.DT_FORMAT`.
+    Furthermore, the analysis can be restricted to the `last_sessions` most
+    recent sessions or the `last_legs` most recent legs (before `until`, if
+    given).
+    """
+    connection = database
+    if not isinstance(database, sqlite3.Connection):
+        connection = connect(database)
+
+    leg_conditions, leg_parameters = ["1"], []
+    for operator, bound in ((">=", since), ("<", until)):
+        if bound is not None:
+            leg_conditions.append(f"l.timestamp {operator} ?")
+            leg_parameters.append(to_timestamp(bound))
+    time_condition, time_parameters = " AND ".join(leg_conditions), leg_parameters[:]
+    for column, limit in (("session_id", last_sessions), ("id", last_legs)):
+        if limit is not None and limit < 1:
+            # like the index of the log, no legs are selected
+            leg_conditions.append("0")
+        elif limit is not None:
+            # ID of the N-th most recent leg or session within the time range
+            leg_conditions.append(f"""l.{column} >= COALESCE((
+                    SELECT DISTINCT l.{column} FROM legs l WHERE {time_condition}
+                    ORDER BY l.{column} DESC LIMIT 1 OFFSET ?
+                ), 0)""")
+            leg_parameters.extend(time_parameters + [limit - 1])
+    leg_condition = " AND ".join(leg_conditions)
+
+    name_condition, name_parameters = "1", []
+    if names is not None:
+        names = list(names)
+        name_condition = f"v.player IN ({', '.join('?' * len(names))})"
+        name_parameters = names
+
+    selected = f"""
+        WITH selected AS (
+            SELECT v.*, l.aborted FROM visits v JOIN legs l ON v.leg_id = l.id
+            WHERE {leg_condition}
+        ), finals AS (
+            SELECT MAX(id) AS id FROM selected WHERE NOT aborted GROUP BY leg_id
+        )
+    """
+    parameters = leg_parameters + name_parameters
+
+    players = {}
+    session_players = connection.execute(
+        f"""SELECT DISTINCT s.players FROM sessions s JOIN legs l
+        ON l.session_id = s.id WHERE {leg_condition}""",
+        leg_parameters,
+    )
+    for (session_names,) in session_players:
+        for name in session_names.split(","):
+            if name not in players and (names is None or name in names):
+                players[name] = PlayerEntry(name)
+
+    throws = connection.execute(
+        f"""{selected} SELECT v.player, SUM(v.throws) FROM selected v
+        WHERE {name_condition} GROUP BY v.player""",
+        parameters,
+    )
+    points = connection.execute(
+        f"""{selected} SELECT v.player, v.points, COUNT(*) FROM selected v
+        WHERE {name_condition} GROUP BY v.player, v.points""",
+        parameters,
+    )
+    finishes = connection.execute(
+        f"""{selected} SELECT v.player, v.points, COUNT(*) FROM selected v
+        JOIN finals f ON v.id = f.id WHERE {name_condition}
+        GROUP BY v.player, v.points""",
+        parameters,
+    )
+    darters = connection.execute(
+        f"""{selected} SELECT player, darter, COUNT(*) FROM (
+            SELECT v.player, SUM(w.throws) AS darter FROM selected v
+            JOIN finals f ON v.id = f.id
+            JOIN selected w ON w.leg_id = v.leg_id AND w.player = v.player
+            WHERE {name_condition} GROUP BY v.id
+        ) GROUP BY player, darter""",
+        parameters,
+    )
+
+    stats = {
+        name: dict(throws=0, points=Counter(), finishes=Counter(), darters=Counter())
+        for name in players
+    }
+    for name, total in throws:
+        stats[name]["throws"] = total
+    for name, value, count in points:
+        stats[name]["points"][value] = count
+    for name, finish, count in finishes:
+        stats[name]["finishes"][finish] = count
+    for name, darter, count in darters:
+        stats[name]["darters"][darter] = count
+
+    if connection is not database:
+        connection.close()
+
+    return {name: PlayerEntry(name, stats[name]) for name in players}
@@ -0,0 +1,229 @@
+"""Module running tournaments of bots.
+
+The bots of a roster, given as mapping of names to three-dart averages, play
+matches of `nr_legs` legs to win (like a `session.Session`) either in a
+round-robin, where every bot plays every other bot once, or in a knockout,
+where the winners of a round advance to the next one. Matches are played by
+`simulation.Simulator` in a pool of worker processes, and results are
+reported as soon as they are completed. The visit outcomes of the bots'
+skills are computed once, before the matches are started, and handed to every
+worker.
+
+Every match is seeded from the tournament seed and the number of the match,
+hence the results are reproducible regardless of the number of workers and
+the order in which matches are completed.
+
+Requires the optional `numpy` dependency for computing the tables of a skill.
+"""
+
+import itertools
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .database import PlayerEntry
+from .rules import DEFAULT_RULES
+from .simulation import Simulator, skill_tables
+
+ROUND_ROBIN = "round-robin"
+KNOCKOUT = "knockout"
+FORMATS = (ROUND_ROBIN, KNOCKOUT)
+
+# Result of a match: its number, the names of its players in the order of
+# play, the name of the winner, the legs won per player, and the statistics of
+# the players as `database.PlayerEntry` objects mapped by name
+MatchResult = namedtuple(
+    "MatchResult", ["number", "players", "winner", "legs_won", "entries"]
+)
+# Standing of a bot in a tournament
+Standing = namedtuple("Standing", ["name", "played", "won", "legs_won", "legs_lost"])
+
+# visit outcomes of the bots mapped by average, set in worker processes
+_worker_visits = {}
+
+
+class Tournament:
+    """Tournament of the bots of a roster, mapping names to three-dart
+    averages, in the given `format` (see `FORMATS`). In a knockout, bots are
+    paired in roster order, and the last bot of a round with an odd number
+    of bots advances without playing. Pass a `seed` for reproducible results.
+    Policies are cached in `cache_dir` (see `policy.Policy.open`).
+    """
+
+    def __init__(
+        self,
+        averages,
+        nr_legs=1,
+        format=ROUND_ROBIN,
+        start_value=501,
+        rules=DEFAULT_RULES,
+        seed=None,
+        cache_dir=None,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown tournament format: {format}")
+        if len(averages) < 2:
+            raise ValueError("A tournament needs at least two players.")
+        if nr_legs < 1:
+            raise ValueError("The number of legs to win must be at least 1.")
+        # validated here since matches are only played by the workers
+        if not rules.straight_in:
+            raise ValueError("Only straight-in rules can be simulated.")
+
+        self._averages = dict(averages)
+        self._nr_legs = nr_legs
+        self._format = format
+        self._start_value = start_value
+        self._rules = rules
+        self._seed = seed
+        self._cache_dir = cache_dir
+
+        self.results = []
+        self._entries = {name: PlayerEntry(name) for name in self._averages}
+
+    def run(self, max_workers=None):
+        """Play all matches in a pool of `max_workers` processes (default:
+        number of CPUs). Yield the MatchResults in the order of completion.
+        The visit outcomes of the bots are computed in a pool first and
+        handed to the workers playing the matches on their start.
+        """
+        averages = sorted(set(self._averages.values()))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            visits = dict(
+                zip(
+                    averages,
+                    executor.map(
+                        compute_visits,
+                        averages,
+                        itertools.repeat(self._rules.out),
+                        itertools.repeat(self._cache_dir),
+                    ),
+                )
+            )
+
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(visits,)
+        ) as executor:
+            if self._format == ROUND_ROBIN:
+                pairings = list(itertools.combinations(self._averages, 2))
+                yield from self._play_round(executor, pairings)
+                return
+
+            remaining = list(self._averages)
+            while len(remaining) > 1:
+                pairings = list(zip(remaining[::2], remaining[1::2]))
+                winners = set()
+                for result in self._play_round(executor, pairings):
+                    winners.add(result.winner)
+                    yield result
+
+                # the order of the roster is kept, including a bot without
+                # opponent
+                remaining = [
+                    name
+                    for i, name in enumerate(remaining)
+                    if name in winners or i == len(pairings) * 2
+                ]
+
+    def _play_round(self, executor, pairings):
+        """Submit the matches of `pairings` to `executor`. Yield their results
+        as they are completed.
+        """
+        futures = []
+        for players in pairings:
+            number = len(self.results) + len(futures)
+            futures.append(
+                executor.submit(
+                    play_match,
+                    number,
+                    {name: self._averages[name] for name in players},
+                    self._nr_legs,
+                    self._start_value,
+                    self._rules,
+                    match_seed(self._seed, number),
+                    self._cache_dir,
+                )
+            )
+
+        completed = []
+        for future in as_completed(futures):
+            result = future.result()
+            for name, entry in result.entries.items():
+                self._entries[name].merge(entry)
+            completed.append(result)
+            yield result
+
+        # results are kept in the order of the matches
+        self.results.extend(sorted(completed, key=lambda r: r.number))
+
+    def standings(self):
+        """Return the Standings of the bots of the matches played so far,
+        ordered by matches won, leg difference, legs won and name.
+        """
+        played = dict.fromkeys(self._averages, 0)
+        won = dict.fromkeys(self._averages, 0)
+        legs_won = dict.fromkeys(self._averages, 0)
+        legs_lost = dict.fromkeys(self._averages, 0)
+        for result in self.results:
+            won[result.winner] += 1
+            total_legs = sum(result.legs_won)
+            for name, legs in zip(result.players, result.legs_won):
+                played[name] += 1
+                legs_won[name] += legs
+                legs_lost[name] += total_legs - legs
+
+        standings = [
+            Standing(name, played[name], won[name], legs_won[name], legs_lost[name])
+            for name in self._averages
+        ]
+        return sorted(
+            standings,
+            key=lambda s: (-s.won, s.legs_lost - s.legs_won, -s.legs_won, s.name),
+        )
+
+    def entries(self):
+        """Return the statistics of the bots in the matches played so far as
+        `database.PlayerEntry` objects, mapped by name.
+        """
+        return self._entries
+
+
+def play_match(number, averages, nr_legs, start_value, rules, seed, cache_dir):
+    """Play a match between the bots of `averages`. Return its MatchResult.
+    Executed in worker processes.
+    """
+    simulator = Simulator(
+        averages,
+        nr_legs=nr_legs,
+        start_value=start_value,
+        rules=rules,
+        seed=seed,
+        cache_dir=cache_dir,
+        visits=_worker_visits,
+    )
+    winner = simulator.run_session()
+    return MatchResult(
+        number,
+        tuple(simulator.names),
+        simulator.names[winner],
+        tuple(simulator.legs_won),
+        simulator.entries(),
+    )
+
+
+def compute_visits(average, out, cache_dir):
+    """Return the visit outcomes of a skill and out-rule (see
+    `simulation.SkillTables.visits`). Executed in worker processes.
+    """
+    return skill_tables(average, out, cache_dir).visits
+
+
+def _init_worker(visits):
+    """Initialize a worker process with the visit outcomes of the bots."""
+    _worker_visits.update(visits)
+
+
+def match_seed(seed, number):
+    """Return the seed of the match with `number` in a tournament seeded with
+    `seed`, or None for unseeded tournaments.
+    """
+    return None if seed is None else f"{seed}:{number}"
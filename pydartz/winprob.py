@@ -0,0 +1,243 @@
+"""Module estimating the probabilities of the players of a leg to win it.
+
+A player's skill is given by their three-dart average, e.g. fitted from the
+player's history in the session log. Averages are grouped into buckets of
+`BUCKET_WIDTH` points. For every bucket, the throw model scoring the average
+when aiming at the treble 20 (see `policy.sigma_for_average`) and its optimal
+aiming policy give the distribution of the number of visits to finish any
+score. These tables are computed once per bucket and out-rule, and cached on
+disk next to the policies. `WinEstimator.from_entries` computes the tables of
+all players before a game is started.
+
+Given the tables, the chance of every player to finish first is obtained by a
+race over the visits in turn order, assuming that the players' visits are
+independent. Estimates refer to the beginning of the next player's visit.
+
+Requires the optional `numpy` dependency.
+"""
+
+import functools
+import os
+
+from .finishes import MAX_DARTS, SEGMENTS
+from .policy import (
+    MAX_SCORE,
+    MAX_VISIT_POINTS,
+    Policy,
+    hit_probabilities,
+    sigma_for_average,
+)
+from .rules import DEFAULT_RULES
+
+BUCKET_WIDTH = 5
+MIN_AVERAGE = 20
+MAX_AVERAGE = 120
+# assumed average of players without history
+DEFAULT_AVERAGE = 40
+# visits taken into account per player. Legs taking longer are neglected
+MAX_VISITS = 100
+
+
+def skill_bucket(average):
+    """Return the bucket of a three-dart average."""
+    average = min(max(average, MIN_AVERAGE), MAX_AVERAGE)
+    return BUCKET_WIDTH * round(average / BUCKET_WIDTH)
+
+
+@functools.lru_cache(maxsize=None)
+def finish_table(bucket, rules=DEFAULT_RULES, cache_dir=None, max_score=MAX_SCORE):
+    """Return an array holding the probability to finish within n visits per
+    number of visits n (rows) and score (columns) for the skill `bucket`. The
+    table and the aiming policy of the bucket are cached in `cache_dir` (see
+    `policy.Policy.open`).
+    """
+    import numpy as np
+
+    if cache_dir is not None:
+        filepath = finish_table_filepath(cache_dir, bucket, rules, max_score)
+        try:
+            table = np.load(filepath)
+        except (OSError, ValueError):
+            pass
+        else:
+            if table.shape == (MAX_VISITS + 1, max_score + 1):
+                return table
+
+    sigma = sigma_for_average(bucket)
+    policy = Policy.open(sigma, rules, cache_dir=cache_dir, max_score=max_score)
+    transitions = visit_transitions(policy, hit_probabilities(sigma))
+
+    table = np.zeros((MAX_VISITS + 1, max_score + 1))
+    table[0, 0] = 1
+    for visits in range(1, MAX_VISITS + 1):
+        table[visits] = transitions @ table[visits - 1]
+
+    if cache_dir is not None:
+        # the file is replaced atomically, cf. policy.Policy.dump
+        tmp_filepath = f"{filepath}.{os.getpid()}.tmp"
+        with open(tmp_filepath, "wb") as file:
+            np.save(file, table)
+        os.replace(tmp_filepath, filepath)
+    return table
+
+
+def finish_table_filepath(cache_dir, bucket, rules=DEFAULT_RULES, max_score=MAX_SCORE):
+    """Return the path of the cache file of the finish table of the skill
+    `bucket`, next to the cache file of its policy.
+    """
+    return os.path.join(
+        cache_dir, f"finishes-{rules.out}-out-{max_score}-bucket{bucket}.npy"
+    )
+
+
+def visit_transitions(policy, probabilities):
+    """Return a matrix holding the probability that a visit beginning with a
+    score (rows) ends with a score (columns) when following `policy`. Busts
+    end with the score of the beginning of the visit. The finished score of
+    zero is kept.
+    `probabilities` are the hit probabilities of the policy's throw model.
+    """
+    transitions = visit_outcomes(policy, probabilities).sum(axis=2)
+    transitions[0, 0] = 1
+    return transitions
+
+
+def visit_outcomes(policy, probabilities):
+    """Return an array holding the probability that a visit beginning with a
+    score (first axis) ends with a score (second axis) after a number of darts
+    (third axis) when following `policy`. Like in the log, busts count as
+    visits of three darts ending with the score of the beginning of the visit.
+    `probabilities` are the hit probabilities of the policy's throw model.
+    """
+    import numpy as np
+
+    rules = policy.rules
+    size = policy.max_score + 1
+    starts = np.arange(size)[:, None]
+    visit_points = np.arange(MAX_VISIT_POINTS + 1)
+    valid = np.array([rules.remainder_valid(s) for s in range(size)])
+
+    outcomes = np.zeros((size, size, MAX_DARTS + 1))
+    # probabilities of the states of the visits, by points scored so far
+    states = np.zeros((size, MAX_VISIT_POINTS + 1))
+    states[valid & (starts[:, 0] > 0), 0] = 1
+
+    for darts in range(MAX_DARTS, 0, -1):
+        targets = policy.targets[:, :, darts]
+        following = np.zeros_like(states)
+        for outcome, points in enumerate([s.points for s in SEGMENTS] + [0]):
+            thrown = np.where(targets < 0, 0, probabilities[targets, outcome] * states)
+            rest = starts - visit_points - points
+            checkout = (rest == 0) & rules.out_segment(_segment_name(outcome))
+            bust = ~checkout & ((rest <= 0) | ~valid[np.clip(rest, 0, None)])
+
+            outcomes[:, 0, MAX_DARTS + 1 - darts] += (thrown * checkout).sum(axis=1)
+            outcomes[starts[:, 0], starts[:, 0], MAX_DARTS] += (thrown * bust).sum(
+                axis=1
+            )
+            # continuing visits cannot score more than the maximum
+            continuing = thrown * ~(checkout | bust)
+            kept = MAX_VISIT_POINTS + 1 - points
+            following[:, points:] += continuing[:, :kept]
+        states = following
+
+    # visits ending after the last dart
+    for points in visit_points:
+        ends = starts[points:, 0]
+        outcomes[ends, ends - points, MAX_DARTS] += states[points:, points]
+    return outcomes
+
+
+def win_probabilities(tables, scores):
+    """Return the probabilities of the players to win a leg, given the
+    players' finish tables (see `finish_table`) and scores in turn order,
+    starting with the player to throw next.
+    """
+    import numpy as np
+
+    finished = np.array([table[:, score] for table, score in zip(tables, scores)])
+    exactly = np.diff(finished, axis=1)
+    # players following in turn order finish in the same visit round, players
+    # preceding must not have finished in it
+    unfinished_before = 1 - finished[:, :-1]
+    unfinished_after = 1 - finished[:, 1:]
+
+    probabilities = np.empty(len(scores))
+    for i in range(len(scores)):
+        following = i + 1
+        probabilities[i] = (
+            exactly[i]
+            * np.prod(unfinished_after[:i], axis=0)
+            * np.prod(unfinished_before[following:], axis=0)
+        ).sum()
+    return (probabilities / probabilities.sum()).tolist()
+
+
+class WinEstimator:
+    """Estimator of the players' chances to win a leg. The players' skills
+    are given by a mapping of names to three-dart averages; players without
+    average are assumed to score `DEFAULT_AVERAGE`. Policies and finish
+    tables are cached in `cache_dir`.
+    """
+
+    def __init__(self, averages=None, cache_dir=None, max_score=MAX_SCORE):
+        self._averages = dict(averages or {})
+        self._cache_dir = cache_dir
+        self._max_score = max_score
+
+    @classmethod
+    def from_entries(cls, player_entries, rules=DEFAULT_RULES, **kwargs):
+        """Create an estimator from the averages of `database.PlayerEntry`
+        objects, mapped by player name (e.g. the result of
+        `database.analyze_log_file`). The finish tables of all players are
+        computed for `rules`, s.t. estimates during a game are fast.
+        """
+        averages = {
+            name: 3 * entry.average()
+            for name, entry in player_entries.items()
+            if entry.throws
+        }
+        estimator = cls(averages, **kwargs)
+        estimator.prepare(rules)
+        return estimator
+
+    def prepare(self, rules=DEFAULT_RULES):
+        """Compute the finish tables of the skill buckets of all players,
+        including players without average.
+        """
+        averages = set(self._averages.values()) | {DEFAULT_AVERAGE}
+        for bucket in sorted({skill_bucket(a) for a in averages}):
+            finish_table(bucket, rules, self._cache_dir, self._max_score)
+
+    def average(self, name):
+        return self._averages.get(name, DEFAULT_AVERAGE)
+
+    def estimate(self, players, next_index=0, rules=DEFAULT_RULES):
+        """Return the chances to win of the players, given as sequence of
+        (name, score left) pairs in turn order, if the player at `next_index`
+        throws next. Return None if a score is not covered by the tables or if
+        a player has already finished.
+        """
+        if not all(0 < score <= self._max_score for _, score in players):
+            return None
+
+        order = [(next_index + i) % len(players) for i in range(len(players))]
+        tables = [
+            finish_table(
+                skill_bucket(self.average(players[i][0])),
+                rules,
+                self._cache_dir,
+                self._max_score,
+            )
+            for i in order
+        ]
+        probabilities = win_probabilities(tables, [players[i][1] for i in order])
+
+        result = [0.0] * len(players)
+        for i, probability in zip(order, probabilities):
+            result[i] = probability
+        return result
+
+
+def _segment_name(index):
+    return SEGMENTS[index].name if index < len(SEGMENTS) else None
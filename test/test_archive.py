@@ -0,0 +1,196 @@
+import os.path
+import tempfile
+import unittest
+from unittest import mock
+from xml.etree import ElementTree as etree
+
+from pydartz.archive import (
+    MANIFEST_FILENAME,
+    analyze_archive,
+    analyze_history,
+    compact_log,
+    load_summary,
+)
+from pydartz.database import Sessions, analyze_sessions, iter_log_file
+
+
+def _add_session(sessions, day, month, nr_legs=2):
+    """Add a session of Peter and Paul played on `day` of `month` in 2024.
+    Paul wins every leg with a visit of 80 points.
+    """
+    timestamp = f"2024{month:02d}{day:02d}-200000"
+    session = etree.SubElement(
+        sessions, "session", timestamp=timestamp, players="Peter,Paul"
+    )
+    for i in range(nr_legs):
+        leg = etree.SubElement(session, "leg", timestamp=f"{timestamp[:11]}{i}000")
+        for player, points in (("Peter", 26), ("Paul", 81), ("Peter", 41)):
+            etree.SubElement(
+                leg,
+                "visit",
+                timestamp=leg.get("timestamp"),
+                player=player,
+                points=str(points),
+                throws="3",
+            )
+        etree.SubElement(
+            leg,
+            "visit",
+            timestamp=leg.get("timestamp"),
+            player="Paul",
+            points="80",
+            throws="2",
+        )
+
+
+class ArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        self.archive_dir = os.path.join(self.tmp_dir.name, "archive")
+        sessions = Sessions(log_filepath=self.log_filepath)
+        for day, month in ((3, 1), (20, 1), (5, 2), (1, 3), (2, 3)):
+            _add_session(sessions._log_entry, day, month)
+        sessions.save()
+        self.sessions = [
+            etree.fromstring(etree.tostring(s)) for s in sessions._log_entry
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertEntriesEqual(self, entries, expected_entries):
+        self.assertSetEqual(set(entries), set(expected_entries))
+        for name, entry in entries.items():
+            self.assertDictEqual(entry.to_dict(), expected_entries[name].to_dict())
+
+    def test_compact(self):
+        self.assertEqual(compact_log(self.log_filepath, before="20240315-000000"), 3)
+
+        remaining = list(iter_log_file(self.log_filepath))
+        self.assertListEqual(
+            [s.get("timestamp") for s in remaining],
+            ["20240301-200000", "20240302-200000"],
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.archive_dir, "stats-2024-01.xml.gz"))
+        )
+
+        summary = load_summary(self.archive_dir)
+        self.assertListEqual(sorted(summary["segments"]), ["2024-01", "2024-02"])
+        self.assertEqual(summary["segments"]["2024-01"]["nr_sessions"], 2)
+        self.assertEntriesEqual(
+            analyze_archive(self.archive_dir), analyze_sessions(self.sessions[:3])
+        )
+
+        # the live log can be appended to after compaction
+        sessions = Sessions(log_filepath=self.log_filepath)
+        _add_session(sessions._log_entry, 4, 3)
+        sessions.save()
+        self.assertEqual(len(list(iter_log_file(self.log_filepath))), 3)
+
+    def test_compact_nothing(self):
+        with open(self.log_filepath, "rb") as file:
+            contents = file.read()
+        self.assertEqual(compact_log(self.log_filepath, before="20240101-000000"), 0)
+        with open(self.log_filepath, "rb") as file:
+            self.assertEqual(file.read(), contents)
+        self.assertDictEqual(load_summary(self.archive_dir)["segments"], {})
+
+    def test_compact_repeatedly(self):
+        compact_log(self.log_filepath, before="20240201-000000")
+        compact_log(self.log_filepath, before="20240401-000000")
+
+        self.assertEqual(len(list(iter_log_file(self.log_filepath))), 0)
+        summary = load_summary(self.archive_dir)
+        self.assertEqual(summary["segments"]["2024-03"]["nr_sessions"], 2)
+        self.assertEntriesEqual(
+            analyze_archive(self.archive_dir), analyze_sessions(self.sessions)
+        )
+
+    def test_compact_interrupted(self):
+        expected = analyze_sessions(self.sessions)
+        compact_log(self.log_filepath, before="20240201-000000")
+
+        # the process is killed after replacing the segments, before the log
+        replace = os.replace
+
+        def interrupted_replace(source, target):
+            if target == self.log_filepath:
+                raise KeyboardInterrupt
+            replace(source, target)
+
+        with mock.patch("pydartz.archive.os.replace", interrupted_replace):
+            with self.assertRaises(KeyboardInterrupt):
+                compact_log(self.log_filepath, before="20240401-000000")
+        self.assertTrue(
+            os.path.exists(os.path.join(self.archive_dir, MANIFEST_FILENAME))
+        )
+        self.assertEqual(len(list(iter_log_file(self.log_filepath))), 3)
+
+        # the compaction is completed before analyzing
+        self.assertEntriesEqual(analyze_history(self.log_filepath), expected)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.archive_dir, MANIFEST_FILENAME))
+        )
+        self.assertEqual(len(list(iter_log_file(self.log_filepath))), 0)
+        self.assertEqual(compact_log(self.log_filepath, before="20240401-000000"), 0)
+        self.assertEntriesEqual(analyze_history(self.log_filepath), expected)
+
+    def test_analyze_history(self):
+        expected = analyze_sessions(self.sessions)
+        compact_log(self.log_filepath, before="20240301-000000")
+
+        self.assertEntriesEqual(analyze_history(self.log_filepath), expected)
+        self.assertEntriesEqual(
+            analyze_history(self.log_filepath, names=["Paul"]),
+            {"Paul": expected["Paul"]},
+        )
+
+    def test_analyze_history_window(self):
+        compact_log(self.log_filepath, before="20240301-000000")
+
+        # January partially, February completely, March partially
+        partial_first = etree.fromstring(etree.tostring(self.sessions[1]))
+        partial_first.remove(partial_first[0])
+        partial_last = etree.fromstring(etree.tostring(self.sessions[3]))
+        partial_last.remove(partial_last[1])
+        self.assertEntriesEqual(
+            analyze_history(
+                self.log_filepath, since="20240120-201000", until="20240301-201000"
+            ),
+            analyze_sessions([partial_first, self.sessions[2], partial_last]),
+        )
+        self.assertEntriesEqual(
+            analyze_history(self.log_filepath, last_sessions=1),
+            analyze_sessions(self.sessions[4:]),
+        )
+
+    def test_analyze_history_last_archived(self):
+        compact_log(self.log_filepath, before="20240301-000000")
+
+        # the log holds two sessions of two legs each
+        self.assertEntriesEqual(
+            analyze_history(self.log_filepath, last_sessions=4),
+            analyze_sessions(self.sessions[1:]),
+        )
+        last_leg = etree.fromstring(etree.tostring(self.sessions[2]))
+        last_leg.remove(last_leg[0])
+        self.assertEntriesEqual(
+            analyze_history(self.log_filepath, last_legs=5),
+            analyze_sessions([last_leg] + self.sessions[3:]),
+        )
+        first_leg = etree.fromstring(etree.tostring(self.sessions[3]))
+        first_leg.remove(first_leg[1])
+        self.assertEntriesEqual(
+            analyze_history(self.log_filepath, until="20240301-201000", last_legs=3),
+            analyze_sessions([self.sessions[2], first_leg]),
+        )
+        self.assertEntriesEqual(
+            analyze_history(self.log_filepath, since="20240201-000000", last_legs=10),
+            analyze_sessions(self.sessions[2:]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
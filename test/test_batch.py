@@ -0,0 +1,92 @@
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from pydartz.batch import _alias_tables, averages, simulate_legs, simulate_matches
+from pydartz.rules import Rules
+from pydartz.simulation import Simulator
+
+
+@unittest.skipUnless(np, "requires numpy")
+class SimulateLegsTestCase(unittest.TestCase):
+    def test_reproducible(self):
+        first = simulate_legs([90, 60], 500, seed=3)
+        second = simulate_legs([90, 60], 500, seed=3)
+        for a, b in zip(first, second):
+            np.testing.assert_array_equal(a, b)
+
+    def test_results(self):
+        results = simulate_legs([90, 60], 2000, first=np.arange(2000) % 2, seed=1)
+        winners = np.arange(2000), results.winners
+        np.testing.assert_array_equal(results.points[winners], 501)
+        np.testing.assert_array_equal(results.darts, results.throws[winners])
+        self.assertGreaterEqual(results.darts.min(), 9)
+        self.assertTrue((results.points <= 501).all())
+        self.assertGreater(np.count_nonzero(results.winners == 0), 1000)
+
+        three_dart_averages = averages(results)
+        self.assertGreater(three_dart_averages[0], three_dart_averages[1])
+
+    def test_matches_simulator(self):
+        results = simulate_legs([80, 60], 20000, first=np.arange(20000) % 2, seed=1)
+        simulator = Simulator({"Robo": 80, "Tron": 60}, seed=1)
+        for i in range(20000):
+            simulator.run_leg(i % 2)
+
+        entries = simulator.entries()
+        self.assertAlmostEqual(
+            np.mean(results.winners == 0), simulator.legs_won[0] / 20000, delta=0.02
+        )
+        for i, name in enumerate(simulator.names):
+            self.assertAlmostEqual(
+                averages(results)[i], 3 * entries[name].average(), delta=1
+            )
+
+    def test_start_value(self):
+        results = simulate_legs([90], 100, start_value=101, seed=1)
+        np.testing.assert_array_equal(results.points, 101)
+        np.testing.assert_array_equal(results.winners, 0)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            simulate_legs([90], 10, rules=Rules(in_="double"))
+        with self.assertRaises(ValueError):
+            simulate_legs([90], 10, start_value=701)
+        with self.assertRaises(ValueError):
+            simulate_legs([90], 10, start_value=1)
+        # a single dart can be checked out under single-out rules
+        results = simulate_legs([90], 10, start_value=1, rules=Rules(out="single"))
+        np.testing.assert_array_equal(results.points, 1)
+
+
+@unittest.skipUnless(np, "requires numpy")
+class SimulateMatchesTestCase(unittest.TestCase):
+    def test_matches(self):
+        results = simulate_matches([60, 90], 1000, 4, seed=1)
+        np.testing.assert_array_equal(results.legs_won.max(axis=1), 4)
+        self.assertTrue((results.legs_won.min(axis=1) < 4).all())
+        np.testing.assert_array_equal(results.winners, results.legs_won.argmax(axis=1))
+        self.assertGreater(np.count_nonzero(results.winners == 1), 800)
+        # points of the winners plus the points left by the losers
+        self.assertGreater(results.points.sum(), 501 * results.legs_won.sum())
+        self.assertGreater(averages(results)[1], averages(results)[0])
+
+
+@unittest.skipUnless(np, "requires numpy")
+class AliasTablesTestCase(unittest.TestCase):
+    def test_probabilities(self):
+        probabilities = np.array([[0.5, 0.25, 0.25, 0.0], [0.1, 0.2, 0.3, 0.4]])
+        acceptance, aliases = _alias_tables(probabilities)
+        # probability mass of every outcome, summed over the cells
+        mass = np.zeros(probabilities.size)
+        rows = np.repeat(np.arange(2), 4) * 4
+        np.add.at(mass, rows + np.tile(np.arange(4), 2), acceptance / 4)
+        np.add.at(mass, rows + aliases, (1 - acceptance) / 4)
+        np.testing.assert_allclose(mass, probabilities.ravel())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import contextlib
+import io
+import json
+import os.path
+import tempfile
+import unittest
+
+from pydartz import bench
+
+
+class BenchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_run_benchmarks(self):
+        report = bench.run_benchmarks(sizes=(200,), repeat=1)
+        names = [r["name"] for r in report["results"]]
+        self.assertIn("process_score", names)
+        self.assertIn("session_save", names)
+        self.assertIn("analyze_sessions", names)
+        for result in report["results"]:
+            self.assertGreater(result["best"], 0)
+            self.assertLessEqual(result["best"], result["median"])
+            if result["name"] == "analyze_log_file":
+                self.assertEqual(result["size"], 200)
+        json.dumps(report)
+
+    def test_session_save_fresh_log(self):
+        run, _ = bench._session_save(self.tmp_dir.name, bench.SEED)
+        run()
+        run()
+        # every run saves the same session to its own log
+        sizes = [
+            os.path.getsize(os.path.join(self.tmp_dir.name, filename))
+            for filename in os.listdir(self.tmp_dir.name)
+            if filename.endswith(".xml")
+        ]
+        self.assertEqual(len(sizes), 2)
+        self.assertEqual(sizes[0], sizes[1])
+
+    def test_main(self):
+        output_filepath = os.path.join(self.tmp_dir.name, "bench.json")
+        with contextlib.redirect_stderr(io.StringIO()):
+            bench.main(
+                [
+                    "--sizes",
+                    "100",
+                    "--repeat",
+                    "1",
+                    "-k",
+                    "analyze",
+                    "-o",
+                    output_filepath,
+                ]
+            )
+        with open(output_filepath) as file:
+            report = json.load(file)
+        self.assertListEqual(
+            [r["name"] for r in report["results"]],
+            ["analyze_sessions", "analyze_log_file"],
+        )
+        self.assertEqual(report["seed"], bench.SEED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from pydartz import board
+from pydartz.finishes import SEGMENTS
+
+
+@unittest.skipUnless(np, "requires numpy")
+class BoardTestCase(unittest.TestCase):
+    def test_aim_points(self):
+        x, y = np.array([board.aim_point(s.name) for s in SEGMENTS]).T
+        self.assertListEqual(
+            board.segment_indices(x, y).tolist(), list(range(len(SEGMENTS)))
+        )
+
+    def test_segment_indices(self):
+        names = [SEGMENTS[i].name if i < board.MISS else None for i in range(63)]
+        indices = board.segment_indices(
+            np.array([0.0, 0.0, 0.0, 0.0, 0.0, 103.0, -166.0, 0.0]),
+            np.array([0.0, 10.0, 50.0, 103.0, 166.0, 0.0, 0.0, 171.0]),
+        )
+        self.assertListEqual(
+            [names[i] for i in indices],
+            ["DB", "SB", "20", "T20", "D20", "T6", "D11", None],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
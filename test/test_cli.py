@@ -0,0 +1,18 @@
+import argparse
+import unittest
+
+from pydartz.cli import _count
+
+
+class CountTestCase(unittest.TestCase):
+    def test_count(self):
+        self.assertEqual(_count("3"), 3)
+        for value in ("0", "-1"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                _count(value)
+        with self.assertRaises(ValueError):
+            _count("many")
+
+
+if __name__ == "__main__":
+    unittest.main()
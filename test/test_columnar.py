@@ -0,0 +1,131 @@
+import csv
+import os.path
+import tempfile
+import unittest
+from datetime import date
+from xml.etree import ElementTree as etree
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from pydartz.archive import compact_log
+from pydartz.columnar import (
+    COLUMNS,
+    _analyze_visits,
+    analyze_columns,
+    export_columns,
+    export_log,
+    load_npz,
+)
+from pydartz.communication import TestingCommunicator
+from pydartz.database import Sessions, analyze_sessions
+from pydartz.player import Player
+from pydartz.session import Session
+
+
+class ColumnarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        sessions_log = Sessions(log_filepath=self.log_filepath)
+        for names, start_value, nr_legs, data in (
+            (["Peter", "Paul"], 501, 1, ("180d", "100d", "180d", "140d", 60, 57, 24)),
+            (["Mary"], 501, 2, 2 * ("180d", 60, 60, 57, 60, 60, 24)),
+            (["Paul", "Mary"], 101, 1, ("60d", "60d", 1, 40)),
+        ):
+            communicator = TestingCommunicator(*data)
+            players = [Player(n, start_value, communicator=communicator) for n in names]
+            Session(
+                players, nr_legs, log_parent=sessions_log, communicator=communicator
+            ).run()
+        self.sessions = list(sessions_log._log_entry)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertEntriesEqual(self, entries, expected_entries):
+        self.assertSetEqual(set(entries), set(expected_entries))
+        for name, entry in entries.items():
+            self.assertDictEqual(entry.to_dict(), expected_entries[name].to_dict())
+
+    def test_export_columns(self):
+        columns = export_columns(self.log_filepath)
+        self.assertListEqual(columns["players"], ["Peter", "Paul", "Mary"])
+        self.assertEqual(len(columns["points"]), 14)
+        self.assertListEqual(list(columns["session"][-3:]), [2, 2, 2])
+        self.assertListEqual(list(columns["leg"][-4:]), [2, 3, 3, 3])
+        self.assertListEqual(list(columns["visit"][:3]), [0, 1, 2])
+        self.assertListEqual(list(columns["points"][:2]), [180, 100])
+        self.assertEqual(
+            columns["timestamp"][0],
+            int(self.sessions[0][0][0].get("timestamp").replace("-", "")),
+        )
+
+    def test_export_archived_sessions(self):
+        columns = export_columns(self.log_filepath)
+        self.assertEqual(compact_log(self.log_filepath, before=date(2999, 1, 1)), 3)
+        self.assertDictEqual(export_columns(self.log_filepath), columns)
+
+    def test_analyze_columns(self):
+        columns = export_columns(self.log_filepath)
+        expected = analyze_sessions(self.sessions)
+        self.assertEntriesEqual(analyze_columns(columns), expected)
+        self.assertEntriesEqual(
+            _analyze_visits(columns, ["Peter", "Paul", "Mary"]), expected
+        )
+        self.assertEntriesEqual(
+            analyze_columns(columns, names=["Mary"]), {"Mary": expected["Mary"]}
+        )
+
+    def test_analyze_aborted_leg(self):
+        self.sessions[0][0].set("aborted", "1")
+        root = etree.Element("sessions")
+        root.extend(self.sessions)
+        etree.ElementTree(root).write(self.log_filepath)
+
+        columns = export_columns(self.log_filepath)
+        self.assertEqual(sum(columns["finish"]), 3)
+        expected = analyze_sessions(self.sessions)
+        self.assertEntriesEqual(analyze_columns(columns), expected)
+        self.assertEntriesEqual(
+            _analyze_visits(columns, ["Peter", "Paul", "Mary"]), expected
+        )
+
+    def test_analyze_empty_columns(self):
+        with open(self.log_filepath, "w"):
+            pass
+        self.assertDictEqual(analyze_columns(export_columns(self.log_filepath)), {})
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_export_npz(self):
+        filepath = os.path.join(self.tmp_dir.name, "visits.npz")
+        export_log(self.log_filepath, filepath)
+
+        columns = load_npz(filepath)
+        expected = export_columns(self.log_filepath)
+        self.assertListEqual(columns["players"], expected["players"])
+        for column in COLUMNS:
+            self.assertListEqual(columns[column].tolist(), list(expected[column]))
+        self.assertEntriesEqual(
+            analyze_columns(columns), analyze_sessions(self.sessions)
+        )
+
+    def test_export_csv(self):
+        filepath = os.path.join(self.tmp_dir.name, "visits.csv")
+        export_log(self.log_filepath, filepath)
+
+        with open(filepath, newline="") as file:
+            rows = list(csv.reader(file))
+        self.assertListEqual(rows[0], list(COLUMNS))
+        self.assertEqual(len(rows), 15)
+        self.assertListEqual(rows[1][:6], ["Peter", "0", "0", "0", "180", "3"])
+
+    def test_export_invalid_format(self):
+        with self.assertRaises(ValueError):
+            export_log(self.log_filepath, "visits.json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,7 @@ from pydartz.communication import (
     INPUT_THROW,
     MinLargerMaxError,
     SanitizationError,
+    SilentCommunicator,
     TestingCommunicator,
     sanitized_input,
 )
@@ -104,5 +105,14 @@ class TestingCommunicatorTestCase(unittest.TestCase):
         self.assertEqual(int(self.data[3]), self.communicator.get_input(INPUT_NR_LEGS))
 
 
+class SilentCommunicatorTestCase(unittest.TestCase):
+    def test_silent(self):
+        communicator = SilentCommunicator()
+        self.assertIsNone(communicator.print_info("some text"))
+        self.assertRaises(
+            SanitizationError, communicator.get_input, INPUT_THROW, "Robo"
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
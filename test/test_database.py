@@ -1,10 +1,25 @@
+import json
+import os.path
+import tempfile
 import unittest
 from collections import Counter
 from unittest import mock
 from xml.etree import ElementTree as etree
 
 from pydartz.communication import TestingCommunicator
-from pydartz.database import LogEntryBase, PlayerEntry, analyze_sessions
+from pydartz.database import (
+    LogEntryBase,
+    PlayerEntry,
+    Sessions,
+    _analyze_session,
+    _checksum,
+    _load_cache,
+    analyze_log_file,
+    analyze_log_file_cached,
+    analyze_log_files,
+    analyze_sessions,
+    replay_journal,
+)
 from pydartz.player import Player
 from pydartz.session import Session, Visit
 
@@ -13,38 +28,79 @@ class PlayerEntryTestCase(unittest.TestCase):
     def test_default_init(self):
         entry = PlayerEntry()
         self.assertEqual(0, entry._throws)
-        self.assertListEqual([], entry._points)
+        self.assertEqual(0, entry.total_points())
+        self.assertEqual(0, entry.nr_visits())
+        self.assertEqual(0, len(entry.distribution()))
         self.assertEqual(0, len(entry._finishes))
 
     def test_init_with_stats(self):
         player_stats = dict(
-            throws=123, points=4567, finishes=Counter({20: 89}), darters=Counter()
+            throws=123,
+            points=Counter({100: 40, 180: 1}),
+            finishes=Counter({20: 89}),
+            darters=Counter(),
         )
         entry = PlayerEntry(player_stats=player_stats)
         self.assertEqual(123, entry._throws)
-        self.assertEqual(4567, entry._points)
+        self.assertEqual(4180, entry.total_points())
+        self.assertEqual(180, entry.highscore())
+        self.assertEqual(41, entry.nr_visits())
         self.assertEqual(89, entry._finishes[20])
         self.assertEqual(0, len(entry._darters))
 
+    def test_init_with_points_list(self):
+        player_stats = dict(
+            throws=6, points=[60, 100], finishes=Counter(), darters=Counter()
+        )
+        entry = PlayerEntry(player_stats=player_stats)
+        self.assertEqual(160, entry.total_points())
+        self.assertEqual(Counter({60: 1, 100: 1}), entry.distribution())
+
     def test_update(self):
         entry = PlayerEntry()
-        entry.update(9, 501)
+        entry.update(9, 140)
         self.assertEqual(9, entry._throws)
-        self.assertEqual(501, entry._points[0])
+        self.assertEqual(1, entry.distribution()[140])
         self.assertEqual(0, len(entry._finishes))
-        self.assertEqual(501, entry.total_points())
+        self.assertEqual(140, entry.total_points())
+        self.assertEqual(140, entry.highscore())
+
+    def test_update_invalid_points(self):
+        entry = PlayerEntry()
+        self.assertRaises(ValueError, entry.update, 3, 181)
+        self.assertRaises(ValueError, entry.update, 3, -1)
 
     def test_to_dict(self):
         player_stats = dict(
-            throws=123, points=4567, finishes=Counter({20: 89}), darters=Counter({9: 2})
+            throws=123,
+            points=Counter({60: 20, 45: 3}),
+            finishes=Counter({20: 89}),
+            darters=Counter({9: 2}),
         )
         entry = PlayerEntry("Michael", player_stats)
         self.assertDictEqual(player_stats, entry.to_dict()["Michael"])
 
     def test_average(self):
         entry = PlayerEntry()
-        entry.update(10, 420)
-        self.assertEqual(42, entry.average())
+        entry.update(10, 140)
+        self.assertEqual(14, entry.average())
+
+    def test_merge(self):
+        entry = PlayerEntry("Michael")
+        entry.update(3, 100)
+        entry.update(3, 60, darter=6)
+        other = PlayerEntry("Michael")
+        other.update(3, 180)
+        other.update(2, 40, darter=5)
+
+        merged = entry.merge(other)
+        self.assertIs(merged, entry)
+        self.assertEqual(11, entry.throws)
+        self.assertEqual(380, entry.total_points())
+        self.assertEqual(180, entry.highscore())
+        self.assertEqual(4, entry.nr_visits())
+        self.assertEqual(Counter({60: 1, 40: 1}), entry._finishes)
+        self.assertEqual(Counter({6: 1, 5: 1}), entry._darters)
 
 
 class LogEntryBaseTestCase(unittest.TestCase):
@@ -56,6 +112,72 @@ class LogEntryBaseTestCase(unittest.TestCase):
         self.assertEqual(parent.save.call_count, 1)
 
 
+class SessionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run_session(self, sessions, nr_legs=1):
+        data = nr_legs * ("180d", 60, 60, 57, 60, 60, 24)
+        communicator = TestingCommunicator(*data)
+        session = Session(
+            [Player("Peter", communicator=communicator)],
+            nr_legs,
+            log_parent=sessions,
+            communicator=communicator,
+        )
+        session.run()
+
+    def _read_log(self):
+        with open(self.log_filepath, "rb") as file:
+            return file.read()
+
+    def test_save_without_filepath(self):
+        sessions = Sessions()
+        self._run_session(sessions)
+        self.assertEqual(len(sessions._log_entry), 1)
+
+    def test_incremental_save(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        self._run_session(sessions, nr_legs=2)
+        contents = self._read_log()
+        self._run_session(sessions)
+
+        # previously written data is left untouched
+        closing_tags = Sessions.SESSION_END + Sessions.ROOT_END
+        self.assertTrue(contents.endswith(closing_tags))
+        self.assertTrue(self._read_log().startswith(contents[: -len(closing_tags)]))
+
+        root = etree.parse(self.log_filepath).getroot()
+        self.assertEqual(len(root), 2)
+        self.assertEqual(len(root[0]), 2)
+        self.assertEqual(len(root[1]), 1)
+        self.assertEqual(analyze_sessions(root)["Peter"].throws, 27)
+
+    def test_append_to_existing_log(self):
+        self._run_session(Sessions(log_filepath=self.log_filepath))
+        sessions = Sessions(log_filepath=self.log_filepath)
+        self._run_session(sessions, nr_legs=2)
+
+        root = etree.parse(self.log_filepath).getroot()
+        self.assertEqual(len(root), 2)
+        self.assertEqual(len(root[1]), 2)
+        self.assertEqual(etree.tostring(root), etree.tostring(sessions._log_entry))
+
+    def test_save_after_external_modification(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        self._run_session(sessions)
+        with open(self.log_filepath, "ab") as file:
+            file.write(b"\n")
+        self._run_session(sessions)
+
+        root = etree.parse(self.log_filepath).getroot()
+        self.assertEqual(len(root), 2)
+
+
 class AnalysisTestCase(unittest.TestCase):
     def test_analyse_sessions(self):
         sessions = etree.Element("sessions")
@@ -77,6 +199,377 @@ class AnalysisTestCase(unittest.TestCase):
         self.assertEqual(player_entry._darters[9], 1)
 
 
+class LogFileAnalysisTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_empty_log_file(self):
+        with open(self.log_filepath, "w"):
+            pass
+        self.assertDictEqual(analyze_log_file(self.log_filepath), {})
+
+    def test_analyze_log_file(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        for names, data in (
+            (["Peter"], ("180d", 60, 60, 57, 60, 60, 24)),
+            (["Peter", "Paul"], ("180d", "100d", "180d", "140d", 60, 57, 24)),
+        ):
+            communicator = TestingCommunicator(*data)
+            players = [Player(n, communicator=communicator) for n in names]
+            Session(players, 1, log_parent=sessions, communicator=communicator).run()
+
+        expected = analyze_sessions(sessions._log_entry)
+        player_entries = analyze_log_file(self.log_filepath)
+
+        self.assertSetEqual(set(player_entries), {"Peter", "Paul"})
+        for name, entry in player_entries.items():
+            self.assertDictEqual(entry.to_dict(), expected[name].to_dict())
+
+
+class PlayerFilterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        sessions = Sessions(log_filepath=self.log_filepath)
+        for names, data in (
+            (["Peter"], ("180d", 60, 60, 57, 60, 60, 24)),
+            (["Peter", "Paul"], ("180d", "100d", "180d", "140d", 60, 57, 24)),
+            (["Mary"], ("180d", 60, 60, 57, 60, 60, 24)),
+            (["Paul", "Peter"], ("100d", "180d", "140d", "180d", "121d", 60, 57, 24)),
+        ):
+            communicator = TestingCommunicator(*data)
+            players = [Player(n, communicator=communicator) for n in names]
+            Session(players, 1, log_parent=sessions, communicator=communicator).run()
+        self.sessions = sessions._log_entry
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_analyze_sessions(self):
+        expected = analyze_sessions(self.sessions)
+        for names in (["Peter"], ["Paul"], ["Paul", "Mary"]):
+            player_entries = analyze_sessions(self.sessions, names=names)
+            self.assertSetEqual(set(player_entries), set(names))
+            for name in names:
+                self.assertDictEqual(
+                    player_entries[name].to_dict(), expected[name].to_dict()
+                )
+
+    def test_analyze_log_file(self):
+        expected = analyze_sessions(self.sessions)
+        with mock.patch(
+            "pydartz.database._analyze_session", wraps=_analyze_session
+        ) as analyze_patch:
+            player_entries = analyze_log_file(self.log_filepath, names=["Paul"])
+        # sessions without Paul are skipped
+        self.assertEqual(analyze_patch.call_count, 2)
+        self.assertListEqual(list(player_entries), ["Paul"])
+        self.assertDictEqual(
+            player_entries["Paul"].to_dict(), expected["Paul"].to_dict()
+        )
+
+    def test_unknown_player(self):
+        self.assertDictEqual(analyze_log_file(self.log_filepath, names=["Bob"]), {})
+
+    def test_cached_analysis(self):
+        expected = analyze_sessions(self.sessions)
+        for _ in range(2):
+            player_entries = analyze_log_file_cached(self.log_filepath, names=["Mary"])
+            self.assertListEqual(list(player_entries), ["Mary"])
+            self.assertDictEqual(
+                player_entries["Mary"].to_dict(), expected["Mary"].to_dict()
+            )
+
+
+class ParallelAnalysisTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepaths = []
+        self.sessions = []
+        for i, names in enumerate((["Peter"], ["Peter", "Paul"])):
+            log_filepath = os.path.join(self.tmp_dir.name, f"stats{i}.xml")
+            sessions = Sessions(log_filepath=log_filepath)
+            for _ in range(3):
+                data = []
+                for visit in ("180d", "140d", "100d"):
+                    data.extend(len(names) * [visit])
+                communicator = TestingCommunicator(*data, 60, 1, 20)
+                players = [Player(n, communicator=communicator) for n in names]
+                Session(
+                    players, 1, log_parent=sessions, communicator=communicator
+                ).run()
+            self.log_filepaths.append(log_filepath)
+            self.sessions.extend(sessions._log_entry)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_analyze_log_files(self):
+        expected = analyze_sessions(self.sessions)
+        for shard_size in (1, 1000, None):
+            player_entries = analyze_log_files(
+                self.log_filepaths, max_workers=2, shard_size=shard_size
+            )
+            self.assertListEqual(list(player_entries), list(expected))
+            for name, entry in player_entries.items():
+                self.assertDictEqual(entry.to_dict(), expected[name].to_dict())
+
+    def test_analyze_log_files_with_names(self):
+        player_entries = analyze_log_files(
+            self.log_filepaths, names=["Paul"], max_workers=2, shard_size=1
+        )
+        self.assertListEqual(list(player_entries), ["Paul"])
+        self.assertEqual(player_entries["Paul"].nr_visits(), 9)
+
+
+class CachedAnalysisTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        self.cache_filepath = self.log_filepath + ".cache"
+        self.sessions = Sessions(log_filepath=self.log_filepath)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run_session(self, name="Peter"):
+        communicator = TestingCommunicator("180d", 60, 60, 57, 60, 60, 24)
+        Session(
+            [Player(name, communicator=communicator)],
+            1,
+            log_parent=self.sessions,
+            communicator=communicator,
+        ).run()
+
+    def assertAnalysisCorrect(self):
+        expected = analyze_log_file(self.log_filepath)
+        player_entries = analyze_log_file_cached(self.log_filepath)
+        self.assertSetEqual(set(player_entries), set(expected))
+        for name, entry in player_entries.items():
+            self.assertDictEqual(entry.to_dict(), expected[name].to_dict())
+
+    def test_create_cache(self):
+        self._run_session()
+        self._run_session("Paul")
+        self.assertAnalysisCorrect()
+
+        with open(self.cache_filepath) as file:
+            cache = json.load(file)
+        self.assertEqual(cache["nr_sessions"], 1)
+        self.assertListEqual(list(cache["players"]), ["Peter"])
+
+    def test_fold_in_new_sessions(self):
+        for _ in range(3):
+            self._run_session()
+        self.assertAnalysisCorrect()
+        self._run_session("Paul")
+        self._run_session()
+
+        with mock.patch(
+            "pydartz.database._analyze_session", wraps=_analyze_session
+        ) as analyze_patch:
+            self.assertAnalysisCorrect()
+        # analyze_log_file: 5 sessions, cached analysis: last 3 sessions
+        self.assertEqual(analyze_patch.call_count, 5 + 3)
+
+    def test_append_keeps_cache_stamp(self):
+        self._run_session()
+        self._run_session()
+        analyze_log_file_cached(self.log_filepath)
+        offset = _load_cache(self.cache_filepath)["offset"]
+        self._run_session("Paul")
+
+        # saving updates the stamp, hence only the new data is checksummed
+        stat = os.stat(self.log_filepath)
+        cache = _load_cache(self.cache_filepath)
+        self.assertEqual(
+            (cache["size"], cache["mtime"]), (stat.st_size, stat.st_mtime_ns)
+        )
+        with mock.patch(
+            "pydartz.database._checksum", wraps=_checksum
+        ) as checksum_patch:
+            self.assertAnalysisCorrect()
+        self.assertListEqual(
+            [c.args[2] for c in checksum_patch.call_args_list], [offset]
+        )
+
+    def test_unchanged_log(self):
+        self._run_session()
+        self._run_session()
+        analyze_log_file_cached(self.log_filepath)
+        self.assertEqual(analyze_log_file_cached(self.log_filepath)["Peter"].throws, 18)
+
+    def test_rebuild_after_edit(self):
+        self._run_session()
+        self._run_session()
+        analyze_log_file_cached(self.log_filepath)
+
+        with open(self.log_filepath, "rb") as file:
+            contents = file.read()
+        with open(self.log_filepath, "wb") as file:
+            file.write(contents.replace(b'points="180"', b'points="140"', 1))
+        self.assertAnalysisCorrect()
+
+    def test_rebuild_after_same_length_edit(self):
+        for _ in range(20):
+            self._run_session()
+        analyze_log_file_cached(self.log_filepath)
+        stat = os.stat(self.log_filepath)
+
+        # the edit is far before the watermark and keeps the size of the log
+        with open(self.log_filepath, "rb") as file:
+            contents = file.read()
+        with open(self.log_filepath, "wb") as file:
+            file.write(contents.replace(b'points="177"', b'points="171"', 1))
+        os.utime(self.log_filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(os.path.getsize(self.log_filepath), stat.st_size)
+        self.assertAnalysisCorrect()
+
+    def test_corrupt_cache(self):
+        self._run_session()
+        with open(self.cache_filepath, "w") as file:
+            file.write("{")
+        self.assertAnalysisCorrect()
+
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        self.journal_filepath = self.log_filepath + ".journal"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run_session(self, sessions, *data, day=1):
+        communicator = TestingCommunicator(*data)
+        session = Session(
+            [Player("Peter", communicator=communicator)],
+            1,
+            log_parent=sessions,
+            communicator=communicator,
+        )
+        session._log_entry.set("timestamp", f"202401{day:02d}-120000")
+        session.run()
+
+    def _interrupt_session(self, sessions):
+        # input runs out during the third visit
+        with self.assertRaises(IndexError):
+            self._run_session(sessions, "180d", "60d", 60, day=2)
+        sessions.close()
+
+    def test_journal_cleared_after_save(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        self._run_session(sessions, "180d", 60, 60, 57, 60, 60, 24)
+        self.assertFalse(os.path.exists(self.journal_filepath))
+
+    def test_replay_interrupted_leg(self):
+        self._run_session(
+            Sessions(log_filepath=self.log_filepath), "180d", 60, 60, 57, 60, 60, 24
+        )
+        self._interrupt_session(Sessions(log_filepath=self.log_filepath))
+        with open(self.journal_filepath) as file:
+            self.assertEqual(len(file.readlines()), 2)
+
+        replay_journal(self.log_filepath)
+        self.assertFalse(os.path.exists(self.journal_filepath))
+        root = etree.parse(self.log_filepath).getroot()
+        self.assertEqual(len(root), 2)
+        self.assertEqual(root[1][0].get("aborted"), "1")
+        self.assertListEqual([v.get("points") for v in root[1][0]], ["180", "60"])
+
+        entry = analyze_log_file(self.log_filepath)["Peter"]
+        self.assertEqual(entry.throws, 15)
+        self.assertEqual(sum(entry._finishes.values()), 1)
+
+    def test_replay_saved_leg(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        self._run_session(sessions, "180d", 60, 60, 57, 60, 60, 24)
+        contents = _read(self.log_filepath)
+        # the journal was not cleared after saving
+        session, leg = sessions._log_entry[0], sessions._log_entry[0][0]
+        with open(self.journal_filepath, "w") as file:
+            for visit in leg:
+                record = dict(
+                    session=session.get("timestamp"),
+                    players=session.get("players"),
+                    leg=leg.get("timestamp"),
+                    visit=dict(visit.attrib),
+                )
+                file.write(json.dumps(record) + "\n")
+            file.write(json.dumps(dict(offset=None)) + "\n")
+
+        replay_journal(self.log_filepath)
+        self.assertEqual(_read(self.log_filepath), contents)
+
+    def test_restore_interrupted_save(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        self._run_session(sessions, "180d", 60, 60, 57, 60, 60, 24)
+        contents = _read(self.log_filepath)
+        # saving the second session is interrupted after writing some bytes
+        with mock.patch.object(Sessions, "_clear_journal"):
+            self._run_session(sessions, "180d", 60, 60, 57, 60, 60, 24, day=2)
+        sessions.close()
+        with open(self.log_filepath, "r+b") as file:
+            file.truncate(len(contents) + 10)
+        with self.assertRaises(etree.ParseError):
+            etree.parse(self.log_filepath)
+
+        replay_journal(self.log_filepath)
+        root = etree.parse(self.log_filepath).getroot()
+        self.assertEqual(len(root), 2)
+        self.assertIsNone(root[1][0].get("aborted"))
+        self.assertEqual(analyze_log_file(self.log_filepath)["Peter"].throws, 18)
+
+    def test_live_journal_not_replayed(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        with self.assertRaises(IndexError):
+            self._run_session(sessions, "180d", "60d", 60)
+
+        # the journal of the game in progress is locked
+        replay_journal(self.log_filepath)
+        Sessions(log_filepath=self.log_filepath).save()
+        self.assertEqual(len(etree.parse(self.log_filepath).getroot()), 0)
+        with open(self.journal_filepath) as file:
+            self.assertEqual(len(file.readlines()), 2)
+
+        sessions.close()
+        replay_journal(self.log_filepath)
+        self.assertFalse(os.path.exists(self.journal_filepath))
+        root = etree.parse(self.log_filepath).getroot()
+        self.assertEqual(root[0][0].get("aborted"), "1")
+
+    def test_journal_not_cleared_by_others(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        self._run_session(sessions, "180d", 60, 60, 57, 60, 60, 24)
+        self._interrupt_session(Sessions(log_filepath=self.log_filepath))
+        # saving without holding the journal keeps it
+        sessions.save()
+        self.assertTrue(os.path.exists(self.journal_filepath))
+
+    def test_analyze_aborted_leg(self):
+        sessions = Sessions()
+        self._interrupt_session(sessions)
+        leg = sessions._log_entry[0][0]
+        # remove the incomplete visit
+        del leg[-1]
+        leg.set("aborted", "1")
+        entry = analyze_sessions(sessions._log_entry)["Peter"]
+        self.assertEqual(entry.throws, 6)
+        self.assertEqual(entry.total_points(), 240)
+        self.assertEqual(len(entry._finishes), 0)
+        self.assertEqual(len(entry._darters), 0)
+
+
+def _read(filepath):
+    with open(filepath, "rb") as file:
+        return file.read()
+
+
 class PlayerLoggingTestCase(unittest.TestCase):
     def setUp(self):
         self.player = Player("Raymond")
@@ -0,0 +1,117 @@
+import unittest
+
+from pydartz import finishes
+from pydartz.finishes import (
+    SEGMENTS,
+    CheckoutTable,
+    checkouts,
+    lookup_index,
+    reachable,
+)
+
+POINTS = {s.name: s.points for s in SEGMENTS}
+# scores up to 170 that cannot be checked out with three darts
+BOGEY_NUMBERS = {159, 162, 163, 165, 166, 168, 169}
+
+
+class CheckoutTableTestCase(unittest.TestCase):
+    def test_segments(self):
+        self.assertEqual(len(SEGMENTS), 62)
+
+    def test_routes_valid(self):
+        for score in range(1, 171):
+            routes = checkouts(score)
+            if score == 1 or score in BOGEY_NUMBERS:
+                self.assertListEqual(routes, [])
+                continue
+
+            self.assertTrue(routes, score)
+            for route in routes:
+                self.assertEqual(sum(POINTS[s] for s in route), score)
+                self.assertTrue(route[-1].startswith("D"))
+                self.assertEqual(len(route), finishes.CHECKOUTS.min_darts(score))
+
+    def test_out_of_range(self):
+        self.assertListEqual(checkouts(0), [])
+        self.assertListEqual(checkouts(171), [])
+        self.assertIsNone(finishes.CHECKOUTS.min_darts(171))
+
+    def test_routes(self):
+        self.assertListEqual(checkouts(170), [("T20", "T20", "DB")])
+        self.assertListEqual(checkouts(40), [("D20",)])
+        self.assertEqual(checkouts(100)[0], ("T20", "D20"))
+        self.assertEqual(checkouts(41)[0], ("1", "D20"))
+
+    def test_deterministic(self):
+        first, second = CheckoutTable(), CheckoutTable()
+        self.assertListEqual(
+            [first.routes(s) for s in range(171)],
+            [second.routes(s) for s in range(171)],
+        )
+
+    def test_preferred_doubles(self):
+        table = CheckoutTable(preferred_doubles=("D8",), ranking=("darts", "doubles"))
+        self.assertEqual(table.routes(41)[0], ("SB", "D8"))
+        self.assertEqual(table.routes(24), [("D12",)])
+
+    def test_max_routes(self):
+        table = CheckoutTable(max_routes=1)
+        self.assertEqual(len(table.routes(41)), 1)
+
+    def test_setup_permutations(self):
+        routes = checkouts(160)
+        self.assertEqual(len({(tuple(sorted(r[:-1])), r[-1]) for r in routes}), 2)
+
+    def test_darts_left(self):
+        self.assertListEqual(checkouts(100, darts=1), [])
+        self.assertEqual(checkouts(100, darts=2)[0], ("T20", "D20"))
+        self.assertListEqual(checkouts(121, darts=2), [])
+        self.assertListEqual(checkouts(40, darts=1), [("D20",)])
+        self.assertListEqual(checkouts(40, darts=0), [])
+        for score in range(1, 171):
+            for darts in (1, 2):
+                for route in checkouts(score, darts):
+                    self.assertLessEqual(len(route), darts)
+
+    def test_darts_left_without_darts_ranking(self):
+        table = CheckoutTable(ranking=("doubles",))
+        self.assertTrue(all(r[-1] == "D20" for r in table.routes(60)))
+        self.assertListEqual(table.routes(60, darts=1), [])
+        self.assertTrue(all(len(r) <= 2 for r in table.routes(60, darts=2)))
+
+    def test_lookup_table(self):
+        table = CheckoutTable()
+        lookup = table.lookup_table(lambda routes: routes[0])
+        self.assertEqual(len(lookup), 4 * (table.max_score + 1))
+        self.assertEqual(lookup[lookup_index(100, 2)], ("T20", "D20"))
+        self.assertIsNone(lookup[lookup_index(100, 1)])
+        self.assertIsNone(lookup[lookup_index(0, 3)])
+
+    def test_invalid_ranking(self):
+        with self.assertRaises(ValueError):
+            CheckoutTable(ranking=("darts", "luck"))
+
+    def test_reachable(self):
+        self.assertTrue(reachable(0, 0))
+        self.assertFalse(reachable(1, 0))
+        self.assertTrue(reachable(60, 1))
+        self.assertTrue(reachable(57, 1))
+        for total in (59, 58, 61, 56):
+            self.assertFalse(reachable(total, 1), total)
+        self.assertTrue(reachable(120, 2))
+        self.assertFalse(reachable(119, 2))
+        self.assertTrue(reachable(180))
+        for total in (179, 178, 176, 175, 173, 172, 181):
+            self.assertFalse(reachable(total), total)
+        self.assertTrue(reachable(177))
+        self.assertFalse(reachable(-1))
+
+    def test_finishes_table(self):
+        self.assertListEqual(finishes.FINISHES["170"], [["T20", "T20", "DB"]])
+        self.assertNotIn("159", finishes.FINISHES)
+        with self.assertRaises(AttributeError):
+            finishes.UNKNOWN
+
+
+if __name__ == "__main__":
+    unittest.main()
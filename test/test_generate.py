@@ -0,0 +1,120 @@
+import contextlib
+import io
+import os.path
+import tempfile
+import unittest
+from datetime import date
+from xml.etree import ElementTree as etree
+
+from pydartz.database import Sessions, analyze_log_file, iter_log_file
+from pydartz.generate import generate_log, main
+from pydartz.index import analyze_window
+from pydartz.rules import Rules
+
+
+class GenerateLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _generate(self, nr_visits=2000, **kwargs):
+        kwargs.setdefault("since", date(2023, 1, 1))
+        kwargs.setdefault("until", date(2024, 1, 1))
+        return generate_log(self.log_filepath, nr_visits, seed=1, **kwargs)
+
+    def test_structure(self):
+        nr_sessions, nr_visits = self._generate(nr_players=5, nr_legs=2)
+        self.assertGreaterEqual(nr_visits, 2000)
+
+        root = etree.parse(self.log_filepath).getroot()
+        self.assertEqual(len(root), nr_sessions)
+        self.assertEqual(len(root.findall("session/leg/visit")), nr_visits)
+        timestamps = [e.get("timestamp") for e in root.iter() if e is not root]
+        self.assertListEqual(timestamps, sorted(timestamps))
+        self.assertTrue(timestamps[0].startswith("2023"))
+        self.assertTrue(timestamps[-1].startswith("2023"))
+
+        for session in root:
+            players = session.get("players").split(",")
+            self.assertEqual(len(players), 2)
+            winners = [leg[-1].get("player") for leg in session]
+            self.assertEqual(max(winners.count(p) for p in players), 2)
+            for leg in session:
+                scores = dict.fromkeys(players, 501)
+                for visit in leg:
+                    self.assertIn(visit.get("player"), players)
+                    self.assertIn(visit.get("throws"), ("1", "2", "3"))
+                    scores[visit.get("player")] -= int(visit.get("points"))
+                self.assertEqual(scores[leg[-1].get("player")], 0)
+                self.assertTrue(all(s > 1 for s in scores.values() if s))
+
+    def test_analyze(self):
+        self._generate(nr_players=4, players_per_session=3, average=60, spread=20)
+        entries = analyze_log_file(self.log_filepath)
+        self.assertEqual(len(entries), 4)
+        for entry in entries.values():
+            self.assertLessEqual(entry.highscore(), 180)
+            self.assertGreaterEqual(min(entry._darters), 9)
+
+        # the log can be extended by the regular Sessions class
+        sessions_log = Sessions(log_filepath=self.log_filepath)
+        nr_sessions = len(sessions_log._log_entry)
+        sessions_log.save()
+        sessions_log.close()
+        self.assertEqual(len(list(iter_log_file(self.log_filepath))), nr_sessions)
+        self.assertTrue(analyze_window(self.log_filepath, since="20230601-000000"))
+
+    def test_skills(self):
+        self._generate(nr_players=2, spread=0, average=90)
+        strong = analyze_log_file(self.log_filepath)
+        self._generate(nr_players=2, spread=0, average=30)
+        weak = analyze_log_file(self.log_filepath)
+        self.assertGreater(
+            min(e.average() for e in strong.values()),
+            max(e.average() for e in weak.values()),
+        )
+
+    def test_reproducible(self):
+        self._generate()
+        with open(self.log_filepath, "rb") as file:
+            first = file.read()
+        self._generate()
+        with open(self.log_filepath, "rb") as file:
+            self.assertEqual(file.read(), first)
+
+    def test_rules(self):
+        self._generate(500, rules=Rules(out="master"))
+        root = etree.parse(self.log_filepath).getroot()
+        self.assertEqual(root[0].get("rules"), "straight-in master-out")
+
+        with self.assertRaises(ValueError):
+            self._generate(rules=Rules(in_="double"))
+        with self.assertRaises(ValueError):
+            self._generate(nr_players=2, players_per_session=3)
+        with self.assertRaises(ValueError):
+            self._generate(since=date(2024, 1, 1))
+
+    def test_invalid_counts(self):
+        for kwargs in (
+            dict(nr_legs=0),
+            dict(nr_players=0, players_per_session=0),
+            dict(nr_visits=-1),
+        ):
+            with self.assertRaises(ValueError):
+                self._generate(**kwargs)
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+            main([self.log_filepath, "--visits", "100", "--legs", "0"])
+
+    def test_main(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main([self.log_filepath, "--visits", "2000", "--players", "3"])
+        self.assertTrue(output.getvalue().startswith("Wrote"))
+        self.assertEqual(len(analyze_log_file(self.log_filepath)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
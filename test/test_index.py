@@ -0,0 +1,216 @@
+import os.path
+import tempfile
+import unittest
+from datetime import date
+from xml.etree import ElementTree as etree
+
+from pydartz.communication import TestingCommunicator
+from pydartz.database import Sessions, analyze_sessions
+from pydartz.index import SessionIndex, analyze_window, index_filepath, read_session
+from pydartz.player import Player
+from pydartz.session import Session
+from pydartz.storage import analyze_database, migrate_log
+
+
+def _add_session(sessions, day, nr_legs):
+    """Add a session of Peter and Paul played on `day` of January 2024. Peter
+    wins every leg with a visit of 100 points.
+    """
+    session = etree.SubElement(
+        sessions, "session", timestamp=f"202401{day:02d}-120000", players="Peter,Paul"
+    )
+    for i in range(nr_legs):
+        leg = etree.SubElement(session, "leg", timestamp=f"202401{day:02d}-12{i:02d}00")
+        for player, points in (("Peter", 60), ("Paul", 45), ("Peter", 100)):
+            etree.SubElement(
+                leg,
+                "visit",
+                timestamp=leg.get("timestamp"),
+                player=player,
+                points=str(points),
+                throws="3",
+            )
+
+
+def _entries(index):
+    return [
+        (index.timestamp(n),) + index.span(n) + (index.nr_legs(n),)
+        for n in range(len(index))
+    ]
+
+
+class SessionIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        sessions = Sessions(log_filepath=self.log_filepath)
+        for day, nr_legs in ((1, 2), (8, 1), (9, 3), (15, 2)):
+            _add_session(sessions._log_entry, day, nr_legs)
+        sessions.save()
+        self.sessions = sessions._log_entry
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertWindowCorrect(self, expected_sessions, **window):
+        expected = analyze_sessions(expected_sessions)
+        player_entries = analyze_window(self.log_filepath, **window)
+        self.assertSetEqual(set(player_entries), set(expected))
+        for name, entry in player_entries.items():
+            self.assertDictEqual(entry.to_dict(), expected[name].to_dict())
+
+    def test_build(self):
+        index = SessionIndex.build(self.log_filepath)
+        self.assertEqual(len(index), 4)
+        with open(self.log_filepath, "rb") as file:
+            contents = file.read()
+        start, end = index.span(2)
+        self.assertEqual(
+            etree.tostring(etree.fromstring(contents[start:end])),
+            etree.tostring(self.sessions[2]),
+        )
+
+    def test_empty_log(self):
+        with open(self.log_filepath, "w"):
+            pass
+        self.assertEqual(len(SessionIndex.build(self.log_filepath)), 0)
+        self.assertDictEqual(analyze_window(self.log_filepath, since=date.today()), {})
+
+    def test_sidecar_written(self):
+        self.assertEqual(
+            _entries(SessionIndex.load(self.log_filepath)),
+            _entries(SessionIndex.build(self.log_filepath)),
+        )
+
+    def test_sidecar_updated_on_save(self):
+        sessions = Sessions(log_filepath=self.log_filepath)
+        for nr_legs in (2, 1):
+            communicator = TestingCommunicator(
+                *(nr_legs * ("180d", 60, 60, 57, 60, 60, 24))
+            )
+            Session(
+                [Player("Mary", communicator=communicator)],
+                nr_legs,
+                log_parent=sessions,
+                communicator=communicator,
+            ).run()
+
+            index = SessionIndex.load(self.log_filepath)
+            self.assertEqual(
+                _entries(index), _entries(SessionIndex.build(self.log_filepath))
+            )
+        self.assertEqual(len(index), 6)
+        self.assertEqual(index.nr_legs(4), 2)
+
+    def test_sidecar_rebuilt(self):
+        with open(self.log_filepath, "ab") as file:
+            file.write(b"\n")
+        with self.assertRaises(ValueError):
+            SessionIndex.load(self.log_filepath)
+        self.assertEqual(len(SessionIndex.open(self.log_filepath)), 4)
+        self.assertEqual(len(SessionIndex.load(self.log_filepath)), 4)
+
+        with open(index_filepath(self.log_filepath), "ab") as file:
+            file.write(b"garbage")
+        self.assertEqual(len(SessionIndex.open(self.log_filepath)), 4)
+
+    def test_read_session(self):
+        for number in (0, 2, -1):
+            self.assertEqual(
+                etree.tostring(read_session(self.log_filepath, number)),
+                etree.tostring(self.sessions[number]),
+            )
+
+    def test_find(self):
+        index = SessionIndex.open(self.log_filepath)
+        self.assertEqual(index.find("20240109-120000"), 2)
+        with self.assertRaises(KeyError):
+            index.find("20240109-120001")
+
+    def test_select(self):
+        index = SessionIndex.build(self.log_filepath)
+        self.assertTupleEqual(index.select(), (0, 4, 0))
+        self.assertTupleEqual(index.select(since="20240108-000000"), (0, 4, 0))
+        self.assertTupleEqual(index.select(since="20240109-000000"), (1, 4, 0))
+        self.assertTupleEqual(index.select(until="20240109-000000"), (0, 2, 0))
+        self.assertTupleEqual(index.select(last_sessions=3), (1, 4, 0))
+        self.assertTupleEqual(index.select(last_legs=3), (2, 4, 2))
+        self.assertTupleEqual(index.select(last_legs=100), (0, 4, 0))
+        self.assertTupleEqual(
+            index.select(
+                until="20240109-120100", last_legs=3, log_filepath=self.log_filepath
+            ),
+            (0, 3, 1),
+        )
+        self.assertTupleEqual(
+            index.select(
+                since="20240109-120100", last_legs=4, log_filepath=self.log_filepath
+            ),
+            (2, 4, 0),
+        )
+
+    def test_analyze_window(self):
+        self.assertWindowCorrect(self.sessions[1:], since=date(2024, 1, 8))
+        self.assertWindowCorrect(
+            self.sessions[:2], until="20240109-000000", since="20240101-000000"
+        )
+        self.assertWindowCorrect([], since=date(2024, 2, 1))
+
+    def test_analyze_window_partial_session(self):
+        first_leg = etree.fromstring(etree.tostring(self.sessions[0]))
+        first_leg.remove(first_leg[1])
+        self.assertWindowCorrect([first_leg], until="20240101-120100")
+
+        second_leg = etree.fromstring(etree.tostring(self.sessions[0]))
+        second_leg.remove(second_leg[0])
+        self.assertWindowCorrect(
+            [second_leg], since="20240101-120100", until="20240102"
+        )
+
+    def test_analyze_last_legs(self):
+        session = etree.fromstring(etree.tostring(self.sessions[2]))
+        session.remove(session[0])
+        self.assertWindowCorrect([session, self.sessions[3]], last_legs=4)
+        self.assertWindowCorrect(self.sessions[2:], last_sessions=2)
+
+    def test_analyze_last_legs_in_time_range(self):
+        last_leg = etree.fromstring(etree.tostring(self.sessions[0]))
+        last_leg.remove(last_leg[0])
+        first_leg = etree.fromstring(etree.tostring(self.sessions[2]))
+        del first_leg[1:]
+        self.assertWindowCorrect(
+            [last_leg, self.sessions[1], first_leg],
+            until="20240109-120100",
+            last_legs=3,
+        )
+
+        session = etree.fromstring(etree.tostring(self.sessions[2]))
+        del session[:2]
+        self.assertWindowCorrect(
+            [session, self.sessions[3]], since="20240109-120100", last_legs=3
+        )
+
+    def test_analyze_database_window(self):
+        database_filepath = os.path.join(self.tmp_dir.name, "stats.sqlite")
+        migrate_log(self.log_filepath, database_filepath)
+        for window in (
+            dict(since=date(2024, 1, 8)),
+            dict(until="20240101-120100"),
+            dict(last_legs=4),
+            dict(last_sessions=2, until="20240115-000000"),
+            dict(last_sessions=0),
+            dict(last_legs=0),
+            dict(last_legs=7, until="20240109-120100"),
+            dict(last_legs=3, until="20240109-120100"),
+            dict(last_legs=2, since="20240101-120100", until="20240109-120100"),
+            dict(last_legs=3, since="20240109-120100"),
+        ):
+            expected = analyze_window(self.log_filepath, **window)
+            player_entries = analyze_database(database_filepath, **window)
+            self.assertSetEqual(set(player_entries), set(expected))
+            for name, entry in player_entries.items():
+                self.assertDictEqual(entry.to_dict(), expected[name].to_dict())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os.path
+import tempfile
+import unittest
+from xml.etree import ElementTree as etree
+
+from pydartz.archive import analyze_history, compact_log
+from pydartz.database import Sessions, analyze_log_file, iter_log_file
+from pydartz.merge import merge_logs
+
+
+def _write_log(log_filepath, sessions):
+    """Write a log of sessions, given as (timestamp, players) pairs. Every
+    session holds a single leg won by its first player.
+    """
+    log = Sessions(log_filepath=log_filepath)
+    for timestamp, players in sessions:
+        session = etree.SubElement(
+            log._log_entry, "session", timestamp=timestamp, players=players
+        )
+        leg = etree.SubElement(session, "leg", timestamp=timestamp)
+        etree.SubElement(
+            leg,
+            "visit",
+            timestamp=timestamp,
+            player=players.split(",")[0],
+            points="40",
+            throws="1",
+        )
+    log.save()
+
+
+class MergeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filepaths = [
+            os.path.join(self.tmp_dir.name, f"board{i}.xml") for i in range(3)
+        ]
+        self.output_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        _write_log(
+            self.filepaths[0],
+            [("20240101-100000", "Peter"), ("20240103-100000", "Peter,Paul")],
+        )
+        _write_log(
+            self.filepaths[1],
+            [("20240101-100000", "Mary"), ("20240102-100000", "Paul")],
+        )
+        _write_log(self.filepaths[2], [("20240104-100000", "Mary")])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def timestamps(self):
+        return [s.get("timestamp") for s in iter_log_file(self.output_filepath)]
+
+    def test_merge(self):
+        self.assertTupleEqual(merge_logs(self.filepaths, self.output_filepath), (5, 0))
+        self.assertListEqual(
+            self.timestamps(),
+            [
+                "20240101-100000",
+                "20240101-100000",
+                "20240102-100000",
+                "20240103-100000",
+                "20240104-100000",
+            ],
+        )
+        entries = analyze_log_file(self.output_filepath)
+        self.assertEqual(sum(entries["Mary"]._finishes.values()), 2)
+        self.assertEqual(entries["Paul"].throws, 1)
+
+    def test_merge_duplicates(self):
+        merge_logs(self.filepaths[:2], self.output_filepath)
+        # board logs are merged into the existing output again
+        self.assertTupleEqual(
+            merge_logs([self.output_filepath] + self.filepaths, self.output_filepath),
+            (5, 4),
+        )
+        self.assertEqual(len(self.timestamps()), 5)
+
+    def test_merge_after_compaction(self):
+        merge_logs(self.filepaths, self.output_filepath)
+        # the board log is extended
+        _write_log(self.filepaths[2], [("20240201-100000", "Mary")])
+        self.assertEqual(compact_log(self.output_filepath, before="20240201"), 5)
+
+        # archived sessions are not merged again
+        self.assertTupleEqual(
+            merge_logs([self.output_filepath] + self.filepaths, self.output_filepath),
+            (1, 5),
+        )
+        self.assertListEqual(self.timestamps(), ["20240201-100000"])
+        entries = analyze_history(self.output_filepath)
+        self.assertEqual(sum(entries["Mary"]._finishes.values()), 3)
+
+    def test_merge_into_empty_log(self):
+        with open(self.output_filepath, "w"):
+            pass
+        merge_logs([self.output_filepath, self.filepaths[2]], self.output_filepath)
+        self.assertListEqual(self.timestamps(), ["20240104-100000"])
+
+        # the merged log can be extended
+        log = Sessions(log_filepath=self.output_filepath)
+        etree.SubElement(
+            log._log_entry, "session", timestamp="20240105-100000", players="Mary"
+        )
+        log.save()
+        self.assertEqual(len(self.timestamps()), 2)
+
+    def test_unsorted_log(self):
+        _write_log(
+            self.filepaths[0],
+            [("20240103-100000", "Peter"), ("20240101-100000", "Peter")],
+        )
+        with self.assertRaises(ValueError):
+            merge_logs(self.filepaths, self.output_filepath)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from pydartz import montecarlo
+from pydartz.montecarlo import rank_routes, success_probability
+from pydartz.rules import Rules
+
+
+@unittest.skipUnless(numpy, "requires numpy")
+class MonteCarloTestCase(unittest.TestCase):
+    def test_precise_throws(self):
+        self.assertEqual(success_probability(("T20", "T20", "DB"), 170, 0.5), 1.0)
+        self.assertEqual(success_probability(("D20",), 40, 0.5, darts=1), 1.0)
+        # the route does not check out the score
+        self.assertEqual(success_probability(("T20", "D20"), 101, 0.5, darts=2), 0.0)
+
+    def test_accuracy(self):
+        probabilities = [
+            success_probability(("T20", "D20"), 100, sigma) for sigma in (5, 15, 40)
+        ]
+        self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+        self.assertGreater(probabilities[0], probabilities[-1])
+
+    def test_deterministic(self):
+        self.assertEqual(
+            success_probability(("D16",), 32, 20.0, samples=1000),
+            success_probability(("D16",), 32, 20.0, samples=1000),
+        )
+
+    def test_rank_routes(self):
+        ranked = rank_routes(81, 20.0, samples=2000)
+        self.assertEqual(len(ranked), 3)
+        probabilities = [p for _, p in ranked]
+        self.assertEqual(probabilities, sorted(probabilities, reverse=True))
+        self.assertTupleEqual(rank_routes(159, 20.0, samples=2000), ())
+
+    def test_rank_routes_master_out(self):
+        ranked = rank_routes(57, 1.0, darts=1, rules=Rules(out="master"), samples=100)
+        self.assertTupleEqual(ranked, ((("T19",), 1.0),))
+
+    def test_cache(self):
+        montecarlo.rank_routes.cache_clear()
+        first = rank_routes(60, 20.0, darts=2, samples=1000)
+        self.assertIs(rank_routes(60, 20.0, darts=2, samples=1000), first)
+        self.assertEqual(montecarlo.rank_routes.cache_info().hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ import unittest
 
 from pydartz.communication import TestingCommunicator
 from pydartz.player import Player
+from pydartz.rules import Rules
 
 
 class PlayerEntryTestCase(unittest.TestCase):
@@ -25,6 +26,28 @@ class PlayerEntryTestCase(unittest.TestCase):
         # finish
         self.assertTrue(self.player.score_valid(40))
 
+    def test_unreachable_scores(self):
+        self.assertRaises(ValueError, self.player.score_valid, 179)
+        self.assertRaises(ValueError, self.player.score_valid, 172)
+        self.assertTrue(self.player.score_valid(177))
+        self.player._darts = 1
+        self.assertRaises(ValueError, self.player.score_valid, 59, False)
+        self.assertTrue(self.player.score_valid(57, False))
+        # the visit total must be reachable as well
+        self.player._darts = 3
+        self.player._visit = [60, 60]
+        self.assertRaises(ValueError, self.player.score_valid, 59, False)
+
+    def test_unreachable_single_darts(self):
+        # a single dart cannot score 59 or 58, however many darts are left
+        for darts in (3, 2):
+            self.player._darts = darts
+            for score in (59, 58):
+                self.assertRaises(ValueError, self.player.score_valid, score, False)
+                self.assertRaises(ValueError, self.player._process_score, str(score))
+            self.assertTrue(self.player.score_valid(57, False))
+            self.assertTrue(self.player.score_valid(59, True))
+
     def test_substract(self):
         # first visit
         self.player.substract(180, True)
@@ -121,6 +144,52 @@ class PlayerEntryTestCase(unittest.TestCase):
         self.assertEqual(self.player.score_left, self.player._start_value)
         self.assertEqual(self.player.throws, 0)
 
+    def test_process_segment(self):
+        self.assertTupleEqual(self.player._process_score("T20"), (60, False))
+        self.assertTupleEqual(self.player._process_score("db"), (50, False))
+        self.player._score_left = 32
+        self.assertRaises(ValueError, self.player._process_score, "T20")
+        self.assertTupleEqual(self.player._process_score("D16"), (32, False))
+
+    def test_double_out(self):
+        self.player._score_left = 41
+        # a single dart cannot finish on 41
+        self.assertRaises(ValueError, self.player.score_valid, 41, False)
+        self.assertTrue(self.player.score_valid(41, True))
+        self.player._score_left = 159
+        self.assertRaises(ValueError, self.player.score_valid, 159, True)
+        self.player._score_left = 24
+        self.player._darts = 1
+        self.assertTrue(self.player.score_valid(24, False))
+
+    def test_master_out(self):
+        player = Player("Phil", 57, rules=Rules(out="master"))
+        player._communicator = TestingCommunicator("T19")
+        player.play()
+        self.assertTrue(player.victorious())
+        player._score_left = 19
+        self.assertRaises(ValueError, player._process_score, "19")
+        self.assertRaises(ValueError, player.score_valid, 18, False)
+        self.assertTrue(player.score_valid(16, False))
+
+    def test_single_out(self):
+        player = Player("Phil", 19, rules=Rules(out="single"))
+        self.assertTrue(player.score_valid(18, False))
+        self.assertTrue(player.score_valid(19, False))
+
+    def test_double_in(self):
+        player = Player("Phil", rules=Rules(in_="double"))
+        self.assertFalse(player.opened)
+        self.assertRaises(ValueError, player._process_score, "21")
+        # segments that do not open score nothing
+        self.assertTupleEqual(player._process_score("T20"), (0, False))
+        self.assertTupleEqual(player._process_score("D20"), (40, False))
+        player.substract(40, False)
+        self.assertTrue(player.opened)
+        self.assertTupleEqual(player._process_score("T20"), (60, False))
+        player.reset()
+        self.assertFalse(player.opened)
+
     def test_won_legs(self):
         self.player.just_won_leg()
         self.assertEqual(self.player.nr_won_legs, 1)
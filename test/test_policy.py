@@ -0,0 +1,84 @@
+import os.path
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from pydartz import policy
+from pydartz.finishes import SEGMENTS
+from pydartz.policy import Policy, hit_probabilities
+from pydartz.rules import Rules
+
+
+@unittest.skipUnless(np, "requires numpy")
+class HitProbabilitiesTestCase(unittest.TestCase):
+    def test_distribution(self):
+        probabilities = hit_probabilities(10.0)
+        self.assertEqual(probabilities.shape, (len(SEGMENTS), len(SEGMENTS) + 1))
+        np.testing.assert_allclose(probabilities.sum(axis=1), 1.0)
+        # the aimed segment is the most likely outcome for large segments
+        self.assertEqual(probabilities[19].argmax(), 19)
+
+    def test_precise_throws(self):
+        probabilities = hit_probabilities(0.5)
+        np.testing.assert_allclose(probabilities[:, :-1].diagonal(), 1.0, atol=1e-6)
+
+
+@unittest.skipUnless(np, "requires numpy")
+class PolicyTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.policy = Policy.solve(20.0, max_score=200)
+
+    def test_values(self):
+        values = self.policy.values
+        self.assertEqual(values[0], 0.0)
+        # the score of 1 cannot occur under double-out
+        self.assertEqual(values[1], 0.0)
+        self.assertTrue(np.all(values[2:] >= 1))
+        # scores that cannot be checked out with one visit need more darts
+        self.assertGreater(values[171], values[170])
+        self.assertGreater(values[200], values[100])
+
+    def test_targets(self):
+        self.assertEqual(self.policy.target(40), "D20")
+        self.assertEqual(self.policy.target(32, darts=1, visit_start=92), "D16")
+        self.assertTrue(self.policy.target(200).startswith("T"))
+        # bogey numbers and scores beyond finishes get setup advice, too
+        self.assertIsNotNone(self.policy.target(169))
+        self.assertIsNone(self.policy.target(201))
+        self.assertIsNone(self.policy.target(1))
+        self.assertIsNone(self.policy.target(40, darts=0))
+
+    def test_accuracy(self):
+        precise = Policy.solve(3.0, max_score=60)
+        self.assertLess(precise.expected_darts(40), self.policy.expected_darts(40))
+        self.assertLess(precise.expected_darts(40), 1.5)
+
+    def test_master_out(self):
+        master = Policy.solve(1.0, Rules(out="master"), max_score=60)
+        self.assertEqual(master.target(57), "T19")
+        self.assertAlmostEqual(master.expected_darts(57), 1.0, places=3)
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            solved = Policy.open(20.0, cache_dir=cache_dir, max_score=60)
+            filepath = policy.policy_filepath(cache_dir, 20.0, max_score=60)
+            self.assertTrue(os.path.exists(filepath))
+
+            loaded = Policy.open(20.0, cache_dir=cache_dir, max_score=60)
+            np.testing.assert_array_equal(loaded.targets, solved.targets)
+            self.assertEqual(loaded.rules, solved.rules)
+
+            # outdated cache files are replaced
+            with open(filepath, "wb") as file:
+                file.write(b"garbage")
+            Policy.open(20.0, cache_dir=cache_dir, max_score=60)
+            self.assertEqual(Policy.load(filepath).sigma, 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
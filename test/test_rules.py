@@ -0,0 +1,76 @@
+import unittest
+
+from pydartz.finishes import CHECKOUTS
+from pydartz.rules import DEFAULT_RULES, Rules, _checkout_table, _finishable_table
+
+
+class RulesTestCase(unittest.TestCase):
+    def test_unknown_rules(self):
+        with self.assertRaises(ValueError):
+            Rules(out="triple")
+        with self.assertRaises(ValueError):
+            Rules(in_="master")
+
+    def test_default(self):
+        self.assertEqual(DEFAULT_RULES, Rules(out="double", in_="straight"))
+        self.assertEqual(str(DEFAULT_RULES), "straight-in double-out")
+        self.assertEqual(
+            Rules.from_string("double-in master-out"), Rules("master", "double")
+        )
+
+    def test_build_tables(self):
+        _checkout_table.cache_clear()
+        _finishable_table.cache_clear()
+        Rules(out="single").build_tables()
+        self.assertEqual(_checkout_table.cache_info().currsize, 1)
+        self.assertEqual(_finishable_table.cache_info().currsize, 1)
+
+    def test_finishable_double_out(self):
+        rules = Rules()
+        for score in range(1, 171):
+            for darts in range(4):
+                self.assertEqual(
+                    rules.finishable(score, darts),
+                    bool(CHECKOUTS.routes(score, darts)),
+                    (score, darts),
+                )
+        self.assertFalse(rules.finishable(0))
+        self.assertFalse(rules.finishable(171))
+
+    def test_finishable_master_out(self):
+        rules = Rules(out="master")
+        self.assertEqual(rules.checkouts.max_score, 180)
+        self.assertTrue(rules.finishable(180))
+        self.assertTrue(rules.finishable(3, 1))
+        self.assertTrue(rules.finishable(57, 1))
+        self.assertFalse(rules.finishable(1, 1))
+        self.assertFalse(rules.finishable(179))
+        self.assertEqual(rules.checkouts.routes(57, 1), [("T19",)])
+
+    def test_finishable_single_out(self):
+        rules = Rules(out="single")
+        self.assertTrue(all(rules.finishable(s) for s in range(1, 163)))
+        self.assertTrue(rules.finishable(180))
+        self.assertFalse(rules.finishable(179))
+        self.assertFalse(rules.finishable(61, 1))
+        self.assertTrue(rules.remainder_valid(1))
+
+    def test_remainder(self):
+        self.assertTrue(DEFAULT_RULES.remainder_valid(0))
+        self.assertFalse(DEFAULT_RULES.remainder_valid(1))
+        self.assertTrue(DEFAULT_RULES.remainder_valid(2))
+        self.assertTrue(Rules(out="master").remainder_valid(3))
+
+    def test_segments(self):
+        self.assertTrue(DEFAULT_RULES.out_segment("DB"))
+        self.assertFalse(DEFAULT_RULES.out_segment("T20"))
+        self.assertTrue(Rules(out="master").out_segment("T20"))
+        self.assertFalse(Rules(out="master").out_segment("SB"))
+        self.assertTrue(DEFAULT_RULES.in_segment("20"))
+        self.assertFalse(Rules(in_="double").in_segment("T20"))
+        self.assertTrue(Rules(in_="double").in_points(40))
+        self.assertFalse(Rules(in_="double").in_points(41))
+
+
+if __name__ == "__main__":
+    unittest.main()
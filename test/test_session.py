@@ -2,8 +2,9 @@ import unittest
 from datetime import datetime
 from unittest import mock
 
-from pydartz.communication import TestingCommunicator
+from pydartz.communication import INFO_WIN, TestingCommunicator
 from pydartz.player import Player
+from pydartz.rules import Rules
 from pydartz.session import Leg, Session
 
 
@@ -44,6 +45,21 @@ class LegTestCase(unittest.TestCase):
         self.assertTrue(fritz.victorious())
         self.assertEqual(hans.score_left, 41)
 
+    def test_win_info(self):
+        communicator = TestingCommunicator("60d", "20d", "41d")
+        hans = Player("Hans", 101, communicator=communicator)
+        fritz = Player("Fritz", 101, communicator=communicator)
+        Leg.start_player_index = 0
+        with mock.patch.object(communicator, "print_info") as print_info_patch:
+            Leg([hans, fritz], communicator=communicator).run()
+
+        win_calls = [
+            c.kwargs for c in print_info_patch.call_args_list if c.args == (INFO_WIN,)
+        ]
+        # reported after every visit but the last one
+        self.assertListEqual([c["next_player_index"] for c in win_calls], [1, 0])
+        self.assertEqual(win_calls[0]["players"], [hans, fritz])
+
     def test_logging_without_parent(self):
         leg = Leg(["Peter"])
         # might fail around midnight...
@@ -120,6 +136,23 @@ class SessionTestCase(unittest.TestCase):
 
         self.assertTrue(adam.victorious())
         self.assertEqual(eve.score_left, 49)
+        self.assertIsNone(session._log_entry.get("rules"))
+
+    def test_master_out_session(self):
+        communicator = TestingCommunicator("60d", "T19")
+        peter = Player("Peter", 117, communicator=communicator)
+        session = Session(
+            [peter], 1, communicator=communicator, rules=Rules(out="master")
+        )
+        with mock.patch.object(
+            Rules, "build_tables", autospec=True, side_effect=Rules.build_tables
+        ) as build_tables:
+            session.run()
+        build_tables.assert_called_once_with(Rules(out="master"))
+
+        self.assertTrue(peter.victorious())
+        self.assertEqual(peter.rules, Rules(out="master"))
+        self.assertEqual(session._log_entry.get("rules"), "straight-in master-out")
 
 
 if __name__ == "__main__":
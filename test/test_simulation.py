@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from pydartz.communication import SilentCommunicator
+from pydartz.database import analyze_sessions
+from pydartz.rules import Rules
+from pydartz.session import Session
+from pydartz.simulation import Bot, Simulator, skill_tables
+
+
+@unittest.skipUnless(numpy, "requires numpy")
+class BotTestCase(unittest.TestCase):
+    def test_session(self):
+        bots = [Bot("Robo", 90, seed=1), Bot("Tron", 60, seed=2)]
+        log_parent = []
+        session = Session(
+            bots, 3, log_parent=log_parent, communicator=SilentCommunicator()
+        )
+        session.run()
+
+        self.assertEqual(max(b.nr_won_legs for b in bots), 3)
+        entries = analyze_sessions(log_parent)
+        self.assertEqual(
+            sum(sum(e._finishes.values()) for e in entries.values()),
+            3 + min(b.nr_won_legs for b in bots),
+        )
+        for visit in log_parent[0].iter("visit"):
+            self.assertIn(visit.get("throws"), ("1", "2", "3"))
+            self.assertLessEqual(int(visit.get("points")), 180)
+
+    def test_reproducible(self):
+        def play(seed):
+            bot = Bot("Robo", 60, 101, seed=seed)
+            bot.play()
+            return bot.score_left, bot.throws
+
+        self.assertEqual(play(1), play(1))
+
+    def test_double_in(self):
+        bot = Bot("Robo", 90, rules=Rules(in_="double"), seed=1)
+        while not bot.opened:
+            bot.play()
+        self.assertLess(bot.score_left, 501)
+
+    def test_uncovered_target(self):
+        tables = skill_tables(60, "double", None)
+        uncovered = [[[-1] * 4] * 61] * (tables.max_score + 1)
+        bot = Bot("Robo", 60, 101, seed=1)
+        with mock.patch.object(tables, "targets", uncovered):
+            with self.assertRaises(RuntimeError):
+                bot.play()
+
+
+class SimulatorTestCase(unittest.TestCase):
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_reproducible(self):
+        first = Simulator({"Robo": 90, "Tron": 60}, nr_legs=2, seed=3)
+        second = Simulator({"Robo": 90, "Tron": 60}, nr_legs=2, seed=3)
+        self.assertListEqual(first.run(50), second.run(50))
+        self.assertListEqual(first.legs_won, second.legs_won)
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_statistics(self):
+        simulator = Simulator({"Robo": 90, "Tron": 60}, nr_legs=3, seed=1)
+        winners = simulator.run(200)
+        self.assertEqual(sum(simulator.sessions_won), 200)
+        self.assertGreater(simulator.sessions_won[0], simulator.sessions_won[1])
+        self.assertEqual(winners.count(0), simulator.sessions_won[0])
+
+        entries = simulator.entries()
+        for i, name in enumerate(simulator.names):
+            entry = entries[name]
+            self.assertEqual(sum(entry._finishes.values()), simulator.legs_won[i])
+            self.assertEqual(sum(entry._darters.values()), simulator.legs_won[i])
+            self.assertGreaterEqual(min(entry._darters), 9)
+        self.assertGreater(entries["Robo"].average(), entries["Tron"].average())
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_start_value(self):
+        simulator = Simulator({"Robo": 90}, start_value=101, seed=1)
+        simulator.run(10)
+        entry = simulator.entries()["Robo"]
+        self.assertEqual(entry.total_points(), 10 * 101)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Simulator({"Robo": 90}, rules=Rules(in_="double"))
+        with self.assertRaises(ValueError):
+            Simulator({"Robo": 90}, start_value=701)
+        with self.assertRaises(ValueError):
+            Simulator({"Robo": 90}, start_value=1)
+        with self.assertRaises(ValueError):
+            Simulator({"Robo": 90}, nr_legs=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
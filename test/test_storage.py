@@ -0,0 +1,114 @@
+import os.path
+import tempfile
+import unittest
+from xml.etree import ElementTree as etree
+
+from pydartz.communication import TestingCommunicator
+from pydartz.database import Sessions, analyze_sessions
+from pydartz.player import Player
+from pydartz.session import Session
+from pydartz.storage import SqliteSessions, analyze_database, migrate_log
+
+
+def _run_sessions(sessions_log):
+    sessions = []
+    for names, start_value, data in (
+        (["Peter"], 501, ("180d", 60, 60, 57, 60, 60, 24)),
+        (["Peter", "Paul"], 501, ("180d", "100d", "180d", "140d", 60, 57, 24)),
+        (["Paul", "Mary"], 101, ("60d", "60d", 1, 40)),
+    ):
+        communicator = TestingCommunicator(*data)
+        players = [Player(n, start_value, communicator=communicator) for n in names]
+        session = Session(
+            players, 1, log_parent=sessions_log, communicator=communicator
+        )
+        session.run()
+        sessions.append(session._log_entry)
+    return sessions
+
+
+class SqliteStorageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.database_filepath = os.path.join(self.tmp_dir.name, "stats.sqlite")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertEntriesEqual(self, entries, expected_entries):
+        self.assertSetEqual(set(entries), set(expected_entries))
+        for name, entry in entries.items():
+            self.assertDictEqual(entry.to_dict(), expected_entries[name].to_dict())
+
+    def test_save_and_analyze(self):
+        sessions_log = SqliteSessions(self.database_filepath)
+        sessions = _run_sessions(sessions_log)
+        sessions_log.close()
+
+        self.assertEntriesEqual(
+            analyze_database(self.database_filepath), analyze_sessions(sessions)
+        )
+
+    def test_multiple_legs(self):
+        sessions_log = SqliteSessions(self.database_filepath)
+        communicator = TestingCommunicator(*(2 * ("180d", 60, 60, 57, 60, 60, 24)))
+        session = Session(
+            [Player("Peter", communicator=communicator)],
+            2,
+            log_parent=sessions_log,
+            communicator=communicator,
+        )
+        session.run()
+
+        entry = analyze_database(sessions_log._connection)["Peter"]
+        self.assertEqual(entry.throws, 18)
+        self.assertEqual(entry._darters[9], 2)
+        self.assertEqual(entry._finishes[144], 2)
+
+    def test_filter_names(self):
+        sessions = _run_sessions(SqliteSessions(self.database_filepath))
+
+        entries = analyze_database(self.database_filepath, names=["Paul"])
+        self.assertEntriesEqual(entries, {"Paul": analyze_sessions(sessions)["Paul"]})
+
+    def test_filter_time_range(self):
+        _run_sessions(SqliteSessions(self.database_filepath))
+
+        self.assertDictEqual(
+            analyze_database(self.database_filepath, since="99991231-000000"), {}
+        )
+        self.assertDictEqual(
+            analyze_database(self.database_filepath, until="19700101-000000"), {}
+        )
+        self.assertEqual(
+            len(analyze_database(self.database_filepath, since="19700101-000000")),
+            3,
+        )
+
+    def test_migrate_log(self):
+        log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        sessions = _run_sessions(Sessions(log_filepath=log_filepath))
+
+        migrate_log(log_filepath, self.database_filepath)
+
+        self.assertEntriesEqual(
+            analyze_database(self.database_filepath), analyze_sessions(sessions)
+        )
+
+    def test_migrate_aborted_leg(self):
+        log_filepath = os.path.join(self.tmp_dir.name, "stats.xml")
+        sessions = _run_sessions(Sessions(log_filepath=log_filepath))
+        sessions[1][0].set("aborted", "1")
+        root = etree.Element("sessions")
+        root.extend(sessions)
+        etree.ElementTree(root).write(log_filepath)
+
+        migrate_log(log_filepath, self.database_filepath)
+
+        entries = analyze_database(self.database_filepath)
+        self.assertEntriesEqual(entries, analyze_sessions(sessions))
+        self.assertEqual(sum(e._finishes.total() for e in entries.values()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
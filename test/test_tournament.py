@@ -0,0 +1,139 @@
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+from pydartz.rules import DEFAULT_RULES, Rules
+from pydartz.tournament import (
+    KNOCKOUT,
+    Tournament,
+    compute_visits,
+    match_seed,
+    play_match,
+)
+
+ROSTER = {"Robo": 90, "Tron": 60, "Hal": 60, "Bender": 90, "Marvin": 90}
+
+
+class TournamentTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def _run(self, max_workers, **kwargs):
+        tournament = Tournament(
+            ROSTER, nr_legs=2, seed=7, cache_dir=self.tmp_dir.name, **kwargs
+        )
+        results = list(tournament.run(max_workers=max_workers))
+        return tournament, results
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_round_robin(self):
+        tournament, results = self._run(max_workers=2)
+        self.assertEqual(len(results), 10)
+        self.assertListEqual([r.number for r in tournament.results], list(range(10)))
+
+        standings = tournament.standings()
+        self.assertListEqual([s.played for s in standings], [4] * 5)
+        self.assertEqual(sum(s.won for s in standings), 10)
+        self.assertEqual(
+            sum(s.legs_won for s in standings), sum(s.legs_lost for s in standings)
+        )
+        for result in results:
+            self.assertEqual(max(result.legs_won), 2)
+            self.assertEqual(result.winner, result.players[result.legs_won.index(2)])
+
+        entries = tournament.entries()
+        for standing in standings:
+            self.assertEqual(
+                sum(entries[standing.name]._finishes.values()), standing.legs_won
+            )
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_deterministic(self):
+        first, _ = self._run(max_workers=1)
+        second, _ = self._run(max_workers=3)
+        self.assertListEqual(first.standings(), second.standings())
+        self.assertListEqual(
+            [r[:4] for r in first.results], [r[:4] for r in second.results]
+        )
+        for name in ROSTER:
+            self.assertEqual(
+                first.entries()[name].information(),
+                second.entries()[name].information(),
+            )
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_knockout(self):
+        tournament, results = self._run(max_workers=2, format=KNOCKOUT)
+        # two matches in the first round, one bot advancing without playing
+        self.assertEqual(len(results), 4)
+        standings = tournament.standings()
+        self.assertEqual(standings[0].won, standings[0].played)
+        self.assertEqual(sum(s.played for s in standings), 8)
+        self.assertEqual(tournament.results[-1].winner, standings[0].name)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Tournament(ROSTER, format="swiss")
+        with self.assertRaises(ValueError):
+            Tournament({"Robo": 90})
+        with self.assertRaises(ValueError):
+            Tournament(ROSTER, nr_legs=0)
+        with self.assertRaises(ValueError):
+            Tournament(ROSTER, rules=Rules(in_="double"))
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_play_match(self):
+        def play():
+            return play_match(
+                3,
+                {"Robo": 90, "Tron": 60},
+                2,
+                101,
+                DEFAULT_RULES,
+                match_seed(1, 3),
+                self.tmp_dir.name,
+            )
+
+        result = play()
+        self.assertEqual(result[:4], play()[:4])
+        self.assertEqual(result.number, 3)
+        self.assertEqual(sum(result.entries[result.winner]._finishes.values()), 2)
+
+    @unittest.skipUnless(numpy, "requires numpy")
+    def test_play_match_with_visits(self):
+        visits = {
+            average: compute_visits(average, "double", self.tmp_dir.name)
+            for average in (90, 60)
+        }
+        # workers play with the visit outcomes computed by the parent
+        with mock.patch.dict("pydartz.tournament._worker_visits", visits):
+            with mock.patch("pydartz.simulation.skill_tables") as tables_patch:
+                result = play_match(
+                    0,
+                    {"Robo": 90, "Tron": 60},
+                    1,
+                    501,
+                    DEFAULT_RULES,
+                    match_seed(1, 0),
+                    None,
+                )
+        tables_patch.assert_not_called()
+        self.assertIn(result.winner, ("Robo", "Tron"))
+
+    def test_match_seed(self):
+        self.assertIsNone(match_seed(None, 1))
+        self.assertNotEqual(match_seed(1, 2), match_seed(1, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
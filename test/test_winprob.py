@@ -0,0 +1,128 @@
+import os.path
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from pydartz.database import PlayerEntry
+from pydartz.policy import Policy, hit_probabilities, sigma_for_average
+from pydartz.winprob import (
+    DEFAULT_AVERAGE,
+    WinEstimator,
+    finish_table,
+    finish_table_filepath,
+    skill_bucket,
+    visit_transitions,
+    win_probabilities,
+)
+
+MAX_SCORE = 101
+
+
+class SkillTestCase(unittest.TestCase):
+    def test_skill_bucket(self):
+        self.assertEqual(skill_bucket(61.9), 60)
+        self.assertEqual(skill_bucket(63), 65)
+        self.assertEqual(skill_bucket(5), 20)
+        self.assertEqual(skill_bucket(170), 120)
+
+    @unittest.skipUnless(np, "requires numpy")
+    def test_sigma_for_average(self):
+        self.assertGreater(sigma_for_average(40), sigma_for_average(80))
+
+
+@unittest.skipUnless(np, "requires numpy")
+class FinishTableTestCase(unittest.TestCase):
+    def test_visit_transitions(self):
+        sigma = sigma_for_average(60)
+        policy = Policy.solve(sigma, max_score=MAX_SCORE)
+        transitions = visit_transitions(policy, hit_probabilities(sigma))
+        # the score of 1 cannot occur under double-out
+        sums = transitions.sum(axis=1)
+        np.testing.assert_allclose(np.delete(sums, 1), 1.0)
+        self.assertEqual(sums[1], 0.0)
+        # visits never increase the score
+        self.assertEqual(np.triu(transitions, 1).sum(), 0.0)
+
+    def test_finish_table(self):
+        table = finish_table(60, max_score=MAX_SCORE)
+        self.assertTrue(np.all(np.diff(table, axis=0) >= -1e-12))
+        self.assertEqual(table[0, 0], 1.0)
+        self.assertEqual(table[0, 40], 0.0)
+        self.assertGreater(table[1, 40], table[1, 101])
+        self.assertIs(finish_table(60, max_score=MAX_SCORE), table)
+
+    def test_finish_table_cached(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            table = finish_table(60, cache_dir=cache_dir, max_score=MAX_SCORE)
+            filepath = finish_table_filepath(cache_dir, 60, max_score=MAX_SCORE)
+            self.assertTrue(os.path.exists(filepath))
+
+            # the cached table is loaded without solving the policy
+            with mock.patch.object(Policy, "solve") as solve_patch:
+                loaded = finish_table.__wrapped__(
+                    60, cache_dir=cache_dir, max_score=MAX_SCORE
+                )
+            solve_patch.assert_not_called()
+            np.testing.assert_array_equal(loaded, table)
+
+
+@unittest.skipUnless(np, "requires numpy")
+class WinProbabilityTestCase(unittest.TestCase):
+    def setUp(self):
+        self.estimator = WinEstimator(
+            {"Peter": 60, "Mary": 60, "Paul": 30}, max_score=MAX_SCORE
+        )
+
+    def test_win_probabilities(self):
+        table = finish_table(60, max_score=MAX_SCORE)
+        probabilities = win_probabilities([table, table], [80, 80])
+        self.assertAlmostEqual(sum(probabilities), 1.0)
+        # the player to throw next has an advantage
+        self.assertGreater(probabilities[0], probabilities[1])
+
+    def test_estimate(self):
+        first = self.estimator.estimate([("Peter", 80), ("Mary", 80)], 0)
+        second = self.estimator.estimate([("Peter", 80), ("Mary", 80)], 1)
+        self.assertAlmostEqual(first[0], second[1])
+        self.assertGreater(first[0], 0.5)
+
+        # better players and lower scores increase the chances
+        stronger = self.estimator.estimate([("Peter", 80), ("Paul", 80)], 1)
+        self.assertGreater(stronger[0], second[0])
+        lower = self.estimator.estimate([("Peter", 40), ("Mary", 80)], 1)
+        self.assertGreater(lower[0], second[0])
+
+    def test_estimate_three_players(self):
+        probabilities = self.estimator.estimate(
+            [("Peter", 60), ("Mary", 60), ("Paul", 60)], 2
+        )
+        self.assertAlmostEqual(sum(probabilities), 1.0)
+        self.assertGreater(probabilities[1], probabilities[2])
+
+    def test_not_covered(self):
+        self.assertIsNone(self.estimator.estimate([("Peter", 501), ("Mary", 40)]))
+        self.assertIsNone(self.estimator.estimate([("Peter", 0), ("Mary", 40)]))
+
+    def test_from_entries(self):
+        entry = PlayerEntry("Peter")
+        entry.update(throws=3, points=60)
+        with mock.patch("pydartz.winprob.finish_table") as finish_table_patch:
+            estimator = WinEstimator.from_entries(
+                {"Peter": entry, "Mary": PlayerEntry()}, max_score=MAX_SCORE
+            )
+        # tables are computed before the game
+        self.assertListEqual(
+            [c.args[0] for c in finish_table_patch.call_args_list],
+            [DEFAULT_AVERAGE, 60],
+        )
+        self.assertEqual(estimator.average("Peter"), 60)
+        self.assertEqual(estimator.average("Mary"), DEFAULT_AVERAGE)
+
+
+if __name__ == "__main__":
+    unittest.main()